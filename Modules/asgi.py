@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides the ASGI application of the web server. Requests are served by an ASGI server on the event
+    loop of the bots. Native ASGI routes are handled on the loop, and all other requests are passed to the Flask app,
+    which runs in a bounded thread pool.
+
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsgiApp:
+    """
+    An ASGI application in front of a WSGI application. A route registered with `route` is a coroutine function which
+    is called on the event loop with the ASGI scope, receive and send, so long-lived connections like event streams do
+    not hold a thread. Every other request is passed to the WSGI application in a thread pool. The response body is
+    read from the WSGI application chunk by chunk, so streamed responses are sent as they are produced.
+    
+    Args:
+        app: The WSGI application.
+        threads (int): The number of threads of the WSGI application.
+    """
+    def __init__(self, app, threads: int = 8):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='Web')
+        self.routes = {}
+    
+    def route(self, path: str, handler) -> None:
+        """
+        Registers a native ASGI route.
+        
+        Args:
+            path (str): The path of the route.
+            handler (callable): A coroutine function called with the scope, receive and send.
+        """
+        self.routes[path] = handler
+    
+    async def __call__(self, scope: dict, receive, send) -> None:
+        """
+        Handles an ASGI connection.
+        
+        Args:
+            scope (dict): The ASGI scope.
+            receive (callable): The ASGI receive channel.
+            send (callable): The ASGI send channel.
+        """
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        
+        if scope['type'] != 'http':
+            return
+        
+        handler = self.routes.get(scope['path'])
+        if handler is not None:
+            await handler(scope, receive, send)
+            return
+        
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        await self.wsgi(scope, body, send)
+    
+    @staticmethod
+    def environ(scope: dict, body: bytes = b'') -> dict:
+        """
+        Builds the WSGI environ of an ASGI HTTP scope.
+        
+        Args:
+            scope (dict): The ASGI scope.
+            body (bytes): The request body.
+        
+        Returns:
+            dict: The WSGI environ.
+        """
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name == 'CONTENT_LENGTH':
+                environ['CONTENT_LENGTH'] = value
+            else:
+                key = f'HTTP_{name}'
+                environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+    
+    async def wsgi(self, scope: dict, body: bytes, send) -> None:
+        """
+        Passes a request to the WSGI application in the thread pool and sends its response.
+        
+        Args:
+            scope (dict): The ASGI scope.
+            body (bytes): The request body.
+            send (callable): The ASGI send channel.
+        """
+        loop = asyncio.get_running_loop()
+        status = {}
+        
+        def start_response(line, headers, exc_info=None):
+            status['code'] = int(line.split(' ', 1)[0])
+            status['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+            return lambda data: None
+        
+        result = await loop.run_in_executor(self.executor, self.app, self.environ(scope, body), start_response)
+        iterator = iter(result)
+        try:
+            started = False
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+                if chunk is None:
+                    break
+                if not started:
+                    await send({'type': 'http.response.start', 'status': status['code'], 'headers': status['headers']})
+                    started = True
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                await send({'type': 'http.response.start', 'status': status['code'], 'headers': status['headers']})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.executor, result.close)
+    
+    def close(self) -> None:
+        """
+        Shuts the thread pool down.
+        """
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides the asset pipeline of the web server. The stylesheets and scripts of the dashboard are vendored
+    locally, bundled into one stylesheet and one script with a content hash in their names, and compressed ahead of
+    time, so they can be cached by the browser for ever.
+
+"""
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import posixpath
+import re
+import threading
+import time
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    # the brotli variants are optional, browsers fall back to gzip
+    brotli = None
+
+
+class AssetPipeline:
+    """
+    The asset pipeline of the web server. A build reads every source of a bundle from the vendor folder, or downloads
+    it from the CDN and stores it in the vendor folder first, so later builds work offline. The sources of a bundle are
+    concatenated in order, and the bundle is written with the first characters of its SHA-256 digest in its name, along
+    with a gzip and, if the brotli package is installed, a brotli variant.
+    
+    Stylesheets refer to fonts and images by relative URLs, which would break once the stylesheet is bundled. These
+    files are vendored and written with a content hash as well, and their URLs are rewritten to the built files.
+    
+    The manifest lists the built bundles and files. As long as there is no manifest, the templates fall back to the
+    CDN.
+    
+    Args:
+        logger (ValkyrieLogger): The logger.
+        root (str): The folder of the web server, with the vendor folder and the static folder `data`.
+        url (str): The URL path of the built files.
+    """
+    CDN = 'https://exv.al/static/vendor/'
+    CDN_HOST = 'https://exv.al'
+    BUNDLES = {
+        'css': [
+            'fontawesome/css/all.css',
+            'mdb/css/bootstrap.min.css',
+            'mdb/css/mdb.min.css',
+            'mdb/css/addons/flag.min.css',
+            'mdb/css/style.min.css',
+            'valkyteq/fonts/fonts.css',
+            'valkyteq/css/icons.css',
+            'exval/css/style_game.css',
+            'exval/css/header.css',
+            'exval/css/component.css',
+            'exval/css/pattern.css',
+            'exval/css/page.css',
+            'valky/css/ValkyDev.css',
+        ],
+        'js': [
+            'mdb/js/jquery-3.4.1.min.js',
+            'mdb/js/popper.min.js',
+            'mdb/js/bootstrap.min.js',
+            'mdb/js/mdb.min.js',
+            'mdb/js/materialize.min.js',
+            'exval/js/LazyLoading.js.download',
+            'exval/js/ScrollMagic.min.js.download',
+            'exval/js/TweenMax.min.js.download',
+            'exval/js/animation.gsap.js.download',
+            'exval/js/swiper-4.5.0.min.js.download',
+            'exval/js/common.js.download',
+        ],
+    }
+    COMPRESS = ('css', 'js', 'svg', 'ttf', 'otf', 'eot', 'json')
+    URL_PATTERN = re.compile(rb'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+    MAX_AGE = 31536000
+    
+    def __init__(self, logger, root: str = 'Web', url: str = '/assets'):
+        self.logger = logger
+        self.vendor = os.path.join(root, 'vendor')
+        self.output = os.path.join(root, 'data', 'assets')
+        self.url = url
+        
+        self.lock = threading.Lock()
+        self.manifest = self.load()
+    
+    def load(self) -> dict | None:
+        """
+        Loads the manifest of the last build.
+        
+        Returns:
+            dict | None: The manifest, or None if nothing was built yet.
+        """
+        try:
+            with open(os.path.join(self.output, 'manifest.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not all(os.path.exists(os.path.join(self.output, name)) for name in manifest['files']):
+            return None
+        return manifest
+    
+    def fetch(self, path: str) -> bytes:
+        """
+        Reads a source from the vendor folder. A source which is not vendored yet is downloaded from the CDN first.
+        
+        Args:
+            path (str): The path of the source, relative to the vendor folder.
+        
+        Returns:
+            bytes: The content of the source.
+        """
+        local = os.path.join(self.vendor, *path.split('/'))
+        if not os.path.exists(local):
+            self.logger.info(f'Assets | Vendoring {path}')
+            with urllib.request.urlopen(self.CDN + path, timeout=30) as resp:
+                data = resp.read()
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            with open(local, 'wb') as f:
+                f.write(data)
+        with open(local, 'rb') as f:
+            return f.read()
+    
+    def _write(self, name: str, data: bytes, files: list) -> str:
+        """
+        Writes a built file with the content hash in its name, and its compressed variants.
+        
+        Args:
+            name (str): The name of the file, e.g. `app.css`.
+            data (bytes): The content of the file.
+            files (list): The list of built files, which the new files are added to.
+        
+        Returns:
+            str: The name of the built file.
+        """
+        stem, ext = posixpath.splitext(name)
+        built = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        with open(os.path.join(self.output, built), 'wb') as f:
+            f.write(data)
+        files.append(built)
+        
+        if ext.lstrip('.') in self.COMPRESS:
+            # mtime 0 keeps the gzip variant identical between builds
+            with open(os.path.join(self.output, f'{built}.gz'), 'wb') as f:
+                f.write(gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                with open(os.path.join(self.output, f'{built}.br'), 'wb') as f:
+                    f.write(brotli.compress(data, quality=11))
+        return built
+    
+    def _rewrite(self, path: str, data: bytes, files: list, built: dict) -> bytes:
+        """
+        Rewrites the relative URLs of a stylesheet to the built files, which are vendored and built on the way.
+        
+        Args:
+            path (str): The path of the stylesheet, relative to the vendor folder.
+            data (bytes): The content of the stylesheet.
+            files (list): The list of built files.
+            built (dict): The URLs of the built files by their source path, so a file referred to twice is built once.
+        
+        Returns:
+            bytes: The rewritten stylesheet.
+        """
+        def replace(match):
+            ref = match.group(2).decode('utf-8').strip()
+            if ref.startswith(('data:', 'http:', 'https:', '//', '#')):
+                return match.group(0)
+            if ref.startswith('/'):
+                # a root-relative URL belongs to the CDN host, not to the web server
+                return f'url({self.CDN_HOST}{ref})'.encode('utf-8')
+            
+            # keep the query and the fragment, e.g. `?#iefix` or `#fontawesome`, the file itself has neither
+            split = min([i for i in (ref.find('?'), ref.find('#')) if i >= 0], default=len(ref))
+            source = posixpath.normpath(posixpath.join(posixpath.dirname(path), ref[:split]))
+            if source.startswith('..'):
+                return match.group(0)
+            if source not in built:
+                try:
+                    built[source] = f'{self.url}/{self._write(posixpath.basename(source), self.fetch(source), files)}'
+                except (OSError, http.client.HTTPException) as e:
+                    # the file stays on the CDN, the rest of the build is still served locally
+                    self.logger.warning(f'Assets | Failed to vendor {source} | {str(e)}')
+                    built[source] = f'{self.CDN}{source}'
+            return f'url({built[source]}{ref[split:]})'.encode('utf-8')
+        
+        return self.URL_PATTERN.sub(replace, data)
+    
+    def build(self) -> dict:
+        """
+        Builds the bundles and writes the manifest. Files of older builds are removed.
+        
+        Returns:
+            dict: The manifest.
+        """
+        with self.lock:
+            start = time.time()
+            os.makedirs(self.output, exist_ok=True)
+            files = []
+            built = {}
+            manifest = {}
+            for bundle, sources in self.BUNDLES.items():
+                parts = []
+                for path in sources:
+                    data = self.fetch(path)
+                    if bundle == 'css':
+                        data = self._rewrite(path, data, files, built)
+                    parts.append(data)
+                # a script without a trailing semicolon must not run into the next one
+                separator = b'\n;\n' if bundle == 'js' else b'\n'
+                manifest[bundle] = self._write(f'app.{bundle}', separator.join(parts), files)
+            manifest['files'] = files
+            manifest['cdn'] = sorted(source for source, url in built.items() if url.startswith(self.CDN))
+            manifest['built'] = int(time.time())
+            
+            with open(os.path.join(self.output, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=4)
+            
+            keep = set(files) | {f'{name}.gz' for name in files} | {f'{name}.br' for name in files} | {'manifest.json'}
+            for name in os.listdir(self.output):
+                if name not in keep:
+                    os.remove(os.path.join(self.output, name))
+            
+            self.manifest = manifest
+            self.logger.info(f'Assets | Built {len(files)} files | Took: {int((time.time() - start) * 1000)}ms')
+            return manifest
+    
+    def resolve(self, name: str, accept_encoding: str = '') -> tuple | None:
+        """
+        Finds the variant of a built file to serve, the brotli variant if the client accepts it, then the gzip variant.
+        
+        Args:
+            name (str): The name of the built file.
+            accept_encoding (str): The `Accept-Encoding` header of the request.
+        
+        Returns:
+            tuple | None: The path and the content encoding of the variant, which is None for the plain file, or None
+                if the file is not part of the build.
+        """
+        if self.manifest is None or name not in self.manifest['files']:
+            return None
+        
+        accepted = set()
+        for part in accept_encoding.split(','):
+            coding, _, params = part.strip().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                accepted.add(coding.strip().lower())
+        
+        path = os.path.join(self.output, name)
+        for coding, ext in (('br', '.br'), ('gzip', '.gz')):
+            if coding in accepted and os.path.exists(path + ext):
+                return path + ext, coding
+        return path, None
+
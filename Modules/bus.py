@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides the command bus between the threads of the web server and the event loop of the bots. Every
+    operation of the web server which touches the state of the bots runs on the event loop, and its result is sent back
+    to the waiting thread.
+
+"""
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+
+
+class CommandTimeout(Exception):
+    """
+    Raised if a command did not finish on the event loop in time.
+    """
+
+
+class CommandBus:
+    """
+    The command bus between the threads of the web server and the event loop of the bots. The state of the bots, e.g.
+    the lists of the task queue, is only changed from the event loop, so a command which runs on the loop never races
+    with the bots, and a command without an await in between its changes is applied at once.
+    
+    A command is a coroutine function or a plain function. It is scheduled on the loop with
+    `asyncio.run_coroutine_threadsafe`, which carries the context of the calling thread over, e.g. the request context
+    of Flask. The calling thread waits for the result, or for the exception of the command, which is raised again in
+    the calling thread. A command which takes longer than the timeout is cancelled at its next await, and the caller
+    gets a `CommandTimeout`. No thread is started for a command.
+    
+    Args:
+        logger (ValkyrieLogger): The logger.
+        timeout (float): The default timeout of a command in seconds.
+    """
+    def __init__(self, logger, timeout: float = 30):
+        self.logger = logger
+        self.timeout = timeout
+        self.loop = None
+        self.loop_thread = None
+        
+        # the counters are changed from the threads of the web server
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.pending = 0
+        self.errors = 0
+        self.timeouts = 0
+    
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Attaches the bus to the event loop. Has to be called from the thread which runs the loop.
+        
+        Args:
+            loop (asyncio.AbstractEventLoop): The event loop of the bots.
+        """
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+    
+    def call(self, func, *args, timeout: float = None, **kwargs):
+        """
+        Runs a command on the event loop and waits for its result.
+        
+        Args:
+            func (callable): The command, a coroutine function or a plain function.
+            *args: The positional arguments of the command.
+            timeout (float): The timeout in seconds, or None for the default timeout.
+            **kwargs: The keyword arguments of the command.
+        
+        Returns:
+            The result of the command.
+        
+        Raises:
+            RuntimeError: If the bus is not attached, or if it is called from the event loop itself, where waiting for
+                the command would block the loop for good.
+            CommandTimeout: If the command did not finish in time.
+        """
+        if self.loop is None or not self.loop.is_running():
+            raise RuntimeError('The command bus is not attached to a running event loop')
+        if threading.get_ident() == self.loop_thread:
+            raise RuntimeError('The command bus can not be called from the event loop, await the command instead')
+        
+        name = getattr(func, '__name__', repr(func))
+        future = asyncio.run_coroutine_threadsafe(self._run(func, args, kwargs), self.loop)
+        with self.lock:
+            self.calls += 1
+            self.pending += 1
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            with self.lock:
+                self.timeouts += 1
+            self.logger.warning(f'Command Bus | {name} timed out')
+            raise CommandTimeout(f'{name} did not finish in time') from None
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            raise
+        finally:
+            with self.lock:
+                self.pending -= 1
+    
+    @staticmethod
+    async def _run(func, args: tuple, kwargs: dict):
+        """
+        Runs a command on the event loop.
+        
+        Args:
+            func (callable): The command.
+            args (tuple): The positional arguments.
+            kwargs (dict): The keyword arguments.
+        
+        Returns:
+            The result of the command.
+        """
+        result = func(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    
+    def stats(self) -> dict:
+        """
+        Returns the command metrics.
+        
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        return {
+            'calls': self.calls,
+            'pending': self.pending,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+        }
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides a two-level cache for Luna translations. Recent translations are kept in an in-memory LRU, and
+    all translations are kept in an SQLite store on disk, so they survive a restart. Both levels expire entries after a
+    TTL and stay within a size budget.
+
+"""
+import asyncio
+import collections
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class TranslationCache:
+    """
+    A two-level cache for translations, keyed by the normalized text and the target language. The memory level is an
+    LRU with a maximum number of entries. The disk level is an SQLite table with a byte budget, which evicts the least
+    recently used translations once the budget is exceeded. The disk is only read on a memory miss, and every disk
+    access runs in a worker thread. A disk hit does not write, the access times of the hits are kept in memory and
+    written along with the next write transaction, or once `touch_batch` of them are pending.
+    
+    Args:
+        logger (ValkyrieLogger): The logger.
+        config (dict): The configuration dictionary.
+    """
+    def __init__(self, logger, config):
+        self.config = config
+        self.logger = logger
+        
+        cache = self.config['luna'].get('cache', {})
+        self.enabled = cache.get('enabled', True)
+        self.memory_size = cache.get('memory_size', 1000)
+        self.disk_size = cache.get('disk_size', 10485760)
+        self.ttl = cache.get('ttl', 604800)
+        self.path = cache.get('path', 'Modules/data/translations.db')
+        self.path_prewarm = cache.get('prewarm', 'Modules/data/phrases.txt')
+        
+        self.memory = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.db = None
+        self.disk_bytes = 0
+        self.touched = {}
+        self.touch_batch = cache.get('touch_batch', 256)
+        
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Normalizes a text, so the same phrase with different casing or spacing shares one cache entry.
+        
+        Args:
+            text (str): The text.
+        
+        Returns:
+            str: The normalized text.
+        """
+        return ' '.join(text.split()).casefold()
+    
+    def key(self, text: str, lang: str) -> str:
+        """
+        Returns the cache key of a text and a target language.
+        
+        Args:
+            text (str): The text.
+            lang (str): The target language.
+        
+        Returns:
+            str: The cache key.
+        """
+        return hashlib.sha1(f'{lang.lower()}|{self.normalize(text)}'.encode('utf-8')).hexdigest()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Returns the connection to the disk store. The store is created on first use.
+        
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        if self.db is None:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                'key TEXT PRIMARY KEY, lang TEXT, text TEXT, translation TEXT, created REAL, accessed REAL, size INTEGER)'
+            )
+            self.db.execute('CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed)')
+            self.db.execute('DELETE FROM translations WHERE created < ?', (time.time() - self.ttl,))
+            self.db.commit()
+            self.disk_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM translations').fetchone()[0]
+        return self.db
+    
+    def _disk_get(self, key: str) -> tuple | None:
+        """
+        Reads a translation from the disk store.
+        
+        Args:
+            key (str): The cache key.
+        
+        Returns:
+            tuple | None: The translation and its creation time, or None if it is not stored or expired.
+        """
+        with self.lock:
+            db = self._connect()
+            row = db.execute('SELECT translation, created FROM translations WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time() - self.ttl:
+                db.execute('DELETE FROM translations WHERE key = ?', (key,))
+                db.commit()
+                return None
+            self.touched[key] = time.time()
+            if len(self.touched) >= self.touch_batch:
+                self._flush_touched(db)
+                db.commit()
+            return row
+    
+    def _flush_touched(self, db: sqlite3.Connection) -> None:
+        """
+        Writes the pending access times of the disk hits in the current transaction. Has to be called with the lock.
+        
+        Args:
+            db (sqlite3.Connection): The connection.
+        """
+        if self.touched:
+            db.executemany('UPDATE translations SET accessed = ? WHERE key = ?', [(t, k) for k, t in self.touched.items()])
+            self.touched.clear()
+    
+    def _disk_put(self, key: str, text: str, lang: str, translation: str) -> None:
+        """
+        Writes a translation to the disk store and evicts the least recently used translations if the store exceeds
+        its byte budget.
+        
+        Args:
+            key (str): The cache key.
+            text (str): The original text.
+            lang (str): The target language.
+            translation (str): The translation.
+        """
+        size = len(text.encode('utf-8')) + len(translation.encode('utf-8'))
+        now = time.time()
+        with self.lock:
+            db = self._connect()
+            # the eviction below needs the current access times
+            self._flush_touched(db)
+            old = db.execute('SELECT size FROM translations WHERE key = ?', (key,)).fetchone()
+            db.execute(
+                'INSERT OR REPLACE INTO translations (key, lang, text, translation, created, accessed, size) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, lang.lower(), text, translation, now, now, size)
+            )
+            self.disk_bytes += size - (old[0] if old else 0)
+            
+            while self.disk_bytes > self.disk_size:
+                rows = db.execute('SELECT key, size FROM translations ORDER BY accessed LIMIT 64').fetchall()
+                if not rows:
+                    break
+                db.executemany('DELETE FROM translations WHERE key = ?', [(r[0],) for r in rows])
+                self.disk_bytes -= sum(r[1] for r in rows)
+                self.evictions += len(rows)
+            db.commit()
+    
+    def _memory_put(self, key: str, translation: str, created: float = None) -> None:
+        """
+        Writes a translation to the memory level and evicts the least recently used entry if it is full.
+        
+        Args:
+            key (str): The cache key.
+            translation (str): The translation.
+            created (float): The creation time of the translation. Defaults to `time.time()`.
+        """
+        created = time.time() if created is None else created
+        self.memory[key] = (translation, created + self.ttl)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+    
+    async def get(self, text: str, lang: str) -> str | None:
+        """
+        Gets a cached translation. The memory level is checked first, then the disk store.
+        
+        Args:
+            text (str): The text.
+            lang (str): The target language.
+        
+        Returns:
+            str | None: The translation, or None on a cache miss.
+        """
+        if not self.enabled:
+            return None
+        
+        key = self.key(text, lang)
+        entry = self.memory.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                self.memory.move_to_end(key)
+                self.hits_memory += 1
+                return entry[0]
+            del self.memory[key]
+        
+        row = await asyncio.to_thread(self._disk_get, key)
+        if row is not None:
+            self._memory_put(key, row[0], row[1])
+            self.hits_disk += 1
+            return row[0]
+        
+        self.misses += 1
+        return None
+    
+    async def put(self, text: str, lang: str, translation: str) -> None:
+        """
+        Stores a translation in both levels.
+        
+        Args:
+            text (str): The text.
+            lang (str): The target language.
+            translation (str): The translation.
+        """
+        if not self.enabled:
+            return
+        
+        key = self.key(text, lang)
+        self._memory_put(key, translation)
+        await asyncio.to_thread(self._disk_put, key, text, lang, translation)
+    
+    def phrases(self) -> list:
+        """
+        Reads the common chat phrases used to pre-warm the cache, one phrase per line.
+        
+        Returns:
+            list: A list of phrases.
+        """
+        if not os.path.exists(self.path_prewarm):
+            return []
+        with open(self.path_prewarm, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    
+    def stats(self) -> dict:
+        """
+        Returns the cache metrics.
+        
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        hits = self.hits_memory + self.hits_disk
+        total = hits + self.misses
+        return {
+            'hits': hits,
+            'hits_memory': self.hits_memory,
+            'hits_disk': self.hits_disk,
+            'misses': self.misses,
+            'hit_rate': int(hits / total * 100) if total else 0,
+            'evictions': self.evictions,
+            'memory_entries': len(self.memory),
+            'disk_bytes': self.disk_bytes,
+        }
+    
+    def close(self) -> None:
+        """
+        Closes the disk store.
+        """
+        with self.lock:
+            if self.db is not None:
+                self._flush_touched(self.db)
+                self.db.commit()
+                self.db.close()
+                self.db = None
@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides a class to store temporary role grants, such as a Twitch moderator or VIP role which was
+    redeemed with channel points. The grants are indexed by platform, role and user for membership checks and by their
+    expiry time, so expired grants can be found without reading every grant.
+
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+import xml.etree.ElementTree as ET
+
+
+class Grant:
+    """
+    A class to handle a role grant.
+    
+    Args:
+        platform (str): The platform of the role. Can be either "twitch" or "discord".
+        role (str): The granted role.
+        user (str): The user who got the role.
+        start (float): The timestamp when the role was granted.
+        end (float): The timestamp when the role expires, or None if the role does not expire.
+    """
+    def __init__(self, platform: str, role: str, user: str, start: float, end: float = None):
+        self.platform = platform
+        self.role = role
+        self.user = user
+        self.start = start
+        self.end = end
+        # the time of the next removal attempt, later than the end once a removal failed
+        self.due = end
+        self.attempts = 0
+    
+    @property
+    def key(self) -> tuple:
+        """
+        Returns the key of the grant.
+        
+        Returns:
+            tuple: The platform, role and user of the grant.
+        """
+        return self.platform, self.role, self.user
+
+
+class GrantStore:
+    """
+    A durable store for role grants. The grants are kept in a dictionary keyed by (platform, role, user), which makes
+    membership checks O(1). The expiry times are kept in a heap, which makes adding a grant and taking the next expired
+    grant O(log n). Removed or replaced grants stay in the heap until they reach its top and are skipped there.
+    
+    An expired grant stays in the store until its role was removed. If the removal fails, the grant is retried after a
+    backoff, which doubles with every failure up to `max_backoff` seconds.
+    
+    Every change increases the version, and the store is saved off the event loop by `save_grants_async`, so a change
+    costs no disk I/O. All changes in between two saves are coalesced into one.
+    
+    Args:
+        config (dict): The configuration dictionary.
+        logger (logging.Logger): The logger.
+    """
+    ROLE_MODERATOR = "moderator"
+    ROLE_VIP = "vip"
+    # the reward tasks which grant a role, for the legacy import
+    ROLE_TASKS = {
+        ROLE_MODERATOR: "twitch_moderator",
+        ROLE_VIP: "twitch_vip",
+    }
+    
+    def __init__(self, config: dict, logger: logging.Logger):
+        self.config = config
+        self.logger = logger
+        self.grants = {}
+        self.expiry = []
+        self.path_grants = 'Modules/data/grants.xml'
+        self.backoff = 60
+        self.max_backoff = 3600
+        
+        self.version = 0
+        self.saved_version = 0
+        self.changed_time = 0
+        self.dirty_time = None
+        self.saving = False
+        self.last_save_duration = 0
+        self.path_legacy = {
+            self.ROLE_MODERATOR: 'Twitch/data/rewards/moderators.txt',
+            self.ROLE_VIP: 'Twitch/data/rewards/vips.txt',
+        }
+        
+        self.load_grants()
+    
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.grants
+    
+    def __len__(self) -> int:
+        return len(self.grants)
+    
+    def _touch(self) -> None:
+        """
+        Marks the store as changed, so the next backup saves it.
+        """
+        self.version += 1
+        self.changed_time = time.time()
+        if self.dirty_time is None:
+            self.dirty_time = self.changed_time
+    
+    def is_dirty(self) -> bool:
+        """
+        Checks if the store has changed since the last save.
+        
+        Returns:
+            bool: True if the store has unsaved changes, False if not.
+        """
+        return self.version != self.saved_version
+    
+    def has_grant(self, platform: str, role: str, user: str) -> bool:
+        """
+        Checks if a user has a role grant.
+        
+        Args:
+            platform (str): The platform of the role.
+            role (str): The role.
+            user (str): The user.
+        
+        Returns:
+            bool: True if the user has the role grant, False if not.
+        """
+        return (platform, role, user.lower()) in self.grants
+    
+    def add_grant(self, platform: str, role: str, user: str, duration: int = None) -> Grant:
+        """
+        Adds a role grant. An existing grant of the same role for the same user is replaced.
+        
+        Args:
+            platform (str): The platform of the role.
+            role (str): The role.
+            user (str): The user.
+            duration (int): The duration of the grant in seconds, or None if the grant does not expire.
+        
+        Returns:
+            Grant: The added grant.
+        """
+        start = time.time()
+        end = start + int(duration) if duration is not None else None
+        grant = Grant(platform, role, user.lower(), start, end)
+        self._insert(grant)
+        self._touch()
+        self.logger.info(f'Adding Grant | {platform} | {role} | {grant.user} | Expires: {self._format(end)}')
+        return grant
+    
+    def remove_grant(self, platform: str, role: str, user: str) -> Grant | None:
+        """
+        Removes a role grant. Its entry in the expiry heap is skipped once it reaches the top.
+        
+        Args:
+            platform (str): The platform of the role.
+            role (str): The role.
+            user (str): The user.
+        
+        Returns:
+            Grant | None: The removed grant, or None if the user had no such grant.
+        """
+        grant = self.grants.pop((platform, role, user.lower()), None)
+        if grant is not None:
+            self._touch()
+            self.logger.info(f'Removing Grant | {platform} | {role} | {grant.user}')
+            self._compact()
+        return grant
+    
+    def next_expired(self, now: float = None) -> Grant | None:
+        """
+        Returns the next grant which is due for removal, without removing it. Only the expired part of the heap is
+        visited. The caller removes the role and then calls `complete` or `retry`, so a grant is never lost if the
+        removal fails.
+        
+        Args:
+            now (float): The current timestamp. Defaults to `time.time()`.
+        
+        Returns:
+            Grant | None: The next expired grant, or None if no grant is due.
+        """
+        now = time.time() if now is None else now
+        while self.expiry and self.expiry[0][0] <= now:
+            due, _, key = self.expiry[0]
+            grant = self.grants.get(key)
+            if grant is not None and grant.due == due:
+                return grant
+            # a removed, replaced or rescheduled grant
+            heapq.heappop(self.expiry)
+        return None
+    
+    def complete(self, grant: Grant) -> None:
+        """
+        Removes an expired grant once its role was removed.
+        
+        Args:
+            grant (Grant): The grant.
+        """
+        if self.grants.get(grant.key) is grant:
+            del self.grants[grant.key]
+            self._touch()
+            self._compact()
+    
+    def retry(self, grant: Grant, now: float = None) -> float:
+        """
+        Reschedules an expired grant whose role could not be removed. The backoff doubles with every failure.
+        
+        Args:
+            grant (Grant): The grant.
+            now (float): The current timestamp. Defaults to `time.time()`.
+        
+        Returns:
+            float: The time of the next attempt.
+        """
+        now = time.time() if now is None else now
+        grant.attempts += 1
+        grant.due = now + min(self.backoff * 2 ** (grant.attempts - 1), self.max_backoff)
+        if self.grants.get(grant.key) is grant:
+            heapq.heappush(self.expiry, (grant.due, grant.start, grant.key))
+            self._compact()
+        return grant.due
+    
+    def get_grants(self, page: int = 1, size: int = 25, platform: str = None, role: str = None) -> tuple:
+        """
+        Gets a page of the active grants, ordered by their expiry time. Grants which do not expire are listed last.
+        
+        Args:
+            page (int): The page number, starting at 1.
+            size (int): The number of grants per page.
+            platform (str): Only list grants of this platform. Defaults to all platforms.
+            role (str): Only list grants of this role. Defaults to all roles.
+        
+        Returns:
+            tuple: The list of grants on the page and the total number of pages.
+        """
+        grants = [
+            g for g in self.grants.values()
+            if (platform is None or g.platform == platform) and (role is None or g.role == role)
+        ]
+        grants.sort(key=lambda g: (g.end is None, g.end or 0, g.start))
+        
+        pages = max(1, -(-len(grants) // size))
+        page = min(max(1, page), pages)
+        return grants[(page - 1) * size:page * size], pages
+    
+    def _insert(self, grant: Grant) -> None:
+        """
+        Inserts a grant into the indexes.
+        
+        Args:
+            grant (Grant): The grant to insert.
+        """
+        self.grants[grant.key] = grant
+        if grant.due is not None:
+            heapq.heappush(self.expiry, (grant.due, grant.start, grant.key))
+        self._compact()
+    
+    def _compact(self) -> None:
+        """
+        Rebuilds the expiry heap once more than half of its entries belong to removed or replaced grants.
+        """
+        if len(self.expiry) > 2 * len(self.grants) + 64:
+            self.expiry = [(g.due, g.start, g.key) for g in self.grants.values() if g.due is not None]
+            heapq.heapify(self.expiry)
+    
+    @staticmethod
+    def _format(timestamp: float | None) -> str:
+        """
+        Formats a timestamp for logging.
+        
+        Args:
+            timestamp (float | None): The timestamp.
+        
+        Returns:
+            str: The formatted timestamp, or "Never" if there is no timestamp.
+        """
+        if timestamp is None:
+            return 'Never'
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+    
+    def load_grants(self) -> None:
+        """
+        Loads the grants from an XML file. If there is no XML file yet, the grants of the legacy text files are
+        imported once.
+        """
+        if os.path.exists(self.path_grants):
+            root = ET.parse(self.path_grants).getroot()
+            for element in root:
+                end = element.get("end")
+                self._insert(Grant(
+                    element.get("platform"),
+                    element.get("role"),
+                    element.get("user"),
+                    float(element.get("start")),
+                    float(end) if end is not None else None
+                ))
+            self.logger.info(f'Loaded Grants | {len(self.grants)}')
+        
+        else:
+            if not os.path.exists('Modules/data/'):
+                os.makedirs('Modules/data/')
+            self._import_legacy()
+            self.save_grants()
+            self.logger.info(f'Initialized Grants | {len(self.grants)}')
+    
+    def _import_legacy(self) -> None:
+        """
+        Imports the grants of the legacy `time|user|end` text files. A line without an end expires after the time of
+        the reward which grants the role, like the old expiry check did. If there is no such reward, the grant expires
+        right away.
+        """
+        durations = {
+            rwd['task'].lower(): rwd.get('time')
+            for rwd in self.config.get('twitch', {}).get('rewards', [])
+            if 'task' in rwd
+        }
+        for role, path in self.path_legacy.items():
+            if not os.path.exists(path):
+                continue
+            duration = durations.get(self.ROLE_TASKS[role])
+            with open(path, 'r') as f:
+                for number, line in enumerate(f, 1):
+                    parts = line.strip().split('|')
+                    if len(parts) < 2:
+                        continue
+                    try:
+                        start = time.mktime(time.strptime(parts[0], '%Y-%m-%d %H:%M:%S'))
+                    except ValueError:
+                        self.logger.warning(f'Skipped legacy Grant | {path}:{number} | Invalid time: {parts[0]}')
+                        continue
+                    try:
+                        end = time.mktime(time.strptime(parts[2], '%Y-%m-%d %H:%M:%S'))
+                    except (IndexError, ValueError):
+                        if duration is not None:
+                            end = start + int(duration)
+                        else:
+                            end = time.time()
+                            self.logger.warning(f'Imported Grant without expiry | {role} | {parts[1]} | Expires now')
+                    self._insert(Grant('twitch', role, parts[1].lower(), start, end))
+            self.logger.info(f'Imported Grants | {path}')
+    
+    def save_grants(self) -> None:
+        """
+        Saves the grants to an XML file.
+        """
+        version = self.version
+        self.dirty_time = None
+        self._write_grants(self._snapshot())
+        self.saved_version = version
+    
+    async def save_grants_async(self) -> None:
+        """
+        Saves the grants to an XML file without blocking the event loop. The grants are copied on the event loop, and
+        the XML serialization and the file write run in a worker thread. Changes which are made while the file is
+        written are saved by the next call.
+        """
+        if self.saving:
+            return
+        
+        self.saving = True
+        version = self.version
+        dirty_time, self.dirty_time = self.dirty_time, None
+        snapshot = self._snapshot()
+        start_time = time.time()
+        try:
+            await asyncio.to_thread(self._write_grants, snapshot)
+            self.saved_version = version
+            self.last_save_duration = time.time() - start_time
+        except BaseException:
+            # the store is still dirty since the first unsaved change, so the next backup is not delayed further
+            self.dirty_time = dirty_time
+            raise
+        finally:
+            self.saving = False
+    
+    def _snapshot(self) -> list:
+        """
+        Copies the grants, so the copy can be serialized while the store keeps changing.
+        
+        Returns:
+            list: The copied grants.
+        """
+        return [(g.platform, g.role, g.user, g.start, g.end) for g in self.grants.values()]
+    
+    def _write_grants(self, grants: list) -> None:
+        """
+        Writes copied grants to the XML file. The file is written to a temporary file first and then renamed, so a
+        crash never leaves a partially written file behind.
+        
+        Args:
+            grants (list): The copied grants.
+        """
+        root = ET.Element("GrantData")
+        for platform, role, user, start, end in grants:
+            element = ET.SubElement(root, "Grant")
+            element.set("platform", platform)
+            element.set("role", role)
+            element.set("user", user)
+            element.set("start", str(start))
+            if end is not None:
+                element.set("end", str(end))
+        
+        ET.indent(root, space="    ")
+        path_tmp = f'{self.path_grants}.tmp'
+        ET.ElementTree(root).write(path_tmp, encoding='utf-8', xml_declaration=True)
+        os.replace(path_tmp, self.path_grants)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides the statistics of the Discord guild. The counters are seeded once the bot is ready and kept
+    up to date by the gateway events, so the web server never has to walk the guild to show them.
+
+"""
+import collections
+import threading
+import time
+
+
+class GuildStats:
+    """
+    The statistics of the Discord guild. The counters are seeded from the cached guild once the bot is ready, and every
+    gateway event of the guild adds to or sets a counter, e.g. a member join or a deleted role. Every change increases
+    the version, so the web server can tell whether the statistics changed since a client last asked.
+    
+    The member count is also kept as a time series, with one point per `interval` seconds. The point of the current
+    interval is updated in place, so the series holds the member count at the end of every interval, for the last
+    `history` intervals. An interval without events gets the member count of the interval before, so the points are
+    evenly spaced in time.
+    
+    Args:
+        config (dict): The configuration dictionary.
+    """
+    COUNTERS = ('members', 'boosters', 'channels', 'roles', 'emojis', 'stickers')
+    
+    def __init__(self, config: dict):
+        self.config = config
+        stats = self.config['discord'].get('stats', {})
+        self.interval = stats.get('interval', 3600)
+        self.series = collections.deque(maxlen=stats.get('history', 168))
+        
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.loaded = False
+        self.version = 0
+        self.changed_time = 0
+        self.events = 0
+    
+    def seed(self, guild) -> None:
+        """
+        Sets all counters from a guild. It is called whenever the bot is ready, so the counters are corrected after a
+        reconnect, in which events may have been missed.
+        
+        Args:
+            guild (discord.Guild): The cached guild.
+        """
+        with self.lock:
+            self.counters = {
+                'members': guild.member_count or 0,
+                'boosters': guild.premium_subscription_count or 0,
+                'channels': len(guild.channels),
+                'roles': len(guild.roles),
+                'emojis': len(guild.emojis),
+                'stickers': len(guild.stickers),
+            }
+            self.loaded = True
+            self._touch()
+    
+    def add(self, name: str, delta: int = 1) -> None:
+        """
+        Adds to a counter, e.g. one member for a member join.
+        
+        Args:
+            name (str): The name of the counter.
+            delta (int): The value to add, negative to subtract.
+        """
+        with self.lock:
+            self.counters[name] = max(0, self.counters[name] + delta)
+            self.events += 1
+            self._touch()
+    
+    def set(self, name: str, value: int) -> None:
+        """
+        Sets a counter, e.g. the number of emojis after the emojis of the guild were updated.
+        
+        Args:
+            name (str): The name of the counter.
+            value (int): The value.
+        """
+        with self.lock:
+            self.events += 1
+            if self.counters[name] != value:
+                self.counters[name] = value
+                self._touch()
+    
+    def _touch(self) -> None:
+        """
+        Marks the statistics as changed and records the member count in the time series.
+        """
+        self.version += 1
+        self.changed_time = time.time()
+        
+        point = self._fill(self.changed_time)
+        if self.series and self.series[-1][0] == point:
+            self.series[-1] = (point, self.counters['members'])
+        else:
+            self.series.append((point, self.counters['members']))
+    
+    def _fill(self, now: float) -> int:
+        """
+        Fills the intervals without events up to the current interval with the last member count.
+        
+        Args:
+            now (float): The current time in epoch seconds.
+        
+        Returns:
+            int: The start of the current interval in epoch seconds.
+        """
+        point = int(now // self.interval * self.interval)
+        if self.series:
+            last, members = self.series[-1]
+            # older intervals would be dropped from the full series anyway
+            start = max(last + self.interval, point - self.interval * self.series.maxlen)
+            for missing in range(start, point, self.interval):
+                self.series.append((missing, members))
+        return point
+    
+    def stats(self) -> dict:
+        """
+        Returns the statistics.
+        
+        Returns:
+            dict: The counters, whether they are seeded, and the member count time series as `(time, members)` points.
+        """
+        with self.lock:
+            point = self._fill(time.time())
+            if self.series and self.series[-1][0] < point:
+                self.series.append((point, self.series[-1][1]))
+            return dict(self.counters, loaded=self.loaded, events=self.events, series=list(self.series))
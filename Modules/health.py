@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides a background health monitor for the Luna API. It pings the Luna API at a fixed interval, keeps
+    a rolling history of the latencies and publishes a snapshot of the status, which the web server only has to read.
+
+"""
+import asyncio
+import collections
+import time
+
+import aiohttp
+
+from Modules.luna import Luna, CircuitOpenError
+
+
+class LunaHealth:
+    """
+    A background health monitor for the Luna API. Every `interval` seconds the Luna API is pinged through the shared
+    client, so a check never takes longer than the client timeouts. The latency of every check, or None for a failed
+    check, is kept in a rolling history. After every check a new snapshot is published, which is a plain dictionary and
+    can be read from any thread.
+    
+    Args:
+        logger (ValkyrieLogger): The logger.
+        config (dict): The configuration dictionary.
+    """
+    def __init__(self, logger, config: dict):
+        self.config = config
+        self.logger = logger
+        self.luna = Luna(self.logger, self.config)
+        
+        health = self.config['luna'].get('health', {})
+        self.history = collections.deque(maxlen=health.get('history', 60))
+        self.degraded = health.get('degraded', 1000)
+        
+        self.server_time = 0
+        self.version = 0
+        self.snapshot = self._snapshot()
+    
+    @property
+    def interval(self) -> float:
+        """
+        Returns the check interval in seconds. It is read on every check, so changes in the settings apply at once.
+        
+        Returns:
+            float: The check interval.
+        """
+        return self.config['luna']['interval']
+    
+    async def run(self) -> None:
+        """
+        Checks the Luna API forever. This coroutine is meant to be owned by the supervisor.
+        """
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+    
+    async def check(self) -> None:
+        """
+        Pings the Luna API once, records the latency and publishes a new snapshot.
+        """
+        latency = None
+        try:
+            data, latency = await self.luna.client.post(self.luna._pingUrl(), {})
+            if isinstance(data, dict) and 'Timestamp' in data:
+                self.server_time = data['Timestamp']
+            self.logger.info(f'Luna Health | Latency: {latency}ms')
+        
+        except CircuitOpenError:
+            self.logger.warning('Luna Health | Circuit is open')
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.logger.error(f'Luna Health | Failed to make the request: {str(e)}')
+        
+        self.history.append((time.time(), latency))
+        self.snapshot = self._snapshot()
+        self.version += 1
+    
+    def _snapshot(self) -> dict:
+        """
+        Builds the snapshot of the current status and the latency history.
+        
+        Returns:
+            dict: The snapshot.
+        """
+        latencies = [latency for _, latency in self.history if latency is not None]
+        last = self.history[-1] if self.history else (0, None)
+        if last[1] is None:
+            status = 'OFFLINE' if self.history else 'UNKNOWN'
+        elif last[1] > self.degraded:
+            status = 'DEGRADED'
+        else:
+            status = 'ONLINE'
+        
+        return {
+            'status': status,
+            'ping': last[1] or 0,
+            'avg': int(sum(latencies) / len(latencies)) if latencies else 0,
+            'min': min(latencies, default=0),
+            'max': max(latencies, default=0),
+            'uptime': int(len(latencies) / len(self.history) * 100) if self.history else 0,
+            'checks': len(self.history),
+            'checked': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last[0])) if self.history else 'N/A',
+            'server_time': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.server_time)) if self.server_time else 'N/A',
+            'history': [latency or 0 for _, latency in self.history],
+        }
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides an incremental index of the log file for the web server. The log file is followed by its byte
+    offset, so only newly appended lines are parsed, and the latest entries are kept in a bounded ring buffer.
+
+"""
+import collections
+import itertools
+import os
+import threading
+
+
+class LogIndex:
+    """
+    An incremental index of the log file. The first refresh only reads the tail of the file, back to the last boot
+    banner or until the ring buffer is full, so a large log file is never read as a whole. Every further refresh reads
+    from the last byte offset to the end of the file and parses only the new lines. A line which is still being written
+    is kept back until it is complete. If the log file is rotated or truncated, the index starts over at the beginning
+    of the new file.
+    
+    Args:
+        path (str): The path of the log file.
+        marker (str): The message of the boot banner. Entries before the last banner are dropped.
+        skip (str): A message which is not indexed, e.g. the border of the banner.
+        size (int): The maximum number of entries kept in the ring buffer.
+    """
+    BLOCK_SIZE = 65536
+    
+    def __init__(self, path: str, marker: str = None, skip: str = None, size: int = 5000):
+        self.path = path
+        self.marker = marker
+        self.skip = skip
+        self.size = size
+        
+        self.entries = collections.deque(maxlen=self.size)
+        self.lock = threading.Lock()
+        self.offset = None
+        self.inode = None
+        
+        self.lines = 0
+        self.resets = 0
+    
+    @staticmethod
+    def parse(line: str, offset: int = 0) -> dict | None:
+        """
+        Parses a log line of the form `time | level | file | line | method | b'message'`.
+        
+        Args:
+            line (str): The log line, without the line break.
+            offset (int): The byte offset of the line in the log file.
+        
+        Returns:
+            dict | None: The log entry, or None if the line is not a log entry, e.g. a line of a traceback.
+        """
+        data = line[:-1].replace("b'", '').replace('b"', '').split(' | ', 5)
+        if len(data) < 6:
+            return None
+        return {
+            'time': data[0],
+            'level': data[1],
+            'file': data[2],
+            'line': data[3],
+            'method': data[4],
+            'message': data[5],
+            'offset': offset,
+        }
+    
+    def _tail_offset(self, f, size: int) -> int:
+        """
+        Finds the offset to start indexing from. The file is read backwards in blocks until it contains the boot banner
+        or more lines than the ring buffer holds.
+        
+        Args:
+            f: The log file, opened in binary mode.
+            size (int): The size of the log file.
+        
+        Returns:
+            int: The offset of the first line to index.
+        """
+        marker = f"{self.marker}'".encode('utf-8') if self.marker else None
+        position = size
+        tail = b''
+        while position > 0:
+            step = min(self.BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            
+            if marker is not None:
+                found = tail.rfind(marker)
+                if found >= 0:
+                    end = tail.find(b'\n', found)
+                    return position + end + 1 if end >= 0 else size
+            
+            if tail.count(b'\n') > self.size:
+                # start after the newline which leaves `size` complete lines
+                cut = len(tail)
+                for _ in range(self.size + 1):
+                    cut = tail.rfind(b'\n', 0, cut)
+                return position + cut + 1
+        return 0
+    
+    def _reset(self) -> None:
+        """
+        Drops all entries, e.g. after a rotation or a truncation of the log file.
+        """
+        self.entries.clear()
+        self.offset = None
+        self.resets += 1
+    
+    def refresh(self) -> int:
+        """
+        Parses the lines appended since the last refresh.
+        
+        Returns:
+            int: The number of new entries.
+        """
+        with self.lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return 0
+            
+            if self.offset is not None and (stat.st_ino != self.inode or stat.st_size < self.offset):
+                self._reset()
+            
+            count = 0
+            with open(self.path, 'rb') as f:
+                # on the first refresh, or if far more was appended than the ring buffer holds, only the tail is read
+                if self.offset is None or stat.st_size - self.offset > self.BLOCK_SIZE * 256:
+                    self.entries.clear()
+                    self.inode = stat.st_ino
+                    self.offset = self._tail_offset(f, stat.st_size)
+                
+                f.seek(self.offset)
+                data = f.read(stat.st_size - self.offset)
+                end = data.rfind(b'\n')
+                if end < 0:
+                    return 0
+                
+                offset = self.offset
+                for raw in data[:end].split(b'\n'):
+                    line_offset = offset
+                    offset += len(raw) + 1
+                    entry = self.parse(raw.decode('utf-8', errors='replace').rstrip('\r'), line_offset)
+                    if entry is None:
+                        continue
+                    if entry['message'] == self.marker:
+                        self.entries.clear()
+                        continue
+                    if entry['message'] == self.skip:
+                        continue
+                    self.entries.append(entry)
+                    count += 1
+                
+                self.offset += end + 1
+                self.lines += count
+            return count
+    
+    def tail(self, n: int = None) -> list:
+        """
+        Returns the latest entries, after parsing the lines appended since the last refresh.
+        
+        Args:
+            n (int): The number of entries, or None for all entries in the ring buffer.
+        
+        Returns:
+            list: A list of log entries, oldest first.
+        """
+        self.refresh()
+        with self.lock:
+            if n is None or n >= len(self.entries):
+                return list(self.entries)
+            return list(itertools.islice(self.entries, len(self.entries) - max(n, 0), None))
+    
+    def stats(self) -> dict:
+        """
+        Returns the index metrics.
+        
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        return {
+            'entries': len(self.entries),
+            'offset': self.offset or 0,
+            'lines': self.lines,
+            'resets': self.resets,
+        }
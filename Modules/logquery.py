@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides a filtered, paginated query of the log file. A compact index on disk stores the byte offset,
+    the time and the level of every log line, so a page of results is found without reading the whole log file.
+
+"""
+import os
+import struct
+import threading
+import time
+
+from Modules.logindex import LogIndex
+
+
+class LogQuery:
+    """
+    A filtered, paginated query of the log file. The log file is indexed into a binary file next to it, with a header of
+    the inode and the covered size of the log file, followed by one record of 13 bytes per log line: the byte offset,
+    the time in epoch seconds and the level. The index is updated incrementally, and rebuilt if the log file is rotated
+    or truncated.
+    
+    A query walks the records from the newest to the oldest. The level and the time range are filtered on the records
+    alone, and only the matching lines are read from the log file to filter by file, method and substring. A page ends
+    after `limit` entries or `scan` records, and returns the offset to continue from as the cursor of the next page.
+    
+    Args:
+        path (str): The path of the log file.
+        index_path (str): The path of the index file. Defaults to the log file path with the extension `.idx`.
+        scan (int): The maximum number of records scanned by one query.
+    """
+    HEADER = struct.Struct('<4sQQ')
+    RECORD = struct.Struct('<QIB')
+    MAGIC = b'VLX1'
+    CHUNK = 8388608
+    LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+    
+    def __init__(self, path: str, index_path: str = None, scan: int = 50000):
+        self.path = path
+        self.index_path = index_path or f'{os.path.splitext(path)[0]}.idx'
+        self.scan = scan
+        
+        self.lock = threading.Lock()
+        self.inode = None
+        self.covered = 0
+        self.records = 0
+        self.minutes = {}
+        self._load()
+    
+    def _load(self) -> None:
+        """
+        Loads the header of the index file. A missing or invalid index file is created empty.
+        """
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                header = f.read(self.HEADER.size)
+            if len(header) == self.HEADER.size:
+                magic, inode, covered = self.HEADER.unpack(header)
+                records = (os.path.getsize(self.index_path) - self.HEADER.size) // self.RECORD.size
+                if magic == self.MAGIC and (records == 0 or self._last_offset(records) < covered):
+                    self.inode, self.covered, self.records = inode, covered, records
+                    return
+        self._clear(None)
+    
+    def _last_offset(self, records: int) -> int:
+        """
+        Returns the log offset of the last record. An index whose records reach past its covered size was interrupted
+        while it was written, and is rebuilt.
+        
+        Args:
+            records (int): The number of records.
+        
+        Returns:
+            int: The offset.
+        """
+        with open(self.index_path, 'rb') as f:
+            return self._record(f, records - 1)[0]
+    
+    def _clear(self, inode: int | None) -> None:
+        """
+        Empties the index file.
+        
+        Args:
+            inode (int | None): The inode of the log file.
+        """
+        folder = os.path.dirname(self.index_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(self.index_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, inode or 0, 0))
+        self.inode, self.covered, self.records = inode, 0, 0
+    
+    def _epoch(self, stamp: str) -> int:
+        """
+        Converts the time of a log line to epoch seconds. The conversion of every minute is cached, as the log lines
+        of the same minute only differ in their seconds.
+        
+        Args:
+            stamp (str): The time of a log line, e.g. `2023-11-10 12:34:56,789`.
+        
+        Returns:
+            int: The epoch seconds, or 0 if the time can not be parsed.
+        """
+        minute = stamp[:16]
+        base = self.minutes.get(minute)
+        if base is None:
+            try:
+                base = int(time.mktime(time.strptime(minute, '%Y-%m-%d %H:%M')))
+            except ValueError:
+                return 0
+            if len(self.minutes) > 4096:
+                self.minutes.clear()
+            self.minutes[minute] = base
+        try:
+            return base + int(stamp[17:19])
+        except ValueError:
+            return base
+    
+    def refresh(self, budget: int = None) -> int:
+        """
+        Indexes the lines appended to the log file since the last refresh.
+        
+        Args:
+            budget (int): The maximum number of bytes to index, or None to index everything.
+        
+        Returns:
+            int: The number of new records.
+        """
+        count = 0
+        while budget is None or budget > 0:
+            with self.lock:
+                try:
+                    stat = os.stat(self.path)
+                except FileNotFoundError:
+                    return count
+                if stat.st_ino != self.inode or stat.st_size < self.covered:
+                    self._clear(stat.st_ino)
+                
+                size = min(self.CHUNK, stat.st_size - self.covered, budget if budget is not None else self.CHUNK)
+                if size <= 0:
+                    return count
+                with open(self.path, 'rb') as f:
+                    f.seek(self.covered)
+                    data = f.read(size)
+                end = data.rfind(b'\n')
+                if end < 0:
+                    if size < self.CHUNK:
+                        return count
+                    end = len(data) - 1
+                
+                records = []
+                offset = self.covered
+                for raw in data[:end].split(b'\n'):
+                    line_offset = offset
+                    offset += len(raw) + 1
+                    parts = raw.split(b' | ', 2)
+                    if len(parts) < 3:
+                        continue
+                    level = self.LEVELS.get(parts[1].decode('ascii', errors='replace'), 0)
+                    records.append(self.RECORD.pack(line_offset, self._epoch(parts[0].decode('ascii', errors='replace')), level))
+                
+                with open(self.index_path, 'r+b') as f:
+                    f.seek(self.HEADER.size + self.records * self.RECORD.size)
+                    f.write(b''.join(records))
+                    f.seek(0)
+                    f.write(self.HEADER.pack(self.MAGIC, self.inode, self.covered + end + 1))
+                
+                self.covered += end + 1
+                self.records += len(records)
+                count += len(records)
+                if budget is not None:
+                    budget -= end + 1
+        return count
+    
+    def _record(self, f, position: int) -> tuple:
+        """
+        Reads one record of the index.
+        
+        Args:
+            f: The index file, opened in binary mode.
+            position (int): The position of the record.
+        
+        Returns:
+            tuple: The offset, time and level of the record.
+        """
+        f.seek(self.HEADER.size + position * self.RECORD.size)
+        return self.RECORD.unpack(f.read(self.RECORD.size))
+    
+    def _bisect(self, f, count: int, field: int, value: int) -> int:
+        """
+        Finds the position of the first record whose field is at least the value. The offsets of the records are
+        ascending, and so are their times, as the log file is written in order.
+        
+        Args:
+            f: The index file, opened in binary mode.
+            count (int): The number of records.
+            field (int): The field of the record, 0 for the offset and 1 for the time.
+            value (int): The value.
+        
+        Returns:
+            int: The position.
+        """
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if self._record(f, middle)[field] < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    @staticmethod
+    def parse_time(value: str | None) -> int | None:
+        """
+        Parses a time of a query, either epoch seconds or a local date and time like `2023-11-10 12:34`.
+        
+        Args:
+            value (str | None): The time.
+        
+        Returns:
+            int | None: The epoch seconds, or None if no time is given.
+        
+        Raises:
+            ValueError: If the time can not be parsed.
+        """
+        if not value:
+            return None
+        if value.isdigit():
+            return int(value)
+        for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+            try:
+                return int(time.mktime(time.strptime(value, fmt)))
+            except ValueError:
+                continue
+        raise ValueError(f'Invalid time: {value}')
+    
+    @classmethod
+    def level(cls, name: str | None) -> int:
+        """
+        Returns the numeric value of a level name.
+        
+        Args:
+            name (str | None): The level name, e.g. `warning`.
+        
+        Returns:
+            int: The numeric level, or 0 for no level.
+        """
+        return cls.LEVELS.get((name or '').upper(), 0)
+    
+    def query(self, cursor: int = None, limit: int = 100, level: str = None, file: str = None, method: str = None,
+              since: int = None, until: int = None, contains: str = None) -> dict:
+        """
+        Queries the log entries from the newest to the oldest.
+        
+        Args:
+            cursor (int): The cursor of the previous page, only entries before it are returned. None for the first page.
+            limit (int): The maximum number of entries.
+            level (str): The minimum level of the entries, e.g. `warning` for warnings, errors and critical errors.
+            file (str): The source file of the entries.
+            method (str): The method of the entries.
+            since (int): The earliest time of the entries in epoch seconds.
+            until (int): The latest time of the entries in epoch seconds.
+            contains (str): A case insensitive substring of the messages.
+        
+        Returns:
+            dict: The entries, and the cursor of the next page, which is None on the last page.
+        """
+        # the index catches up a bit on every query, the rest is indexed by the next queries or by the background build
+        self.refresh(self.CHUNK)
+        minimum = self.level(level)
+        contains = contains.casefold() if contains else None
+        entries = []
+        
+        with self.lock:
+            count = self.records
+            with open(self.index_path, 'rb') as idx, open(self.path, 'rb') as log:
+                position = count if cursor is None else self._bisect(idx, count, 0, cursor)
+                if until is not None:
+                    position = min(position, self._bisect(idx, count, 1, until + 1))
+                stop = max(0, position - self.scan)
+                
+                while position > stop and len(entries) < limit:
+                    start = max(stop, position - 4096)
+                    idx.seek(self.HEADER.size + start * self.RECORD.size)
+                    block = list(self.RECORD.iter_unpack(idx.read((position - start) * self.RECORD.size)))
+                    
+                    for i in range(len(block) - 1, -1, -1):
+                        offset, stamp, lvl = block[i]
+                        position = start + i
+                        if since is not None and stamp < since:
+                            return {'entries': entries, 'cursor': None}
+                        if lvl < minimum:
+                            continue
+                        
+                        log.seek(offset)
+                        entry = LogIndex.parse(log.readline().decode('utf-8', errors='replace').rstrip('\r\n'), offset)
+                        if entry is None:
+                            continue
+                        if file is not None and entry['file'] != file:
+                            continue
+                        if method is not None and entry['method'] != method:
+                            continue
+                        if contains is not None and contains not in entry['message'].casefold():
+                            continue
+                        
+                        entries.append(entry)
+                        if len(entries) >= limit:
+                            break
+                    else:
+                        position = start
+                
+                # the offset of the last scanned record is the cursor of the entries before it
+                cursor = self._record(idx, position)[0] if position > 0 else None
+        
+        return {'entries': entries, 'cursor': cursor}
+    
+    def stats(self) -> dict:
+        """
+        Returns the index metrics.
+        
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        return {
+            'records': self.records,
+            'covered': self.covered,
+            'index_bytes': self.HEADER.size + self.records * self.RECORD.size,
+        }
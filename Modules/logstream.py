@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides live log streaming for the web server. One follower thread reads the newly appended log lines
+    and fans them out to the connected subscribers, which receive them as Server-Sent Events.
+
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+
+from Modules.logindex import LogIndex
+from Modules.logquery import LogQuery
+
+
+class LogStreamFull(Exception):
+    """
+    Raised if the maximum number of subscribers is connected.
+    """
+    pass
+
+
+class Subscriber:
+    """
+    A client of the log stream.
+    
+    Args:
+        level (int): The minimum numeric level of the entries.
+        size (int): The maximum number of entries waiting to be sent.
+    """
+    def __init__(self, level: int, size: int):
+        self.level = level
+        self.queue = queue.Queue(maxsize=size)
+        self.closed = False
+    
+    def push(self, entry: dict) -> None:
+        """
+        Queues an entry if it passes the level filter. A subscriber which can not keep up is closed, and resumes from
+        its last event once it reconnects.
+        
+        Args:
+            entry (dict): The log entry.
+        """
+        if LogQuery.level(entry['level']) < self.level:
+            return
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.closed = True
+
+
+class LogStream:
+    """
+    Live log streaming. A single follower thread refreshes the shared log index and pushes the new entries to every
+    subscriber, so the log file is read once no matter how many clients watch it. The follower only runs while at least
+    one subscriber is connected. The id of every event is the byte offset of its line, which a client can send back as
+    its cursor to resume after a reconnect. Entries after the cursor are replayed from the ring buffer of the log index.
+    
+    Args:
+        log_index (LogIndex): The log index.
+        subscribers (int): The maximum number of connected subscribers.
+        interval (float): The polling interval of the follower in seconds.
+        keepalive (float): The interval of keep-alive comments in seconds, which also detect closed connections.
+    """
+    def __init__(self, log_index: LogIndex, subscribers: int = 4, interval: float = 0.5, keepalive: float = 15):
+        self.log_index = log_index
+        self.max_subscribers = subscribers
+        self.interval = interval
+        self.keepalive = keepalive
+        
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.offset = -1
+        self.resets = 0
+        self.sent = 0
+    
+    def _new_entries(self, after: int) -> list:
+        """
+        Returns the entries of the ring buffer after an offset.
+        
+        Args:
+            after (int): The byte offset.
+        
+        Returns:
+            list: A list of log entries, oldest first.
+        """
+        with self.log_index.lock:
+            entries = []
+            for entry in reversed(self.log_index.entries):
+                if entry['offset'] <= after:
+                    break
+                entries.append(entry)
+        entries.reverse()
+        return entries
+    
+    def subscribe(self, cursor: int = None, level: int = 0) -> Subscriber:
+        """
+        Connects a subscriber. If a cursor is given, the entries after it are queued first.
+        
+        Args:
+            cursor (int): The offset of the last entry the client received, or None to receive new entries only.
+            level (int): The minimum numeric level of the entries.
+        
+        Returns:
+            Subscriber: The subscriber.
+        
+        Raises:
+            LogStreamFull: If the maximum number of subscribers is connected.
+        """
+        with self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                raise LogStreamFull(f'{self.max_subscribers} subscribers are connected')
+            
+            if self.thread is None:
+                self.log_index.refresh()
+                self.offset = self.log_index.entries[-1]['offset'] if self.log_index.entries else -1
+                self.resets = self.log_index.resets
+            
+            subscriber = Subscriber(level, self.log_index.size)
+            if cursor is not None:
+                for entry in self._new_entries(cursor):
+                    if entry['offset'] <= self.offset:
+                        subscriber.push(entry)
+            self.subscribers.add(subscriber)
+            
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._follow, name='LogStream', daemon=True)
+                self.thread.start()
+            return subscriber
+    
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """
+        Disconnects a subscriber.
+        
+        Args:
+            subscriber (Subscriber): The subscriber.
+        """
+        with self.lock:
+            self.subscribers.discard(subscriber)
+            subscriber.closed = True
+    
+    def _follow(self) -> None:
+        """
+        Pushes the new entries to the subscribers until none is connected anymore.
+        """
+        while True:
+            time.sleep(self.interval)
+            self.log_index.refresh()
+            with self.lock:
+                if not self.subscribers:
+                    self.thread = None
+                    return
+                
+                # the log file was rotated or truncated, all entries of the index are new
+                if self.log_index.resets != self.resets:
+                    self.resets = self.log_index.resets
+                    self.offset = -1
+                
+                entries = self._new_entries(self.offset)
+                if entries:
+                    self.offset = entries[-1]['offset']
+                for subscriber in self.subscribers:
+                    for entry in entries:
+                        subscriber.push(entry)
+                self.sent += len(entries)
+    
+    @staticmethod
+    def event(entry: dict) -> str:
+        """
+        Formats a log entry as a Server-Sent Event.
+        
+        Args:
+            entry (dict): The log entry.
+        
+        Returns:
+            str: The event.
+        """
+        return f'id: {entry["offset"]}\nevent: log\ndata: {json.dumps(entry)}\n\n'
+    
+    def events(self, subscriber: Subscriber):
+        """
+        Yields the Server-Sent Events of a subscriber until it is closed. The subscriber is disconnected once the
+        client closes the connection.
+        
+        Args:
+            subscriber (Subscriber): The subscriber.
+        
+        Yields:
+            str: An event, or a keep-alive comment.
+        """
+        try:
+            yield f'retry: {int(self.interval * 2000)}\n\n'
+            while not subscriber.closed:
+                try:
+                    entry = subscriber.queue.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield self.event(entry)
+        finally:
+            self.unsubscribe(subscriber)
+    
+    async def stream(self, subscriber: Subscriber):
+        """
+        Yields the Server-Sent Events of a subscriber on the event loop until it is closed. The queue of the subscriber
+        is polled at the interval of the follower, so waiting for entries holds no thread.
+        
+        Args:
+            subscriber (Subscriber): The subscriber.
+        
+        Yields:
+            str: An event, or a keep-alive comment.
+        """
+        try:
+            yield f'retry: {int(self.interval * 2000)}\n\n'
+            idle = 0
+            while not subscriber.closed:
+                try:
+                    entry = subscriber.queue.get_nowait()
+                except queue.Empty:
+                    await asyncio.sleep(self.interval)
+                    idle += self.interval
+                    if idle >= self.keepalive:
+                        idle = 0
+                        yield ': keepalive\n\n'
+                    continue
+                idle = 0
+                yield self.event(entry)
+        finally:
+            self.unsubscribe(subscriber)
+    
+    def stats(self) -> dict:
+        """
+        Returns the stream metrics.
+        
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        return {
+            'subscribers': len(self.subscribers),
+            'max_subscribers': self.max_subscribers,
+            'sent': self.sent,
+        }
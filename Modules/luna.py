@@ -10,8 +10,584 @@ About:
     This script provides a class for Luna API requests. The Luna API is used to translate text and answer questions.
 
 """
+import asyncio
 import base64
-import requests
+import collections
+import contextlib
+import json
+import sqlite3
+import time
+from functools import partial
+
+import aiohttp
+
+from Modules.cache import TranslationCache
+from Modules.metrics import REGISTRY
+from Modules.quota import QuotaEngine
+
+LUNA_SECONDS = REGISTRY.histogram('valkyrie_luna_request_duration_seconds', 'The latency of the successful Luna API requests.')
+LUNA_REQUESTS = REGISTRY.counter('valkyrie_luna_requests_total', 'The requests of the Luna API by result.', ('result',))
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised if a request is rejected, because the circuit breaker of the Luna API is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker for the Luna API. After a number of failures in a row, the circuit opens and requests fail fast
+    instead of waiting for a backend which is slow or down. Once the reset time has passed, the circuit is half-open and
+    lets a single probe request through. A successful probe closes the circuit, a failed probe opens it again.
+    
+    Args:
+        logger (ValkyrieLogger): The logger.
+        threshold (int): The number of failures in a row which opens the circuit.
+        reset (float): The seconds after which an open circuit lets a probe request through.
+    """
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+    
+    def __init__(self, logger, threshold: int = 5, reset: float = 30):
+        self.logger = logger
+        self.threshold = threshold
+        self.reset = reset
+        
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.probing = False
+        self.trips = 0
+    
+    def allow(self) -> bool:
+        """
+        Checks if a request may be sent. In the half-open state, only the first request is let through as a probe.
+        
+        Returns:
+            bool: True if the request may be sent, False if it should fail fast.
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened < self.reset:
+                return False
+            self.state = self.HALF_OPEN
+            self.probing = False
+            self.logger.info(f'Luna | Circuit half-open')
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+    
+    def success(self) -> None:
+        """
+        Records a successful request, which closes the circuit.
+        """
+        if self.state != self.CLOSED:
+            self.logger.info(f'Luna | Circuit closed')
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probing = False
+    
+    def failure(self) -> None:
+        """
+        Records a failed request, which opens the circuit after too many failures in a row or after a failed probe.
+        """
+        self.failures += 1
+        self.probing = False
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.threshold):
+            self.state = self.OPEN
+            self.opened = time.monotonic()
+            self.trips += 1
+            self.logger.warning(f'Luna | Circuit opened | {self.failures} failures')
+    
+    def release(self) -> None:
+        """
+        Releases the probe of a half-open circuit, if it was cancelled before it could succeed or fail.
+        """
+        self.probing = False
+
+
+class LunaClient:
+    """
+    An asynchronous HTTP client for the Luna API. The client keeps one pooled keep-alive session, applies connect and
+    read timeouts to every request and bounds the number of concurrent requests. One client is shared by all `Luna`
+    instances which use the same Luna API.
+    
+    Args:
+        logger (ValkyrieLogger): The logger.
+        config (dict): The configuration dictionary.
+    """
+    def __init__(self, logger, config):
+        self.config = config
+        self.logger = logger
+        
+        self.connect_timeout = self.config['luna'].get('connect_timeout', 5)
+        self.read_timeout = self.config['luna'].get('read_timeout', 60)
+        self.concurrency = self.config['luna'].get('concurrency', 4)
+        
+        self.session = None
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.active = 0
+        
+        self.inflight = {}
+        self.requests = 0
+        self.deduplicated = 0
+        
+        breaker = self.config['luna'].get('breaker', {})
+        self.breaker = CircuitBreaker(self.logger, breaker.get('threshold', 5), breaker.get('reset', 30))
+        self.recent = collections.OrderedDict()
+        self.recent_size = breaker.get('recent', 256)
+        self.stale = 0
+        
+        hedge = self.config['luna'].get('hedge', {})
+        self.hedge = hedge.get('enabled', False)
+        self.hedge_percentile = hedge.get('percentile', 95)
+        self.hedge_min_samples = hedge.get('min_samples', 20)
+        self.hedged = 0
+        self.latencies = collections.deque(maxlen=500)
+    
+    def _session(self) -> aiohttp.ClientSession:
+        """
+        Returns the pooled session. The session is created on first use, because it has to be created inside the event
+        loop which runs the requests.
+        
+        Returns:
+            aiohttp.ClientSession: The session.
+        """
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=None, connect=self.connect_timeout, sock_read=self.read_timeout),
+            )
+        return self.session
+    
+    async def post(self, url: str, payload: dict, headers: dict = None, hedge: bool = False) -> tuple:
+        """
+        Sends a POST request to the Luna API. Requests wait for a free slot if the concurrency limit is reached. If
+        hedging is enabled for the client and the request, and the request takes longer than the configured latency
+        percentile, a second identical request is sent and the first response wins. Only idempotent requests, i.e.
+        translations, may be hedged, as both requests can reach the Luna API.
+        
+        Args:
+            url (str): The url.
+            payload (dict): The JSON payload.
+            headers (dict): The request headers.
+            hedge (bool): True if the request is idempotent and may be hedged.
+        
+        Returns:
+            tuple: The JSON response and the latency of the request in milliseconds.
+        
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            aiohttp.ClientError: If the request failed.
+            asyncio.TimeoutError: If the request timed out.
+        """
+        if not hedge or not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return await self._post(url, payload, headers)
+        
+        first = asyncio.ensure_future(self._post(url, payload, headers))
+        attempts = [first]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self.percentile(self.hedge_percentile) / 1000)
+            if not done:
+                self.hedged += 1
+                self.logger.info(f'Luna | Hedged request | {url}')
+                attempts.append(asyncio.ensure_future(self._post(url, payload, headers)))
+            
+            pending = set(attempts)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    # both attempts failed, the error of the first one is raised
+                    return first.result()
+        finally:
+            # the loser is cancelled and collected, so its exception is always retrieved
+            for task in attempts:
+                task.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+    
+    async def _post(self, url: str, payload: dict, headers: dict = None) -> tuple:
+        """
+        Sends a single POST request to the Luna API through the circuit breaker.
+        
+        Args:
+            url (str): The url.
+            payload (dict): The JSON payload.
+            headers (dict): The request headers.
+        
+        Returns:
+            tuple: The JSON response and the latency of the request in milliseconds.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError('The Luna API is unavailable')
+        
+        recorded = False
+        try:
+            async with self.semaphore:
+                self.active += 1
+                try:
+                    start = time.monotonic()
+                    async with self._session().post(url, json=payload, headers=headers) as x:
+                        x.raise_for_status()
+                        data = await x.json(content_type=None)
+                    latency = int((time.monotonic() - start) * 1000)
+                finally:
+                    self.active -= 1
+            
+            self.latencies.append(latency)
+            self.breaker.success()
+            recorded = True
+            LUNA_SECONDS.observe(latency / 1000)
+            LUNA_REQUESTS.inc('ok')
+            return data, latency
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            LUNA_REQUESTS.inc('timeout' if isinstance(e, asyncio.TimeoutError) else 'error')
+            # client errors like a missing endpoint say nothing about the health of the backend
+            if not isinstance(e, aiohttp.ClientResponseError) or e.status >= 500:
+                self.breaker.failure()
+                recorded = True
+            raise
+        
+        except ValueError:
+            # a body which is not JSON means the backend is broken, e.g. a proxy error page
+            LUNA_REQUESTS.inc('error')
+            self.breaker.failure()
+            recorded = True
+            raise
+        
+        finally:
+            if not recorded:
+                self.breaker.release()
+    
+    async def stream(self, url: str, payload: dict, headers: dict = None):
+        """
+        Sends a POST request to the Luna API and yields the chunks of a streamed response as they arrive. The stream is
+        read line by line, as JSON lines or server-sent events with a `Data` field. If the Luna API answers with a
+        single JSON response instead, its `Data` field is yielded as one chunk.
+        
+        The generator holds a slot of the client and a connection until it is exhausted or closed, so a caller which
+        may stop early has to close it, e.g. with `contextlib.aclosing`. The latency to the response headers and the
+        result of the stream are recorded in the Luna metrics like the other requests.
+        
+        Args:
+            url (str): The url.
+            payload (dict): The JSON payload.
+            headers (dict): The request headers.
+        
+        Yields:
+            str: The chunks of the response.
+        
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            aiohttp.ClientError: If the request failed.
+            asyncio.TimeoutError: If the request timed out.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError('The Luna API is unavailable')
+        
+        recorded = False
+        result = 'ok'
+        try:
+            async with self.semaphore:
+                self.active += 1
+                try:
+                    start = time.monotonic()
+                    async with self._session().post(url, json=payload, headers=headers) as x:
+                        x.raise_for_status()
+                        latency = int((time.monotonic() - start) * 1000)
+                        self.latencies.append(latency)
+                        self.breaker.success()
+                        recorded = True
+                        LUNA_SECONDS.observe(latency / 1000)
+                        
+                        if x.content_type == 'application/json':
+                            data = await x.json(content_type=None)
+                            yield data['Data']
+                            return
+                        
+                        async for line in x.content:
+                            line = line.decode('utf-8').strip()
+                            if line.startswith('data:'):
+                                line = line[5:].strip()
+                            if line == '[DONE]':
+                                break
+                            if not line:
+                                continue
+                            try:
+                                chunk = json.loads(line)['Data']
+                            except (ValueError, KeyError, TypeError):
+                                chunk = line
+                            if chunk:
+                                yield chunk
+                finally:
+                    self.active -= 1
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'error'
+            if not recorded and (not isinstance(e, aiohttp.ClientResponseError) or e.status >= 500):
+                self.breaker.failure()
+                recorded = True
+            raise
+        
+        finally:
+            # a stream which the caller closed early still counts as successful
+            LUNA_REQUESTS.inc(result)
+            if not recorded:
+                self.breaker.release()
+    
+    async def coalesce(self, key: tuple, factory) -> tuple:
+        """
+        Runs a request once for all concurrent callers with the same key. The first caller starts the request, and every
+        caller which arrives while it is in flight waits for the same result instead of sending its own request. The
+        request is shielded, so a cancelled caller does not cancel it for the others.
+        
+        Args:
+            key (tuple): The key of the request, built from its normalized payload.
+            factory (callable): A callable which returns the coroutine of the request.
+        
+        Returns:
+            tuple: The result of the request.
+        
+        Raises:
+            CircuitOpenError: If the circuit breaker is open and there is no cached response.
+        """
+        self.requests += 1
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.inflight[key] = task
+            task.add_done_callback(partial(self._settle, key))
+        else:
+            self.deduplicated += 1
+            self.logger.info(f'Luna | Coalesced request | {key[0]}')
+        
+        try:
+            result = await asyncio.shield(task)
+        except CircuitOpenError:
+            # while the circuit is open, the last response to the same request is served if there is one
+            if key not in self.recent:
+                raise
+            self.stale += 1
+            self.logger.info(f'Luna | Serving cached response | {key[0]}')
+            return self.recent[key]
+        
+        self.recent[key] = result
+        self.recent.move_to_end(key)
+        while len(self.recent) > self.recent_size:
+            self.recent.popitem(last=False)
+        return result
+    
+    def _settle(self, key: tuple, task: asyncio.Future) -> None:
+        """
+        Removes a finished request from the in-flight requests.
+        
+        Args:
+            key (tuple): The key of the request.
+            task (asyncio.Future): The finished request.
+        """
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        # the error is raised to every waiting caller, this only marks it as retrieved if all callers are gone
+        if not task.cancelled():
+            task.exception()
+    
+    def percentile(self, percent: float) -> int:
+        """
+        Returns a percentile of the recent request latencies.
+        
+        Args:
+            percent (float): The percentile, between 0 and 100.
+        
+        Returns:
+            int: The latency in milliseconds, or 0 if there are no samples yet.
+        """
+        if not self.latencies:
+            return 0
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(len(samples) * percent / 100))]
+    
+    def stats(self) -> dict:
+        """
+        Returns the client metrics.
+        
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        return {
+            'active': self.active,
+            'inflight': len(self.inflight),
+            'requests': self.requests,
+            'deduplicated': self.deduplicated,
+            'breaker': self.breaker.state,
+            'trips': self.breaker.trips,
+            'stale': self.stale,
+            'hedged': self.hedged,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+    
+    async def close(self) -> None:
+        """
+        Closes the pooled session.
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+
+class LunaBatcher:
+    """
+    A micro-batching stage for translations. Requests are collected for a short window, or until the batch is full,
+    and then sent as one batched request. If the Luna API has no batch endpoint, the batch falls back to parallel
+    single requests, which are bounded by the concurrency limit of the client. Each caller gets its own result.
+    
+    Args:
+        logger (ValkyrieLogger): The logger.
+        config (dict): The configuration dictionary.
+        client (LunaClient): The client which sends the requests.
+        url (str): The translation url.
+        headers (callable): Returns the request headers. They are read for every request, so a changed token is used
+            right away.
+    """
+    def __init__(self, logger, config, client: LunaClient, url: str, headers):
+        self.config = config
+        self.logger = logger
+        self.client = client
+        self.url = url
+        self.url_batch = f'{url}/batch'
+        self.headers = headers
+        
+        batch = self.config['luna'].get('batch', {})
+        self.enabled = batch.get('enabled', True)
+        self.window = batch.get('window', 0.01)
+        self.size = batch.get('size', 16)
+        self.supported = batch.get('endpoint', True)
+        
+        self.pending = []
+        self.timer = None
+        self.tasks = set()
+        
+        self.batches = 0
+        self.batched = 0
+        self.fallbacks = 0
+    
+    async def submit(self, text: str, lang: str) -> tuple:
+        """
+        Adds a translation to the next batch and waits for its result.
+        
+        Args:
+            text (str): The text to translate.
+            lang (str): The language to translate to.
+        
+        Returns:
+            tuple: The JSON response of the translation and the latency of the request in milliseconds.
+        """
+        payload = {"message": text, "language": lang}
+        if not self.enabled:
+            return await self.client.post(self.url, payload, self.headers(), hedge=True)
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((payload, future))
+        
+        if len(self.pending) >= self.size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+        
+        return await future
+    
+    def flush(self) -> None:
+        """
+        Sends the pending translations as one batch.
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        
+        items, self.pending = self.pending, []
+        task = asyncio.ensure_future(self._send(items))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+    
+    async def _send(self, items: list) -> None:
+        """
+        Sends a batch of translations and resolves the future of each caller.
+        
+        Args:
+            items (list): A list of payloads and futures.
+        """
+        headers = self.headers()
+        if len(items) > 1 and self.supported:
+            try:
+                data, latency = await self.client.post(self.url_batch, {"messages": [p for p, _ in items]}, headers, hedge=True)
+                if len(data['Data']) != len(items):
+                    raise ValueError(f'Expected {len(items)} translations, got {len(data["Data"])}')
+                self.batches += 1
+                self.batched += len(items)
+                for (_, future), translation in zip(items, data['Data']):
+                    if not future.done():
+                        future.set_result(({'Data': translation}, latency))
+                return
+            
+            except aiohttp.ClientResponseError as e:
+                if e.status not in (404, 405, 501):
+                    return self._fail(items, e)
+                self.supported = False
+                self.logger.info(f'Luna Translate | No batch endpoint, falling back to parallel requests')
+            
+            except (CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
+                return self._fail(items, e)
+        
+        if len(items) > 1:
+            self.fallbacks += 1
+        results = await asyncio.gather(
+            *[self.client.post(self.url, p, headers, hedge=True) for p, _ in items],
+            return_exceptions=True
+        )
+        for (_, future), result in zip(items, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    @staticmethod
+    def _fail(items: list, error: BaseException) -> None:
+        """
+        Raises an error to every caller of a batch.
+        
+        Args:
+            items (list): A list of payloads and futures.
+            error (BaseException): The error.
+        """
+        for _, future in items:
+            if not future.done():
+                future.set_exception(error)
+    
+    def stats(self) -> dict:
+        """
+        Returns the batching metrics.
+        
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        return {
+            'batches': self.batches,
+            'batched': self.batched,
+            'fallbacks': self.fallbacks,
+            'supported': self.supported,
+        }
 
 
 class Luna:
@@ -22,6 +598,11 @@ class Luna:
         logger (ValkyrieLogger): The logger.
         config (dict): The configuration dictionary.
     """
+    clients = {}
+    caches = {}
+    batchers = {}
+    quotas = {}
+    
     def __init__(self, logger, config):
         self.config = config
         self.logger = logger
@@ -34,8 +615,30 @@ class Luna:
             self.logger.error(f'Luna | No token provided!')
             raise ValueError('No token provided!')
         
-        self.bearer = base64.b64encode(f'{self.config["luna"]["token"]}'.encode('utf-8')).decode('utf-8')
         self.response = {"msg": "API Error!", "Return": False, "ReturnCode": 3}
+        self.unavailable = {
+            "msg": "API Unavailable!",
+            "Return": False,
+            "ReturnCode": 2,
+            "data": "L.U.N.A. is currently unavailable, please try again later."
+        }
+        
+        stream = self.config['luna'].get('stream', {})
+        self.stream = stream.get('enabled', True)
+        self.stream_interval = stream.get('edit_interval', 1.0)
+        self.stream_min_chars = stream.get('min_chars', 150)
+        
+        # all instances share the client, the translation cache, the batcher and the quotas of their Luna API
+        if self.luna_rest_url not in Luna.clients:
+            client = LunaClient(self.logger, self.config)
+            Luna.clients[self.luna_rest_url] = client
+            Luna.caches[self.luna_rest_url] = TranslationCache(self.logger, self.config)
+            Luna.batchers[self.luna_rest_url] = LunaBatcher(self.logger, self.config, client, self._translateUrl(), self._headers)
+            Luna.quotas[self.luna_rest_url] = QuotaEngine(self.logger, self.config)
+        self.client = Luna.clients[self.luna_rest_url]
+        self.cache = Luna.caches[self.luna_rest_url]
+        self.batcher = Luna.batchers[self.luna_rest_url]
+        self.quota = Luna.quotas[self.luna_rest_url]
     
     def _pingUrl(self) -> str:
         """
@@ -64,6 +667,26 @@ class Luna:
         """
         return f'{self.luna_rest_url}/luna/ask'
     
+    @property
+    def bearer(self) -> str:
+        """
+        Returns the bearer token. It is read from the configuration, which the web server changes in place, so a new
+        token is used without a restart.
+        
+        Returns:
+            str: The bearer token.
+        """
+        return base64.b64encode(f'{self.config["luna"]["token"]}'.encode('utf-8')).decode('utf-8')
+    
+    def _headers(self) -> dict:
+        """
+        Returns the request headers.
+        
+        Returns:
+            dict: The request headers.
+        """
+        return {"Content-Type": "application/json", "Authorization": f'Bearer {self.bearer}'}
+    
     async def lunaPing(self) -> dict:
         """
         Pings the Luna API.
@@ -74,8 +697,7 @@ class Luna:
         response = self.response
         
         try:
-            x = requests.post(url=self._pingUrl(), json={})
-            ping = int(x.elapsed.microseconds / 1000)
+            _, ping = await self.client.post(self._pingUrl(), {})
             
             response = {
                 "msg": "Command successfull",
@@ -84,8 +706,11 @@ class Luna:
                 "data": ping
             }
             self.logger.info(f'Luna Ping | Latency: {ping}ms')
-            
-        except requests.RequestException as e:
+        
+        except CircuitOpenError:
+            response = self.unavailable
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
             self.logger.error(f'Failed to make the request: {str(e)}')
         
         return response
@@ -97,20 +722,33 @@ class Luna:
         Args:
             text (str): The text to translate.
             lang (str): The language to translate to. Defaults to `en`.
-            
+        
         Returns:
             dict: A dictionary of information.
         """
         response = self.response
-        request_data = {
-            "message": text,
-            "language": lang
-        }
-        headers = {"Content-Type": "application/json", "Authorization": f'Bearer {self.bearer}'}
         self.logger.info(f'Luna Translate | Text: {text}')
+        
+        try:
+            cached = await self.cache.get(text, lang)
+        except sqlite3.Error as e:
+            # a locked or broken cache must not break translations, they are just not cached
+            self.logger.error(f'Luna Translate | Cache unavailable: {str(e)}')
+            cached = None
+        if cached is not None:
+            self.logger.info(f'Luna Translate | Cached: {cached}')
+            return {
+                "msg": "Command successfull",
+                "Return": True,
+                "ReturnCode": 1,
+                "data": cached
+            }
+        
         try:
-            x = requests.request(method="POST", url=self._translateUrl(), json=request_data, headers=headers)
-            data = x.json()
+            data, _ = await self.client.coalesce(
+                ('translate', self.cache.key(text, lang)),
+                partial(self.batcher.submit, text, lang)
+            )
             
             response = {
                 "msg": "Command successfull",
@@ -119,19 +757,44 @@ class Luna:
                 "data": data['Data']
             }
             self.logger.info(f'Luna Translate | Answer: {data["Data"]}')
-            
-        except requests.RequestException as e:
+            try:
+                await self.cache.put(text, lang, data['Data'])
+            except sqlite3.Error as e:
+                self.logger.error(f'Luna Translate | Cache unavailable: {str(e)}')
+        
+        except CircuitOpenError:
+            self.logger.warning(f'Luna Translate | Circuit open, failing fast')
+            response = self.unavailable
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
             self.logger.error(f'Failed to make the request: {str(e)}')
         
         return response
     
+    async def lunaPrewarm(self, lang: str = "en") -> int:
+        """
+        Pre-warms the translation cache with the common chat phrases of the cache. Phrases which are cached already
+        are not sent to the Luna API again.
+        
+        Args:
+            lang (str): The language to translate to. Defaults to `en`.
+        
+        Returns:
+            int: The number of pre-warmed phrases.
+        """
+        phrases = self.cache.phrases()
+        for phrase in phrases:
+            await self.lunaTranslate(phrase, lang)
+        self.logger.info(f'Luna Translate | Pre-warmed {len(phrases)} phrases | {lang}')
+        return len(phrases)
+    
     async def lunaAsk(self, text: str) -> dict:
         """
         Asks Luna a question using the Luna API.
         
         Args:
             text (str): The question to ask.
-            
+        
         Returns:
             dict: A dictionary of information.
         """
@@ -139,10 +802,11 @@ class Luna:
         request_data = {
             "message": text
         }
-        headers = {"Content-Type": "application/json", "Authorization": f'Bearer {self.bearer}'}
         try:
-            x = requests.request(method="POST", url=self._askUrl(), json=request_data, headers=headers)
-            data = x.json()
+            data, _ = await self.client.coalesce(
+                ('ask', TranslationCache.normalize(text)),
+                partial(self.client.post, self._askUrl(), request_data, self._headers())
+            )
             
             response = {
                 "msg": "Command successfull",
@@ -152,8 +816,52 @@ class Luna:
             }
             self.logger.info(f'Luna Ask | Question: {text}')
             self.logger.info(f'Luna Ask | Answer: {data["Data"]}')
-            
-        except requests.RequestException as e:
+        
+        except CircuitOpenError:
+            self.logger.warning(f'Luna Ask | Circuit open, failing fast')
+            response = self.unavailable
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
+            # ValueError covers a response which is not JSON, e.g. the HTML page of a proxy error
             self.logger.error(f'Failed to make the request: {str(e)}')
         
         return response
+    
+    async def lunaAskStream(self, text: str):
+        """
+        Asks Luna a question using the Luna API and yields the answer in chunks as they arrive. Streamed questions are
+        not coalesced, because every caller reads its own stream. While the circuit breaker is open, the answer of
+        `lunaAsk` is yielded instead, which is a cached answer or an unavailable message.
+        
+        Args:
+            text (str): The question to ask.
+        
+        Yields:
+            str: The chunks of the answer.
+        
+        Raises:
+            aiohttp.ClientError: If the request failed.
+            asyncio.TimeoutError: If the request timed out.
+        """
+        request_data = {
+            "message": text,
+            "stream": True
+        }
+        self.logger.info(f'Luna Ask | Question: {text}')
+        start = time.monotonic()
+        first = None
+        answer = []
+        try:
+            # the stream holds a slot of the client and a connection, it is closed even if the caller stops early
+            async with contextlib.aclosing(self.client.stream(self._askUrl(), request_data, self._headers())) as stream:
+                async for chunk in stream:
+                    if first is None:
+                        first = int((time.monotonic() - start) * 1000)
+                        self.logger.info(f'Luna Ask | First chunk: {first}ms')
+                    answer.append(chunk)
+                    yield chunk
+        except CircuitOpenError:
+            response = await self.lunaAsk(text)
+            answer.append(response['data'])
+            yield response['data']
+        self.logger.info(f'Luna Ask | Answer: {"".join(answer)}')
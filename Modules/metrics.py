@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides the metrics of the bots in the Prometheus text format. Counters and histograms are updated
+    where things happen, and gauges read the state of the bots when the metrics are scraped, so collecting them costs
+    little and takes no locks.
+
+"""
+import bisect
+import math
+import time
+
+import aiohttp
+
+
+class Metric:
+    """
+    The base of all metrics. A metric has a name, a help text and the names of its labels. Its values are kept by the
+    values of their labels, in the order of the label names.
+    
+    The values are only changed from the event loop, so a change needs no lock. A scrape from another thread copies
+    the values first, which is atomic, and at worst misses a change that happens at the same time.
+    
+    A metric whose state is already kept elsewhere, e.g. the number of queued tasks, reads its values from a callable
+    whenever it is scraped instead.
+    
+    Args:
+        name (str): The name of the metric, e.g. `valkyrie_tasks`.
+        documentation (str): The help text of the metric.
+        labels (tuple): The names of the labels.
+        collect (callable): Returns the values when the metric is scraped, a number for a metric without labels, or a
+            dictionary of numbers by tuples of label values. None for a metric which is updated where things happen.
+    """
+    TYPE = 'untyped'
+    
+    def __init__(self, name: str, documentation: str, labels: tuple = (), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.collect = collect
+        self.values = {}
+    
+    def _key(self, labels: tuple) -> tuple:
+        """
+        Returns the key of the values of a set of labels.
+        
+        Args:
+            labels (tuple): The values of the labels.
+        
+        Returns:
+            tuple: The key.
+        
+        Raises:
+            ValueError: If the number of label values does not match the label names.
+        """
+        if len(labels) != len(self.labels):
+            raise ValueError(f'{self.name} expects the labels {self.labels}, got {labels}')
+        return tuple(str(label) for label in labels)
+    
+    def samples(self) -> list:
+        """
+        Returns the samples of the metric.
+        
+        Returns:
+            list: The samples as tuples of the name suffix, the labels as pairs of name and value, and the value.
+        """
+        if self.collect is None:
+            values = list(self.values.items())
+        else:
+            values = self.collect()
+            values = list(values.items()) if isinstance(values, dict) else [((), values)]
+        return [('', tuple(zip(self.labels, self._key(key))), value) for key, value in values if value is not None]
+
+
+class Counter(Metric):
+    """
+    A counter, which only goes up, e.g. the number of responses.
+    """
+    TYPE = 'counter'
+    
+    def inc(self, *labels, amount: float = 1) -> None:
+        """
+        Increases the counter.
+        
+        Args:
+            *labels: The values of the labels.
+            amount (float): The amount to add.
+        """
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A gauge, which goes up and down, e.g. the number of queued tasks.
+    """
+    TYPE = 'gauge'
+    
+    def set(self, value: float, *labels) -> None:
+        """
+        Sets the gauge.
+        
+        Args:
+            value (float): The value.
+            *labels: The values of the labels.
+        """
+        self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """
+    A histogram, which counts observations in buckets, e.g. the latency of requests. Every set of labels keeps the
+    count of every bucket, and the sum of all observations after them.
+    
+    Args:
+        name (str): The name of the metric.
+        documentation (str): The help text of the metric.
+        labels (tuple): The names of the labels.
+        buckets (tuple): The upper bounds of the buckets, ascending. A bucket of infinity is added.
+    """
+    TYPE = 'histogram'
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, *labels) -> None:
+        """
+        Records an observation.
+        
+        Args:
+            value (float): The observed value, e.g. seconds.
+            *labels: The values of the labels.
+        """
+        key = self._key(labels)
+        counts = self.values.get(key)
+        if counts is None:
+            counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+    
+    def samples(self) -> list:
+        """
+        Returns the samples of the histogram, with the cumulative count of every bucket, the sum and the count.
+        
+        Returns:
+            list: The samples.
+        """
+        samples = []
+        for key, counts in list(self.values.items()):
+            labels = tuple(zip(self.labels, key))
+            counts = list(counts)
+            total = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                total += count
+                samples.append(('_bucket', labels + (('le', format_value(bound)),), total))
+            samples.append(('_sum', labels, counts[-1]))
+            samples.append(('_count', labels, total))
+        return samples
+
+
+class Registry:
+    """
+    The registry of all metrics, which renders them in the Prometheus text format. A metric is created once by its
+    name, and every later call with the same name returns it, so a module can declare its metrics when it is imported.
+    """
+    def __init__(self):
+        self.metrics = {}
+    
+    def _get(self, cls, name: str, *args, **kwargs) -> Metric:
+        """
+        Returns a metric by its name, and creates it first if it does not exist.
+        
+        Args:
+            cls: The class of the metric.
+            name (str): The name of the metric.
+        
+        Returns:
+            Metric: The metric.
+        """
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f'{name} is already registered as a {metric.TYPE}')
+        return metric
+    
+    def counter(self, name: str, documentation: str, labels: tuple = (), collect=None) -> Counter:
+        """
+        Returns a counter. The callable of an existing counter is replaced.
+        
+        Args:
+            name (str): The name of the counter.
+            documentation (str): The help text of the counter.
+            labels (tuple): The names of the labels.
+            collect (callable): Returns the values when the counter is scraped, see `Metric`.
+        
+        Returns:
+            Counter: The counter.
+        """
+        counter = self._get(Counter, name, documentation, labels)
+        if collect is not None:
+            counter.collect = collect
+        return counter
+    
+    def gauge(self, name: str, documentation: str, labels: tuple = (), collect=None) -> Gauge:
+        """
+        Returns a gauge. The callable of an existing gauge is replaced.
+        
+        Args:
+            name (str): The name of the gauge.
+            documentation (str): The help text of the gauge.
+            labels (tuple): The names of the labels.
+            collect (callable): Returns the values when the gauge is scraped, see `Metric`.
+        
+        Returns:
+            Gauge: The gauge.
+        """
+        gauge = self._get(Gauge, name, documentation, labels)
+        if collect is not None:
+            gauge.collect = collect
+        return gauge
+    
+    def histogram(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = Histogram.BUCKETS) -> Histogram:
+        """
+        Returns a histogram.
+        
+        Args:
+            name (str): The name of the histogram.
+            documentation (str): The help text of the histogram.
+            labels (tuple): The names of the labels.
+            buckets (tuple): The upper bounds of the buckets.
+        
+        Returns:
+            Histogram: The histogram.
+        """
+        return self._get(Histogram, name, documentation, labels, buckets)
+    
+    def render(self) -> str:
+        """
+        Renders all metrics in the Prometheus text format. A metric whose callable fails is left out, so one broken
+        subsystem does not break the whole scrape.
+        
+        Returns:
+            str: The metrics.
+        """
+        lines = []
+        for metric in list(self.metrics.values()):
+            try:
+                samples = metric.samples()
+            except Exception:
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.TYPE}')
+            for suffix, labels, value in samples:
+                if labels:
+                    pairs = ','.join(f'{name}="{escape(label)}"' for name, label in labels)
+                    lines.append(f'{metric.name}{suffix}{{{pairs}}} {format_value(value)}')
+                else:
+                    lines.append(f'{metric.name}{suffix} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value: str) -> str:
+    """
+    Escapes the value of a label.
+    
+    Args:
+        value (str): The value.
+    
+    Returns:
+        str: The escaped value.
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value: float) -> str:
+    """
+    Formats the value of a sample.
+    
+    Args:
+        value (float): The value.
+    
+    Returns:
+        str: The formatted value.
+    """
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+def client_trace(duration: Histogram, responses: Counter) -> aiohttp.TraceConfig:
+    """
+    Returns a trace config for aiohttp sessions, which records the latency of every request by its method and path,
+    and counts the responses by their status code. A request which fails without a response is counted as `error`.
+    
+    Args:
+        duration (Histogram): The latency histogram, with the labels `method` and `endpoint`.
+        responses (Counter): The response counter, with the labels `method`, `endpoint` and `code`.
+    
+    Returns:
+        aiohttp.TraceConfig: The trace config.
+    """
+    async def on_request_start(session, context, params):
+        context.start = time.monotonic()
+    
+    async def on_request_end(session, context, params):
+        duration.observe(time.monotonic() - context.start, params.method, params.url.path)
+        responses.inc(params.method, params.url.path, params.response.status)
+    
+    async def on_request_exception(session, context, params):
+        duration.observe(time.monotonic() - context.start, params.method, params.url.path)
+        responses.inc(params.method, params.url.path, 'error')
+    
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+REGISTRY = Registry()
+
+# the Twitch Helix API is called from many short lived sessions, which all share this trace
+HELIX_TRACE = client_trace(
+    REGISTRY.histogram('valkyrie_helix_request_duration_seconds', 'The latency of the Twitch Helix API requests.', ('method', 'endpoint')),
+    REGISTRY.counter('valkyrie_helix_responses_total', 'The responses of the Twitch Helix API by status code.', ('method', 'endpoint', 'code')),
+)
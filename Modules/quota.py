@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides a quota engine for the Luna commands. Every command has a token bucket per user, a cap on the
+    number of concurrent requests of all users and a limit on the number of requests waiting for a free slot. Requests
+    over the limits are rejected with a message instead of piling up in the event loop.
+
+"""
+import asyncio
+import contextlib
+import time
+
+
+class QuotaExceeded(Exception):
+    """
+    Raised if a request is rejected by the quota engine.
+    
+    Args:
+        message (str): The message for the user.
+    """
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class Quota:
+    """
+    A class storing the limits and the state of one command.
+    
+    Args:
+        command (str): The name of the command.
+        config (dict): The quota configuration of the command.
+    """
+    def __init__(self, command: str, config: dict):
+        self.command = command
+        self.rate = config.get('rate', 0.1)
+        self.burst = config.get('burst', 3)
+        self.concurrency = config.get('concurrency', 2)
+        self.queue = config.get('queue', 8)
+        self.rate_message = config.get('rate_message', 'Please wait {wait}s before you use {command} again.')
+        self.busy_message = config.get('busy_message', 'L.U.N.A. is busy right now, please try again in a moment.')
+        
+        # user -> (tokens, timestamp), a user whose bucket is full again is removed
+        self.buckets = {}
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.active = 0
+        self.waiting = 0
+        
+        self.admitted = 0
+        self.rejected_rate = 0
+        self.rejected_busy = 0
+
+
+class QuotaEngine:
+    """
+    A quota engine for the Luna commands. A user takes one token of a command bucket per request, and the bucket refills
+    at a fixed rate up to its burst size. Admitted requests wait for one of the concurrency slots of the command, and if
+    too many requests are waiting already, new requests are rejected. The buckets are stored as tuples, and a user whose
+    bucket is full again is evicted, so idle users take no memory.
+    
+    Args:
+        logger (ValkyrieLogger): The logger.
+        config (dict): The configuration dictionary.
+    """
+    def __init__(self, logger, config: dict):
+        self.config = config
+        self.logger = logger
+        
+        quota = self.config['luna'].get('quota', {})
+        self.sweep_interval = quota.get('sweep_interval', 60)
+        self.sweep_time = time.monotonic()
+        self.quotas = {command: Quota(command, quota.get(command, {})) for command in ('ask', 'translate')}
+    
+    def _take(self, quota: Quota, user: str, now: float) -> None:
+        """
+        Takes one token from the bucket of a user.
+        
+        Args:
+            quota (Quota): The quota of the command.
+            user (str): The user.
+            now (float): The current monotonic time.
+        
+        Raises:
+            QuotaExceeded: If the bucket of the user is empty.
+        """
+        tokens, updated = quota.buckets.get(user, (quota.burst, now))
+        tokens = min(quota.burst, tokens + (now - updated) * quota.rate)
+        if tokens < 1:
+            quota.rejected_rate += 1
+            wait = int((1 - tokens) / quota.rate) + 1 if quota.rate > 0 else 0
+            self.logger.info(f'Quota | {quota.command} | {user} | Rate limited for {wait}s')
+            raise QuotaExceeded(quota.rate_message.format(wait=wait, command=quota.command))
+        quota.buckets[user] = (tokens - 1, now)
+    
+    def _sweep(self, now: float) -> None:
+        """
+        Evicts the users whose buckets are full again.
+        
+        Args:
+            now (float): The current monotonic time.
+        """
+        self.sweep_time = now
+        for quota in self.quotas.values():
+            idle = [
+                user for user, (tokens, updated) in quota.buckets.items()
+                if tokens + (now - updated) * quota.rate >= quota.burst
+            ]
+            for user in idle:
+                del quota.buckets[user]
+    
+    @contextlib.asynccontextmanager
+    async def limit(self, command: str, user: str, admitted=None):
+        """
+        Admits a request of a user to a command and holds one of the concurrency slots of the command while it runs.
+        
+        Args:
+            command (str): The name of the command.
+            user (str): The user, prefixed with the platform.
+            admitted (callable): An optional coroutine function awaited once the request is admitted, before it waits
+                for a free slot. It can be used to acknowledge an interaction which must be answered in time.
+        
+        Raises:
+            QuotaExceeded: If the bucket of the user is empty, or if the queue of the command is full.
+        """
+        quota = self.quotas[command]
+        now = time.monotonic()
+        if now - self.sweep_time > self.sweep_interval:
+            self._sweep(now)
+        
+        if quota.semaphore.locked() and quota.waiting >= quota.queue:
+            quota.rejected_busy += 1
+            self.logger.info(f'Quota | {command} | {user} | Queue full')
+            raise QuotaExceeded(quota.busy_message.format(command=command))
+        self._take(quota, user, now)
+        quota.admitted += 1
+        # the request counts as waiting before its first await, so the requests admitted meanwhile see it
+        quota.waiting += 1
+        try:
+            if admitted is not None:
+                await admitted()
+            await quota.semaphore.acquire()
+        finally:
+            quota.waiting -= 1
+        
+        quota.active += 1
+        try:
+            yield
+        finally:
+            quota.active -= 1
+            quota.semaphore.release()
+    
+    def stats(self) -> dict:
+        """
+        Returns the quota metrics of every command.
+        
+        Returns:
+            dict: A dictionary of metrics per command.
+        """
+        return {
+            command: {
+                'active': quota.active,
+                'waiting': quota.waiting,
+                'users': len(quota.buckets),
+                'admitted': quota.admitted,
+                'rejected_rate': quota.rejected_rate,
+                'rejected_busy': quota.rejected_busy,
+            }
+            for command, quota in self.quotas.items()
+        }
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides the status board of the bots. The bots publish their status whenever it changes, and the web
+    server reads a precomputed snapshot instead of walking the state of every bot on every request.
+
+"""
+import threading
+import time
+
+
+class StatusBoard:
+    """
+    The status board of the bots. A bot is registered under a name, and publishes its status whenever its `running`,
+    `loaded` or `ready` flag or its start time changes. Every publish builds a new snapshot, a dictionary which is
+    never changed once it is published. A reader takes the snapshot once and gets a consistent view of all bots, even
+    if a bot changes its state in the meantime, so it is safe to read from the threads of the web server.
+    
+    The status of a bot is one of:
+        - UNKNOWN: The bot is not available, e.g. in the development environment.
+        - OFFLINE: The bot is not running.
+        - STARTED: The bot is running, but not loaded yet.
+        - ONLINE: The bot is loaded.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = {}
+        self.version = 0
+        self.snapshot = {}
+    
+    def register(self, name: str, bot) -> None:
+        """
+        Registers a bot and publishes its current status. The bot is given the board, so it can publish its changes.
+        
+        Args:
+            name (str): The name of the bot, e.g. `discord`.
+            bot: The bot instance, or None if the bot is not available.
+        """
+        if bot is not None:
+            bot.board = self
+            self.names[id(bot)] = name
+        self._publish(name, bot)
+    
+    def publish(self, bot) -> None:
+        """
+        Publishes the status of a registered bot. A new snapshot is only built if the status changed.
+        
+        Args:
+            bot: The bot instance.
+        """
+        name = self.names.get(id(bot))
+        if name is not None:
+            self._publish(name, bot)
+    
+    @staticmethod
+    def status(bot) -> str:
+        """
+        Returns the status of a bot.
+        
+        Args:
+            bot: The bot instance, or None.
+        
+        Returns:
+            str: The status.
+        """
+        if bot is None:
+            return 'UNKNOWN'
+        if getattr(bot, 'ready', False) or getattr(bot, 'loaded', False):
+            return 'ONLINE'
+        return 'STARTED' if bot.running else 'OFFLINE'
+    
+    def _publish(self, name: str, bot) -> None:
+        """
+        Builds the entry of a bot, and a new snapshot if the entry changed.
+        
+        Args:
+            name (str): The name of the bot.
+            bot: The bot instance, or None.
+        """
+        with self.lock:
+            start_time = getattr(bot, 'start_time', 0)
+            status = self.status(bot)
+            old = self.snapshot.get(name)
+            if old is not None and old['status'] == status and old['start_time'] == start_time:
+                return
+            
+            entry = {
+                'status': status,
+                'start_time': start_time,
+                'started': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time)) if start_time else 'N/A',
+                'changed': time.time(),
+            }
+            self.snapshot = dict(self.snapshot, **{name: entry})
+            self.version += 1
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides a supervisor for the background coroutines of the bots. The supervisor owns the tasks of the
+    bots, restarts them with a backoff if they crash, and reports the health of each component. It also samples the
+    lag of the event loop and records the stack of the loop thread whenever a callback blocks the loop for too long.
+
+"""
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from Modules.metrics import REGISTRY
+
+LOOP_LAG = REGISTRY.histogram(
+    'valkyrie_event_loop_lag_seconds', 'The lag of the event loop, sampled by the supervisor.',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+class Component:
+    """
+    A class storing the state of a supervised coroutine.
+
+    Properties:
+        - name (str): The name of the component.
+        - state (str): The state of the component. Can be STARTING, RUNNING, RESTARTING or STOPPED.
+        - restarts (int): The number of restarts after a crash.
+        - last_error (str): The last error of the component.
+        - start_time (float): The timestamp of the last (re)start.
+
+    Args:
+        name (str): The name of the component.
+        factory (callable): A callable which returns the coroutine of the component.
+        on_exit (callable): A callable which is called once the component stopped for good.
+    """
+    def __init__(self, name: str, factory, on_exit=None):
+        self.name = name
+        self.factory = factory
+        self.on_exit = on_exit
+        self.task = None
+        self.state = 'STARTING'
+        self.restarts = 0
+        self.last_error = ''
+        self.error_time = 0
+        self.start_time = 0
+
+
+class Supervisor:
+    """
+    A supervisor which owns the background tasks of the bots. A crashed task is restarted after a backoff, which
+    doubles with every crash in a row and is reset once the task ran for a while. A lag monitor samples the event loop
+    continuously, and a watchdog thread records the stack of the loop thread whenever the loop is blocked.
+
+    Args:
+        logger (logging.Logger): The logger.
+        backoff (float): The first restart delay in seconds.
+        max_backoff (float): The maximum restart delay in seconds.
+        lag_interval (float): The sampling interval of the lag monitor in seconds.
+        slow_threshold (float): The time in seconds after which a blocked loop is reported with its stack.
+    """
+    def __init__(self, logger: logging.Logger, backoff: float = 1, max_backoff: float = 300, lag_interval: float = 0.5, slow_threshold: float = 0.25):
+        self.logger = logger
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lag_interval = lag_interval
+        self.slow_threshold = slow_threshold
+        self.components = {}
+        self.loop = None
+        self.loop_thread = None
+
+        self.heartbeat = time.monotonic()
+        self.lag_last = 0
+        self.lag_max = 0
+        self.lag_samples = collections.deque(maxlen=120)
+        self.slow_callbacks = collections.deque(maxlen=20)
+        self.slow_count = 0
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Attaches the supervisor to the event loop and starts the lag monitor and the watchdog thread. This has to be
+        called from the thread which runs the loop.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The event loop.
+        """
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.start('lag_monitor', self._monitor)
+        threading.Thread(target=self._watchdog, name='LoopWatchdog', daemon=True).start()
+
+    def start(self, name: str, factory, on_exit=None) -> None:
+        """
+        Starts a supervised component. If a component with the same name is still running, nothing happens. This method
+        can be called from any thread.
+
+        Args:
+            name (str): The name of the component.
+            factory (callable): A callable which returns the coroutine of the component.
+            on_exit (callable): A callable which is called once the component stopped for good.
+        """
+        if threading.get_ident() != self.loop_thread:
+            self.loop.call_soon_threadsafe(self.start, name, factory, on_exit)
+            return
+
+        component = self.components.get(name)
+        if component is not None and component.task is not None and not component.task.done():
+            self.logger.warning(f'Supervisor | {name} is already running')
+            return
+
+        component = Component(name, factory, on_exit)
+        component.task = self.loop.create_task(self._supervise(component), name=name)
+        self.components[name] = component
+
+    def stop(self, name: str) -> None:
+        """
+        Stops a supervised component. This method can be called from any thread.
+
+        Args:
+            name (str): The name of the component.
+        """
+        if threading.get_ident() != self.loop_thread:
+            self.loop.call_soon_threadsafe(self.stop, name)
+            return
+
+        component = self.components.get(name)
+        if component is not None and component.task is not None:
+            component.task.cancel()
+
+    async def _supervise(self, component: Component) -> None:
+        """
+        Runs a component and restarts it with a backoff whenever it crashes.
+
+        Args:
+            component (Component): The component to run.
+        """
+        failures = 0
+        while True:
+            component.state = 'RUNNING'
+            component.start_time = time.time()
+            try:
+                await component.factory()
+                component.state = 'STOPPED'
+                self.logger.info(f'Supervisor | {component.name} stopped')
+                break
+
+            except asyncio.CancelledError:
+                component.state = 'STOPPED'
+                self.logger.info(f'Supervisor | {component.name} cancelled')
+                break
+
+            except Exception as e:
+                # a component which ran for a while before it crashed starts over with the first delay
+                if time.time() - component.start_time > self.max_backoff:
+                    failures = 0
+                failures += 1
+                delay = min(self.backoff * 2 ** (failures - 1), self.max_backoff)
+
+                component.state = 'RESTARTING'
+                component.restarts += 1
+                component.last_error = f'{type(e).__name__}: {str(e)}'
+                component.error_time = time.time()
+                self.logger.error(f'Supervisor | {component.name} crashed | {component.last_error} | Restarting in {delay}s')
+                self.logger.error(''.join(traceback.format_exception(e)).strip())
+
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    component.state = 'STOPPED'
+                    break
+
+        if component.on_exit is not None:
+            component.on_exit()
+
+    async def _monitor(self) -> None:
+        """
+        Samples the lag of the event loop. The lag is the time a sleep took longer than requested, which is the time
+        the loop was busy with other callbacks.
+        """
+        while True:
+            start = time.monotonic()
+            self.heartbeat = start
+            await asyncio.sleep(self.lag_interval)
+            now = time.monotonic()
+            self.heartbeat = now
+
+            lag = max(0.0, now - start - self.lag_interval)
+            self.lag_last = lag
+            self.lag_max = max(self.lag_max, lag)
+            self.lag_samples.append(lag)
+            LOOP_LAG.observe(lag)
+
+    def _watchdog(self) -> None:
+        """
+        Watches the heartbeat of the lag monitor from a separate thread. If the loop is blocked for longer than the
+        threshold, the current stack of the loop thread is recorded, which shows the callback that blocks the loop.
+        """
+        reported = None
+        while True:
+            time.sleep(self.slow_threshold / 2)
+            beat = self.heartbeat
+            blocked = time.monotonic() - beat - self.lag_interval
+
+            if blocked > self.slow_threshold and reported != beat:
+                reported = beat
+                frame = sys._current_frames().get(self.loop_thread)
+                stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+                self.slow_count += 1
+                self.slow_callbacks.append({
+                    'time': time.time(),
+                    'blocked': blocked,
+                    'stack': stack,
+                })
+                self.logger.warning(f'Supervisor | Event loop blocked for {int(blocked * 1000)}ms')
+                self.logger.warning(stack.strip())
+
+    def lag(self) -> dict:
+        """
+        Returns the lag metrics of the event loop in milliseconds.
+
+        Returns:
+            dict: A dictionary of lag metrics.
+        """
+        samples = self.lag_samples
+        return {
+            'last': int(self.lag_last * 1000),
+            'avg': int(sum(samples) / len(samples) * 1000) if samples else 0,
+            'max': int(self.lag_max * 1000),
+            'slow': self.slow_count,
+        }
+
+    def health(self) -> list:
+        """
+        Returns the health of every supervised component.
+
+        Returns:
+            list: A list of dictionaries with the name, state, restarts, uptime and last error of each component.
+        """
+        health = []
+        for component in list(self.components.values()):
+            health.append({
+                'name': component.name,
+                'state': component.state,
+                'restarts': component.restarts,
+                'uptime': int(time.time() - component.start_time) if component.state == 'RUNNING' else 0,
+                'last_error': component.last_error,
+            })
+        return health
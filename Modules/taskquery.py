@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides a filtered, sorted and paginated query of the task queue. The tasks of a state are sorted once
+    per version of the queue, so a page of results is found without copying or sorting the whole history again.
+
+"""
+import base64
+import bisect
+import json
+import threading
+
+from Modules.tasks import Task, TaskQueue
+
+
+class TaskQuery:
+    """
+    A filtered, sorted and paginated query of the task queue. The tasks of a state, e.g. the finished tasks, are sorted
+    by a key into an index, which is kept until the version of the queue changes. Every key ends with the id of the
+    task, so no two tasks share a key and a key marks a position in the index for good.
+    
+    A query finds its start in the index by a binary search on the cursor, and walks the index in the order of the
+    page until it found `limit` tasks or checked `scan` tasks. If the index is sorted by date, the date range is found
+    by a binary search as well. The cursors of the next and the previous page are the keys of the last and the first
+    task of the page, so a cursor stays valid while tasks are added or moved between states. The tasks themselves are
+    never changed.
+    
+    Args:
+        task_queue (TaskQueue): The task queue.
+        scan (int): The maximum number of tasks checked by one query.
+    """
+    STATES = TaskQueue.STATES
+    SORTS = ('date', 'id', 'action', 'user', 'cost')
+    
+    def __init__(self, task_queue: TaskQueue, scan: int = 10000):
+        self.task_queue = task_queue
+        self.scan = scan
+        
+        self.lock = threading.Lock()
+        self.indexes = {}
+        self.builds = 0
+    
+    @staticmethod
+    def key(sort: str, task: Task) -> tuple:
+        """
+        Returns the sort key of a task.
+        
+        Args:
+            sort (str): The sort, one of `SORTS`.
+            task (Task): The task.
+        
+        Returns:
+            tuple: The key, which ends with the id of the task.
+        """
+        if sort == 'date':
+            value = TaskQuery.date(task)
+        elif sort == 'id':
+            value = task.id
+        elif sort == 'action':
+            value = task.action or ''
+        elif sort == 'user':
+            value = str(task.data.get('user_name') or '').casefold()
+        else:
+            cost = str(task.data.get('reward_cost') or '')
+            value = int(cost) if cost.isdigit() else 0
+        return value, task.id
+    
+    @staticmethod
+    def date(task: Task) -> float:
+        """
+        Returns the creation date of a task. The dates of tasks loaded from the XML file are strings.
+        
+        Args:
+            task (Task): The task.
+        
+        Returns:
+            float: The creation date in epoch seconds, or 0 if it can not be parsed.
+        """
+        try:
+            return float(task.date)
+        except (TypeError, ValueError):
+            return 0.0
+    
+    @staticmethod
+    def encode(direction: str, sort: str, key: tuple) -> str:
+        """
+        Encodes a cursor.
+        
+        Args:
+            direction (str): The direction of the page the cursor leads to, `next` or `prev`.
+            sort (str): The sort of the query.
+            key (tuple): The key of the task the page starts after.
+        
+        Returns:
+            str: The cursor.
+        """
+        return base64.urlsafe_b64encode(json.dumps([direction, sort, *key]).encode('utf-8')).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode(cursor: str) -> tuple:
+        """
+        Decodes a cursor.
+        
+        Args:
+            cursor (str): The cursor.
+        
+        Returns:
+            tuple: The direction, the sort and the key.
+        
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        try:
+            direction, sort, *key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Invalid cursor: {cursor}') from e
+        if direction not in ('next', 'prev') or sort not in TaskQuery.SORTS or len(key) != 2:
+            raise ValueError(f'Invalid cursor: {cursor}')
+        # the key has to be comparable with the keys of the index
+        if not isinstance(key[0], str if sort in ('action', 'user') else (int, float)) or not isinstance(key[1], int):
+            raise ValueError(f'Invalid cursor: {cursor}')
+        return direction, sort, tuple(key)
+    
+    @staticmethod
+    def match(task: Task, action: str = None, user: str = None, since: int = None, until: int = None) -> bool:
+        """
+        Checks whether a task matches the filters of a query.
+        
+        Args:
+            task (Task): The task.
+            action (str): The action of the tasks.
+            user (str): A casefolded substring of the user names.
+            since (int): The earliest creation date of the tasks in epoch seconds.
+            until (int): The latest creation date of the tasks in epoch seconds.
+        
+        Returns:
+            bool: True if the task matches, False if not.
+        """
+        if action is not None and task.action != action:
+            return False
+        if user is not None and user not in str(task.data.get('user_name') or '').casefold():
+            return False
+        if since is not None or until is not None:
+            date = TaskQuery.date(task)
+            if (since is not None and date < since) or (until is not None and date >= until + 1):
+                return False
+        return True
+    
+    def _index(self, state: str, sort: str) -> tuple:
+        """
+        Returns the index of a state, sorted by a key. The index is built once per version of the queue.
+        
+        Args:
+            state (str): The state, one of `STATES`.
+            sort (str): The sort, one of `SORTS`.
+        
+        Returns:
+            tuple: The sorted keys and the tasks in the same order.
+        """
+        with self.lock:
+            # the version is read before the tasks, so a change in between only causes another build
+            version = self.task_queue.version
+            index = self.indexes.get((state, sort))
+            if index is None or index[0] != version:
+                tasks = list(getattr(self.task_queue, self.STATES[state]))
+                pairs = sorted(((self.key(sort, task), task) for task in tasks), key=lambda pair: pair[0])
+                index = (version, [pair[0] for pair in pairs], [pair[1] for pair in pairs])
+                self.indexes[(state, sort)] = index
+                self.builds += 1
+            return index[1], index[2]
+    
+    def query(self, state: str = 'queued', sort: str = 'date', order: str = 'desc', action: str = None,
+              user: str = None, since: int = None, until: int = None, cursor: str = None, limit: int = 25) -> dict:
+        """
+        Queries the tasks of a state.
+        
+        Args:
+            state (str): The state of the tasks, one of `STATES`.
+            sort (str): The sort of the tasks, one of `SORTS`.
+            order (str): The order of the tasks, `asc` or `desc`.
+            action (str): The action of the tasks.
+            user (str): A case insensitive substring of the user names.
+            since (int): The earliest creation date of the tasks in epoch seconds.
+            until (int): The latest creation date of the tasks in epoch seconds.
+            cursor (str): The cursor of the page, as returned by the previous query. None for the first page.
+            limit (int): The maximum number of tasks.
+        
+        Returns:
+            dict: The tasks, the cursors of the `next` and the `prev` page, which are None if there is no such page,
+                and the `count` of all tasks of the state.
+        
+        Raises:
+            ValueError: If the state, the sort, the order or the cursor is invalid.
+        """
+        if state not in self.STATES or sort not in self.SORTS or order not in ('asc', 'desc'):
+            raise ValueError(f'Invalid task query: {state}, {sort}, {order}')
+        direction, cursor_sort, after = self.decode(cursor) if cursor else ('next', sort, None)
+        if cursor_sort != sort:
+            # the keys of another sort can not be compared
+            raise ValueError(f'Invalid cursor for the sort: {sort}')
+        keys, tasks = self._index(state, sort)
+        
+        # the bounds of the walk, narrowed to the date range if the index is sorted by date
+        low, high = 0, len(keys)
+        if sort == 'date':
+            if since is not None:
+                low = bisect.bisect_left(keys, (since,))
+            if until is not None:
+                high = bisect.bisect_left(keys, (until + 1,))
+        
+        forward = (order == 'asc') == (direction == 'next')
+        if forward:
+            position = low if after is None else max(low, bisect.bisect_right(keys, after))
+        else:
+            position = high - 1 if after is None else min(high, bisect.bisect_left(keys, after)) - 1
+        step = 1 if forward else -1
+        user = user.casefold() if user else None
+        
+        found = []
+        last = None
+        scanned = 0
+        while low <= position < high and len(found) <= limit and scanned < self.scan:
+            task = tasks[position]
+            last = position
+            position += step
+            scanned += 1
+            
+            if self.match(task, action, user, since, until):
+                found.append(last)
+        
+        # a page which checked `scan` tasks continues after the last checked task, even with fewer matches
+        if len(found) > limit:
+            found = found[:limit]
+            edge = found[-1]
+        elif scanned >= self.scan and low <= position < high:
+            edge = last
+        else:
+            edge = None
+        
+        if direction == 'next':
+            page = found
+            following = self.encode('next', sort, keys[edge]) if edge is not None else None
+            previous = self.encode('prev', sort, keys[found[0]]) if after is not None and found else None
+        else:
+            page = found[::-1]
+            previous = self.encode('prev', sort, keys[edge]) if edge is not None else None
+            following = self.encode('next', sort, keys[found[0]]) if found else None
+        
+        return {
+            'tasks': [tasks[i] for i in page],
+            'next': following,
+            'prev': previous,
+            'count': len(keys),
+        }
+    
+    def select(self, state: str = 'queued', action: str = None, user: str = None, since: int = None,
+               until: int = None) -> list:
+        """
+        Selects all tasks of a state which match the filters, e.g. for a bulk operation. Unlike a query, the selection
+        is neither paginated nor capped by `scan`, and the date range is found by a binary search in the date index.
+        
+        Args:
+            state (str): The state of the tasks, one of `STATES`.
+            action (str): The action of the tasks.
+            user (str): A case insensitive substring of the user names.
+            since (int): The earliest creation date of the tasks in epoch seconds.
+            until (int): The latest creation date of the tasks in epoch seconds.
+        
+        Returns:
+            list: The tasks, oldest first.
+        
+        Raises:
+            ValueError: If the state is invalid.
+        """
+        if state not in self.STATES:
+            raise ValueError(f'Invalid task state: {state}')
+        keys, tasks = self._index(state, 'date')
+        low = 0 if since is None else bisect.bisect_left(keys, (since,))
+        high = len(keys) if until is None else bisect.bisect_left(keys, (until + 1,))
+        user = user.casefold() if user else None
+        return [task for task in tasks[low:high] if self.match(task, action, user)]
+    
+    def stats(self) -> dict:
+        """
+        Returns the query metrics.
+        
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        return {
+            'indexes': len(self.indexes),
+            'builds': self.builds,
+        }
@@ -12,6 +12,7 @@ About:
 
 """
 
+import asyncio
 import logging
 import os
 import time
@@ -45,6 +46,15 @@ class TaskQueue:
         config (dict): The configuration dictionary.
         logger (logging.Logger): The logger.
     """
+    # the states of the tasks, by the name of their list
+    STATES = {
+        'queued': 'tasks',
+        'instant': 'instant_tasks',
+        'finished': 'finished_tasks',
+        'errors': 'errors',
+        'deleted': 'deleted_tasks',
+    }
+    
     def __init__(self, config: dict, logger: logging.Logger):
         self.config = config
         self.logger = logger
@@ -55,6 +65,14 @@ class TaskQueue:
         self.errors = []
         self.path_tasks = 'Modules/data/tasks.xml'
         
+        self.version = 0
+        self.saved_version = 0
+        self.changed_time = 0
+        self.dirty_time = None
+        self.saving = False
+        self.last_save_time = 0
+        self.last_save_duration = 0
+        
         self.TASK_TW_TIMEOUT = "twitch_timeout"
         self.TASK_TW_BAN = "twitch_ban"
         self.TASK_TW_UNBAN = "twitch_unban"
@@ -89,6 +107,25 @@ class TaskQueue:
         ]
         return TASKS
 
+    def _touch(self) -> None:
+        """
+        Marks the queue as changed. Every mutation of the queue increases the version by one, so a backup can tell
+        whether anything changed since the last save, even if the number of tasks stayed the same.
+        """
+        self.version += 1
+        self.changed_time = time.time()
+        if self.dirty_time is None:
+            self.dirty_time = self.changed_time
+    
+    def is_dirty(self) -> bool:
+        """
+        Checks if the queue has changed since the last save.
+        
+        Returns:
+            bool: True if the queue has unsaved changes, False if not.
+        """
+        return self.version != self.saved_version
+    
     def add_task(self, task: Task, instant: bool = False) -> None:
         """
         Adds a task to the queue. The task can be any object.
@@ -97,6 +134,7 @@ class TaskQueue:
             task: The task to add to the queue.
             instant: True if the task should be executed instantly, False if the task should be queued.
         """
+        self._touch()
         if task.instant or instant:
             self.instant_tasks.append(task)
             self.logger.info(f'Adding Instant Task | {task.action} ({task.id})')
@@ -115,6 +153,7 @@ class TaskQueue:
             Task: The task from the queue.
         """
         task = self.tasks.pop(0) if not instance else self.instant_tasks.pop(0)
+        self._touch()
         self.logger.info(f'Getting Task | {task.action} ({task.id}) | Queue size: {self.get_task_count()}')
         return task
     
@@ -126,20 +165,57 @@ class TaskQueue:
             task_id: The task id.
         
         Returns:
-            Task: The task from the queue.
+            Task: The task from the queue, or None if there is no such task.
         """
-        for task in self.tasks:
-            if task.id == task_id:
-                return self.tasks.pop(self.tasks.index(task))
-        for task in self.finished_tasks:
-            if task.id == task_id:
-                return self.finished_tasks.pop(self.finished_tasks.index(task))
-        for task in self.deleted_tasks:
-            if task.id == task_id:
-                return self.deleted_tasks.pop(self.deleted_tasks.index(task))
-        for task in self.errors:
-            if task.id == task_id:
-                return self.errors.pop(self.errors.index(task))
+        for tasks in (self.tasks, self.finished_tasks, self.deleted_tasks, self.errors):
+            for i, task in enumerate(tasks):
+                if task.id == task_id:
+                    self._touch()
+                    return tasks.pop(i)
+    
+    def move_tasks(self, task_ids: set, state: str, source: str = None) -> list:
+        """
+        Moves many tasks to a state at once, e.g. all failed tasks back into the queue. Every list is walked once, so
+        the cost does not grow with the number of moved tasks, and the move is one change of the queue. A task which is
+        moved into the queue goes to the instant tasks if it is an instant task, like in `add_task`.
+        
+        The move does not await, so on the event loop it is applied as a whole. The caller saves the queue afterwards.
+        
+        Args:
+            task_ids (set): The ids of the tasks.
+            state (str): The state to move the tasks to, one of `STATES`.
+            source (str): The state to move the tasks from, or None for every other state.
+        
+        Returns:
+            list: The moved tasks.
+        
+        Raises:
+            ValueError: If the state or the source is invalid.
+        """
+        if state not in self.STATES or (source is not None and source not in self.STATES):
+            raise ValueError(f'Invalid task state: {state}, {source}')
+        
+        moved = []
+        for name in ([source] if source is not None else self.STATES):
+            if name == state:
+                continue
+            tasks = getattr(self, self.STATES[name])
+            keep = []
+            for task in tasks:
+                (moved if task.id in task_ids else keep).append(task)
+            # the list is changed in place, the bots may hold a reference to it
+            tasks[:] = keep
+        if not moved:
+            return moved
+        
+        if state == 'queued':
+            self.tasks.extend(task for task in moved if not task.instant)
+            self.instant_tasks.extend(task for task in moved if task.instant)
+        else:
+            getattr(self, self.STATES[state]).extend(moved)
+        self._touch()
+        self.logger.info(f'Moved Tasks | {len(moved)} to {state} | Queue size: {self.get_task_count()}')
+        return moved
 
     def end_task(self, task: Task) -> None:
         """
@@ -149,6 +225,7 @@ class TaskQueue:
             task: The task to mark as done.
         """
         self.finished_tasks.append(task)
+        self._touch()
         self.logger.info(f'Finished Task | {task.action} ({task.id}) | Queue size: {self.get_task_count()}')
     
     def remove_task(self, task: Task) -> None:
@@ -159,6 +236,7 @@ class TaskQueue:
             task: The task to remove from the queue.
         """
         self.deleted_tasks.append(task)
+        self._touch()
         self.logger.info(f'Removed Task | {task.action} ({task.id})')
     
     def error_task(self, task: Task) -> None:
@@ -169,6 +247,7 @@ class TaskQueue:
             task: The task to mark as an error.
         """
         self.errors.append(task)
+        self._touch()
         self.logger.warning(f'Error Task | {task.action} ({task.id}) | Queue size: {self.get_task_count()}')
     
     def get_task_count(self) -> int:
@@ -243,6 +322,62 @@ class TaskQueue:
         """
         Saves a list of tasks from the queue to an XML file.
         """
+        version = self.version
+        self.dirty_time = None
+        self._write_tasks(self._snapshot())
+        self.saved_version = version
+    
+    async def save_tasks_async(self) -> None:
+        """
+        Saves a list of tasks from the queue to an XML file without blocking the event loop. The queue is copied on the
+        event loop, and the XML serialization and the file write run in a worker thread. Changes which are made while
+        the file is written are saved by the next call.
+        """
+        if self.saving:
+            return
+        
+        self.saving = True
+        version = self.version
+        dirty_time, self.dirty_time = self.dirty_time, None
+        snapshot = self._snapshot()
+        start_time = time.time()
+        try:
+            await asyncio.to_thread(self._write_tasks, snapshot)
+            self.saved_version = version
+            self.last_save_time = time.time()
+            self.last_save_duration = self.last_save_time - start_time
+        except BaseException:
+            # the queue is still dirty since the first unsaved change, so the next backup is not delayed further
+            self.dirty_time = dirty_time
+            raise
+        finally:
+            self.saving = False
+    
+    def _snapshot(self) -> dict:
+        """
+        Copies the task lists and the task data, so the copy can be serialized while the queue keeps changing.
+        
+        Returns:
+            dict: The copied task lists.
+        """
+        def copy(tasks: list) -> list:
+            return [(t.id, t.action, t.instant, t.date, t.time, t.role, dict(t.data)) for t in tasks]
+        
+        return {
+            "tasks": copy(self.tasks),
+            "finished": copy(self.finished_tasks),
+            "deleted": copy(self.deleted_tasks),
+            "errors": copy(self.errors)
+        }
+    
+    def _write_tasks(self, task_data: dict) -> None:
+        """
+        Writes copied task lists to the XML file. The file is written to a temporary file first and then renamed, so a
+        crash never leaves a partially written file behind.
+        
+        Args:
+            task_data (dict): The copied task lists.
+        """
         
         def indent(elem, level = 0):
             """Indented formatting for XML"""
@@ -260,30 +395,24 @@ class TaskQueue:
                 if level and (not elem.tail or not elem.tail.strip()):
                     elem.tail = i
         
-        task_data = {
-            "tasks": self.tasks,
-            "finished": self.finished_tasks,
-            "deleted": self.deleted_tasks,
-            "errors": self.errors
-        }
-        
         root = ET.Element("TaskData")
         for key, value in task_data.items():
             sub_element = ET.SubElement(root, key)
-            for task in value:
+            for task_id, action, instant, date, timeframe, role, data in value:
                 task_element = ET.SubElement(sub_element, "Task")
-                task_element.set("id", str(task.id))
-                task_element.set("action", task.action)
-                task_element.set("instant", str(task.instant))
-                task_element.set("date", str(task.date))
-                if task.time is not None:
-                    task_element.set("time", str(task.time))
-                if task.role is not None:
-                    task_element.set("role", str(task.role))
-                for data_key, data_value in task.data.items():
+                task_element.set("id", str(task_id))
+                task_element.set("action", action)
+                task_element.set("instant", str(instant))
+                task_element.set("date", str(date))
+                if timeframe is not None:
+                    task_element.set("time", str(timeframe))
+                if role is not None:
+                    task_element.set("role", str(role))
+                for data_key, data_value in data.items():
                     task_element.set(data_key, str(data_value))
         
         tree = ET.ElementTree(root)
         indent(root)
-        tree.write(self.path_tasks, encoding = 'utf-8', xml_declaration = True)
-    
+        path_tmp = f'{self.path_tasks}.tmp'
+        tree.write(path_tmp, encoding = 'utf-8', xml_declaration = True)
+        os.replace(path_tmp, self.path_tasks)
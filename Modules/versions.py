@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides the validators of the JSON API of the web server. Every resource of the API has a version,
+    which is derived from the version counters of its state, so a client which already has the current version is
+    answered with 304 Not Modified before the response is built.
+
+"""
+import hashlib
+import threading
+import time
+
+
+class ApiVersions:
+    """
+    The validators of the API resources. A resource is identified by its name, and its version is any hashable value
+    which changes whenever the resource changes, e.g. the version counter of the task queue. The entity tag of a
+    resource is a digest of the build, the name, the version and the variant, e.g. the query string of a filtered
+    resource. The time of the last modification is recorded whenever a new version of a resource is seen, unless the
+    state knows the time of its last change itself.
+    
+    Args:
+        build (str): The build of the bot. A new build invalidates all entity tags.
+    """
+    def __init__(self, build: str):
+        self.build = build
+        self.lock = threading.Lock()
+        self.resources = {}
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def check(self, name: str, version, changed: float = None, variant: str = '') -> tuple:
+        """
+        Returns the validators of a version of a resource.
+        
+        Args:
+            name (str): The name of the resource.
+            version: The version of the resource.
+            changed (float): The time of the last change in epoch seconds, or None to use the time the version was
+                first seen.
+            variant (str): The variant of the resource, e.g. the query string.
+        
+        Returns:
+            tuple: The entity tag and the time of the last modification in epoch seconds.
+        """
+        with self.lock:
+            known = self.resources.get(name)
+            if known is None or known[0] != version:
+                known = (version, changed or time.time())
+                self.resources[name] = known
+            elif changed:
+                known = (version, changed)
+        
+        etag = hashlib.sha1(f'{self.build}|{name}|{version!r}|{variant}'.encode('utf-8')).hexdigest()[:24]
+        return etag, known[1]
+    
+    def record(self, fresh: bool) -> None:
+        """
+        Counts a conditional request.
+        
+        Args:
+            fresh (bool): True if the client had the current version, False if the response was built.
+        """
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+    
+    def stats(self) -> dict:
+        """
+        Returns the validator metrics.
+        
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        total = self.hits + self.misses
+        return {
+            'resources': len(self.resources),
+            'not_modified': self.hits,
+            'built': self.misses,
+            'hit_rate': int(self.hits / total * 100) if total else 0,
+        }
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script benchmarks the log view of the web server on a large log file. It writes a log file of the given size,
+    and times the tail of the `LogIndex` against the old `get_logs`, which read and parsed the whole file on every
+    request.
+    
+    Usage:
+        python Tools/bench_logs.py --size 500
+
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Modules.logindex import LogIndex
+
+
+MARKER = '==v' + '=' * 97 + 'v=='
+SKIP = '=' * 103
+MESSAGES = [
+    'Twitch Command | ask | someone',
+    'Luna Health | Latency: 42ms',
+    'Polling | stream offline, next poll in 120s',
+    'Discord | member joined guild 123456789',
+    'Quota | translate | twitch:someone | Rate limited for 8s',
+]
+
+
+def generate(path: str, size: int) -> None:
+    """
+    Writes a log file in the format of the logger, with one start marker at the top.
+    
+    Args:
+        path (str): The path of the log file.
+        size (int): The size of the log file in MB.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(f"2026-10-01 00:00:00,000 | INFO | ValkyrieBot.py | 77 | __env__ | b'{MARKER}'\n")
+        block = ''.join(
+            f"2026-10-01 00:00:{i % 60:02d},{i % 1000:03d} | {random.choice(['INFO', 'INFO', 'WARNING', 'ERROR'])} | "
+            f"bot_twitch.py | {i % 400} | event_message | b'{random.choice(MESSAGES)} #{i}'\n"
+            for i in range(20000)
+        )
+        while f.tell() < size * 1024 * 1024:
+            f.write(block)
+
+
+def get_logs(path: str) -> list:
+    """
+    The old log view of the web server, which reads and parses the whole log file.
+    
+    Args:
+        path (str): The path of the log file.
+    
+    Returns:
+        list: The entries since the last start marker.
+    """
+    logs = []
+    with open(path, 'r') as f:
+        last_part = f.read().split(MARKER + "'")[-1]
+    for l in last_part.split('\n'):
+        if l == '':
+            continue
+        log_data = l[:-1].replace("b'", '').replace('b"', '').split(' | ', 5)
+        if log_data[5] != SKIP:
+            logs.append({'time': log_data[0], 'level': log_data[1], 'file': log_data[2], 'line': log_data[3],
+                         'method': log_data[4], 'message': log_data[5]})
+    return logs
+
+
+def timed(func, *args) -> tuple:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.regenerate or not os.path.exists(args.path) or os.path.getsize(args.path) < args.size * 1024 * 1024:
+        print(f'Writing a {args.size} MB log file to {args.path}')
+        generate(args.path, args.size)
+    print(f'Log file: {os.path.getsize(args.path) / 1024 / 1024:.0f} MB')
+    
+    old, t_old = timed(get_logs, args.path)
+    index = LogIndex(args.path, MARKER, SKIP, args.buffer)
+    new, t_first = timed(index.tail, args.tail)
+    assert [e['message'] for e in old[-args.tail:]] == [e['message'] for e in new], 'LogIndex and get_logs differ'
+    
+    start = time.perf_counter()
+    for _ in range(100):
+        index.tail(args.tail)
+    t_warm = (time.perf_counter() - start) * 10
+    
+    with open(args.path, 'a') as f:
+        for i in range(100):
+            f.write(f"2026-10-02 00:00:00,000 | INFO | bot_web.py | 1 | index | b'appended {i}'\n")
+    appended, t_append = timed(index.tail, args.tail)
+    assert appended[-1]['message'] == 'appended 99'
+    
+    print(f'{"old get_logs":<36} {t_old:>10.1f} ms')
+    print(f'{"LogIndex first tail":<36} {t_first:>10.1f} ms')
+    print(f'{"LogIndex tail, file unchanged":<36} {t_warm:>10.3f} ms')
+    print(f'{"LogIndex tail, 100 lines appended":<36} {t_append:>10.3f} ms')
+    
+    if not args.keep:
+        os.remove(args.path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the log view on a large log file.')
+    parser.add_argument('--path', default=os.path.join(tempfile.gettempdir(), 'valkyrie_bench.log'), help='path of the generated log file')
+    parser.add_argument('--size', type=int, default=500, help='size of the log file in MB')
+    parser.add_argument('--buffer', type=int, default=5000, help='web.log_buffer of the LogIndex')
+    parser.add_argument('--tail', type=int, default=5, help='number of entries to compare')
+    parser.add_argument('--regenerate', action='store_true', help='write the log file even if it exists')
+    parser.add_argument('--keep', action='store_true', help='keep the log file for the next run')
+    main(parser.parse_args())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script benchmarks the translation throughput of the Luna client against the local Luna stand-in. It compares
+    batched requests, the fallback to parallel single requests of a Luna API without a batch endpoint, and unbatched
+    requests.
+    
+    Usage:
+        python Tools/bench_luna.py --requests 500 --clients 64
+
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Modules.luna import LunaBatcher, LunaClient
+from luna_standin import LunaStandIn, start
+
+
+MODES = {
+    'batched': {'batch_endpoint': True, 'enabled': True},
+    'fallback-parallel': {'batch_endpoint': False, 'enabled': True},
+    'unbatched': {'batch_endpoint': True, 'enabled': False},
+}
+
+
+async def run(mode: str, args: argparse.Namespace) -> dict:
+    """
+    Sends the translations of one mode through a fresh client and stand-in.
+    
+    Args:
+        mode (str): The mode, one of `MODES`.
+        args (argparse.Namespace): The arguments of the benchmark.
+    
+    Returns:
+        dict: The throughput and latencies of the mode.
+    """
+    options = MODES[mode]
+    standin = LunaStandIn(batch=options['batch_endpoint'], overhead=args.overhead, per_item=args.per_item, workers=args.workers)
+    runner, url = await start(standin)
+    
+    config = {'luna': {
+        'concurrency': args.concurrency,
+        'batch': {'enabled': options['enabled'], 'window': args.window, 'size': args.size, 'endpoint': True},
+    }}
+    logger = logging.getLogger('bench')
+    client = LunaClient(logger, config)
+    batcher = LunaBatcher(logger, config, client, f'{url}/luna/translate', lambda: {'Content-Type': 'application/json'})
+    
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(f'message {i}')
+    latencies = []
+    
+    async def worker():
+        while not queue.empty():
+            text = queue.get_nowait()
+            begin = time.perf_counter()
+            data, _ = await batcher.submit(text, 'en')
+            latencies.append(time.perf_counter() - begin)
+            assert data['Data'] == text.upper()
+    
+    try:
+        start_time = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.clients)])
+        elapsed = time.perf_counter() - start_time
+    finally:
+        await client.close()
+        await runner.cleanup()
+    
+    latencies.sort()
+    return {
+        'mode': mode,
+        'throughput': args.requests / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'requests': standin.requests,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f'{args.requests} translations | {args.clients} callers | Luna concurrency {args.concurrency} | '
+          f'{args.overhead * 1000:g} ms per request + {args.per_item * 1000:g} ms per message')
+    print(f'{"mode":<18} {"msg/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"requests":>9}')
+    for mode in MODES:
+        result = await run(mode, args)
+        print(f'{result["mode"]:<18} {result["throughput"]:>9.1f} {result["p50"]:>9.1f} {result["p95"]:>9.1f} '
+              f'{result["requests"]:>9}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the translation throughput of the Luna client.')
+    parser.add_argument('--requests', type=int, default=500, help='number of translations')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent callers')
+    parser.add_argument('--concurrency', type=int, default=4, help='luna.concurrency of the client')
+    parser.add_argument('--window', type=float, default=0.01, help='luna.batch.window in seconds')
+    parser.add_argument('--size', type=int, default=16, help='luna.batch.size')
+    parser.add_argument('--overhead', type=float, default=0.02, help='seconds per request of the stand-in')
+    parser.add_argument('--per-item', type=float, default=0.002, help='seconds per message of the stand-in')
+    parser.add_argument('--workers', type=int, default=1, help='requests the stand-in processes at once')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script vendors and builds the assets of the dashboard ahead of a deployment. It downloads every source which
+    is not vendored yet from the CDN into `Web/vendor`, and writes the bundles and the manifest to `Web/data/assets`.
+    Deployed with both folders, the web server serves the assets without reaching the CDN.
+    
+    Usage:
+        python Tools/build_assets.py
+        python Tools/build_assets.py --root Web --clean
+
+"""
+import argparse
+import http.client
+import logging
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Modules.assets import AssetPipeline
+
+
+def main(args: argparse.Namespace) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s')
+    logger = logging.getLogger('assets')
+    
+    pipeline = AssetPipeline(logger, args.root)
+    if args.clean and os.path.isdir(pipeline.vendor):
+        logger.info(f'Assets | Removing {pipeline.vendor}')
+        shutil.rmtree(pipeline.vendor)
+    
+    try:
+        manifest = pipeline.build()
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        logger.error(f'Assets | Failed to build the assets | {str(e)}')
+        return 1
+    
+    # a file which could not be vendored stays on the CDN, so the build would not work offline
+    if manifest['cdn']:
+        logger.error(f'Assets | Not vendored, left on the CDN: {", ".join(manifest["cdn"])}')
+        return 1
+    logger.info(f'Assets | {manifest["css"]} | {manifest["js"]} | Vendored to {pipeline.vendor}')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Vendors and builds the assets of the dashboard.')
+    parser.add_argument('--root', default='Web', help='folder of the web server')
+    parser.add_argument('--clean', action='store_true', help='download every source again')
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides a local stand-in for the Luna API, for tests and benchmarks of the Luna client. It serves the
+    ping, translate and ask endpoints, and optionally the batch translate endpoint, with a simulated processing time.
+    
+    Usage:
+        python Tools/luna_standin.py --port 8090
+        python Tools/luna_standin.py --port 8090 --no-batch
+
+"""
+import argparse
+import asyncio
+import sys
+
+from aiohttp import web
+
+
+class LunaStandIn:
+    """
+    A stand-in Luna API. Like a model server, it processes one request at a time. Every request costs `overhead`
+    seconds, and every translated message costs `per_item` seconds more, so a batch of messages is cheaper than the same
+    messages one by one. A translation is the message in upper case.
+    
+    Args:
+        version (int): The version of the REST API, e.g. 1 for `/rest/v1`.
+        batch (bool): True to serve the batch translate endpoint, False to answer it with 404 like an older Luna API.
+        overhead (float): The processing time of a request in seconds.
+        per_item (float): The processing time of a translated message in seconds.
+        workers (int): The number of requests which are processed at once.
+    """
+    def __init__(self, version: int = 1, batch: bool = True, overhead: float = 0.02, per_item: float = 0.002, workers: int = 1):
+        self.prefix = f'/rest/v{version}'
+        self.batch = batch
+        self.overhead = overhead
+        self.per_item = per_item
+        self.workers = asyncio.Semaphore(workers)
+        
+        self.requests = 0
+        self.messages = 0
+    
+    def app(self) -> web.Application:
+        """
+        Returns the web application of the stand-in.
+        
+        Returns:
+            web.Application: The application.
+        """
+        app = web.Application()
+        app.router.add_post(f'{self.prefix}/ping', self.ping)
+        app.router.add_post(f'{self.prefix}/luna/translate', self.translate)
+        app.router.add_post(f'{self.prefix}/luna/ask', self.ask)
+        if self.batch:
+            app.router.add_post(f'{self.prefix}/luna/translate/batch', self.translate_batch)
+        return app
+    
+    async def work(self, items: int) -> None:
+        """
+        Simulates the processing of a request.
+        
+        Args:
+            items (int): The number of messages of the request.
+        """
+        async with self.workers:
+            self.requests += 1
+            self.messages += items
+            await asyncio.sleep(self.overhead + self.per_item * items)
+    
+    @staticmethod
+    def translation(payload: dict) -> str:
+        """
+        Returns the translation of a message.
+        
+        Args:
+            payload (dict): The payload with the `message` and the `language`.
+        
+        Returns:
+            str: The translation.
+        """
+        return str(payload['message']).upper()
+    
+    async def ping(self, request: web.Request) -> web.Response:
+        return web.json_response({'Data': 'pong'})
+    
+    async def translate(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        await self.work(1)
+        return web.json_response({'Data': self.translation(payload)})
+    
+    async def translate_batch(self, request: web.Request) -> web.Response:
+        messages = (await request.json())['messages']
+        await self.work(len(messages))
+        return web.json_response({'Data': [self.translation(payload) for payload in messages]})
+    
+    async def ask(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        await self.work(1)
+        return web.json_response({'Data': f'You asked: {payload["message"]}'})
+
+
+async def start(standin: LunaStandIn, host: str = '127.0.0.1', port: int = 0) -> tuple:
+    """
+    Starts a stand-in Luna API on the running event loop.
+    
+    Args:
+        standin (LunaStandIn): The stand-in.
+        host (str): The host to listen on.
+        port (int): The port to listen on, 0 for a free port.
+    
+    Returns:
+        tuple: The runner, which is cleaned up to stop the server, and the base url of the REST API.
+    """
+    runner = web.AppRunner(standin.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://{host}:{port}{standin.prefix}'
+
+
+async def main(args: argparse.Namespace) -> None:
+    standin = LunaStandIn(args.version, not args.no_batch, args.overhead, args.per_item, args.workers)
+    runner, url = await start(standin, args.host, args.port)
+    print(f'Luna stand-in listening on {url} | Batch endpoint: {not args.no_batch}')
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='A local stand-in for the Luna API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--version', type=int, default=1)
+    parser.add_argument('--no-batch', action='store_true', help='answer the batch endpoint with 404')
+    parser.add_argument('--overhead', type=float, default=0.02, help='seconds per request')
+    parser.add_argument('--per-item', type=float, default=0.002, help='seconds per translated message')
+    parser.add_argument('--workers', type=int, default=1, help='requests processed at once')
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        sys.exit(0)
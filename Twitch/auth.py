@@ -10,11 +10,15 @@ About:
     This script provides the functionality to authorize the bot to use the Twitch API.
 
 """
+import asyncio
 import json
 import http.server
 import os
 import socketserver
+import time
 import webbrowser
+
+import aiohttp
 import requests
 
 from ValkyrieUtils.Logger import ValkyrieLogger
@@ -56,12 +60,97 @@ class OAuthCallbackHandler(http.server.SimpleHTTPRequestHandler):
 
 class Auth:
     """
-    A class which handles the authorization of the Twitch bot.
+    A class which handles the authorization of the Twitch bot. The token requests of the running bot share one session.
+    A failed refresh is retried after an exponential backoff, which starts at `refresh_backoff` seconds and doubles up
+    to `refresh_max_backoff` seconds, so an outage of Twitch or a revoked token does not send a request every loop.
     """
     def __init__(self, config: dict, logger: ValkyrieLogger):
         self.config = config
         self.logger = logger
+        self.expires_at = {"user": 0, "bot": 0}
+        self.locks = {"user": asyncio.Lock(), "bot": asyncio.Lock()}
+        self.session = None
+        
+        self.backoff = self.config['twitch'].get('refresh_backoff', 30)
+        self.max_backoff = self.config['twitch'].get('refresh_max_backoff', 1800)
+        self.failures = {"user": 0, "bot": 0}
+        self.retry_at = {"user": 0, "bot": 0}
+    
+    def _session(self) -> aiohttp.ClientSession:
+        """
+        Returns the session of the token requests. The session is created on first use, because it has to be created
+        inside the event loop which runs the requests.
+        
+        Returns:
+            aiohttp.ClientSession: The session.
+        """
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        return self.session
+    
+    async def close(self) -> None:
+        """
+        Closes the session of the token requests.
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+    
+    def due(self, kind: str) -> bool:
+        """
+        Checks if the token of the given kind of authorization may be refreshed, i.e. it is not in the backoff of a
+        failed refresh.
+        
+        Args:
+            kind (str): The kind of authorization. Can be either "user" or "bot".
+        
+        Returns:
+            bool: True if the token may be refreshed.
+        """
+        return time.time() >= self.retry_at[kind]
+        
+    @staticmethod
+    def _path(kind: str) -> str:
+        """
+        Returns the path of the token file for the given kind of authorization.
+        
+        Args:
+            kind (str): The kind of authorization. Can be either "user" or "bot".
+        
+        Returns:
+            str: The path of the token file.
+        """
+        if kind == "user":
+            return 'Twitch/data/bot/user.vcf'
+        elif kind == "bot":
+            return 'Twitch/data/bot/bot.vcf'
+        raise Exception(f'Invalid kind: {kind}')
+    
+    def _store(self, kind: str, data: dict) -> None:
+        """
+        Stores a token response in the configuration dictionary and sets the expiry time of the token. The new values
+        are assigned one by one, so readers of the configuration always see either the old or the new token.
+        
+        Args:
+            kind (str): The kind of authorization. Can be either "user" or "bot".
+            data (dict): The OAuth dict for the bot.
+        """
+        self.config['twitch'][kind]['token'] = data.get('access_token')
+        self.config['twitch'][kind]['refresh_token'] = data.get('refresh_token')
+        self.config['twitch'][kind]['token_expires'] = data.get('expires_in')
+        self.expires_at[kind] = time.time() + int(data.get('expires_in') or 0)
+    
+    def _save(self, kind: str, data: dict) -> None:
+        """
+        Saves the token of the given kind of authorization to its token file.
         
+        Args:
+            kind (str): The kind of authorization. Can be either "user" or "bot".
+            data (dict): The token configuration to save.
+        """
+        path = self._path(kind)
+        cfg = ValkyrieConfig(path, self.logger, False)
+        cfg.save(data, path)
+    
     def authorize(self, client_id: str, client_secret: str, redirect_uri: str, scopes: list, kind: str = "user") -> str:
         """
         Authorizes the bot to use the Twitch API.
@@ -74,14 +163,11 @@ class Auth:
             kind (str): The kind of authorization. Can be either "user" or "bot".
         """
         refresh = False
+        path = self._path(kind)
         if kind == "user":
             self.logger.info('Authorizing Twitch Account')
-            path = 'Twitch/data/bot/user.vcf'
-        elif kind == "bot":
-            self.logger.info('Authorizing Twitch Bot')
-            path = 'Twitch/data/bot/bot.vcf'
         else:
-            raise Exception(f'Invalid kind: {kind}')
+            self.logger.info('Authorizing Twitch Bot')
         
         if os.path.exists(path):
             cfg = ValkyrieConfig(path, self.logger, False).get_config()
@@ -97,14 +183,79 @@ class Auth:
             code = self._get_auth_code(client_id, redirect_uri, scopes)
             data = self._get_auth_token(client_id, client_secret, code, redirect_uri)
         
-        self.config['twitch'][kind]['token'] = data.get('access_token')
-        self.config['twitch'][kind]['refresh_token'] = data.get('refresh_token')
-        self.config['twitch'][kind]['token_expires'] = data.get('expires_in')
-        
-        cfg = ValkyrieConfig(path, self.logger, False)
-        cfg.save(self.config['twitch'][kind], path)
+        self._store(kind, data)
+        self._save(kind, self.config['twitch'][kind])
         
         return self.config['twitch'][kind]['token']
+    
+    async def refresh(self, kind: str = "user") -> str:
+        """
+        Refreshes the token of the given kind of authorization without blocking the event loop. The token request is
+        made with aiohttp and the token file is written in a worker thread.
+        
+        Args:
+            kind (str): The kind of authorization. Can be either "user" or "bot".
+            
+        Returns:
+            str: The new OAuth token.
+        """
+        async with self.locks[kind]:
+            client_id = self.config['twitch'][kind]['client_id']
+            client_secret = self.config['twitch'][kind]['client_secret']
+            refresh_token = self.config['twitch'][kind]['refresh_token']
+            
+            url = 'https://id.twitch.tv/oauth2/token'
+            params = {
+                'client_id': client_id,
+                'client_secret': client_secret,
+                'grant_type': 'refresh_token',
+                'refresh_token': refresh_token
+            }
+            try:
+                async with self._session().post(url, params=params) as resp:
+                    if resp.status != 200:
+                        raise Exception(f'Failed to refresh OAuth token: {await resp.text()}')
+                    data = await resp.json()
+            except Exception:
+                self.failures[kind] += 1
+                delay = min(self.backoff * 2 ** (self.failures[kind] - 1), self.max_backoff)
+                self.retry_at[kind] = time.time() + delay
+                self.logger.warning(f'Twitch OAuth token refresh failed | {kind} | Retry in: {delay}s')
+                raise
+            
+            self.failures[kind] = 0
+            self.retry_at[kind] = 0
+            self._store(kind, data)
+            await asyncio.to_thread(self._save, kind, dict(self.config['twitch'][kind]))
+            self.logger.info(f'Twitch OAuth token refreshed | {kind} | Expires in: {data.get("expires_in")}s')
+            
+            return self.config['twitch'][kind]['token']
+    
+    async def validate(self, kind: str = "user") -> dict | None:
+        """
+        Validates the token of the given kind of authorization against the Twitch OAuth validation endpoint. The
+        expiry time of the token is updated with the remaining lifetime reported by Twitch.
+        
+        Args:
+            kind (str): The kind of authorization. Can be either "user" or "bot".
+            
+        Returns:
+            dict | None: The validation data, or None if the token is no longer valid.
+        """
+        url = 'https://id.twitch.tv/oauth2/validate'
+        headers = {
+            'Authorization': f'OAuth {self.config["twitch"][kind]["token"]}'
+        }
+        async with self._session().get(url, headers=headers) as resp:
+            if resp.status == 401:
+                self.logger.warning(f'Twitch OAuth token invalid | {kind}')
+                return None
+            if resp.status != 200:
+                raise Exception(f'Failed to validate OAuth token: {await resp.text()}')
+            data = await resp.json()
+        
+        self.expires_at[kind] = time.time() + int(data.get('expires_in') or 0)
+        return data
         
     def _get_auth_code(self, client_id: str, redirect_uri: str, scopes: list) -> str:
         """
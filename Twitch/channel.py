@@ -10,9 +10,14 @@ About:
     This script provides the functionality to get and set the stream information of a channel.
     
 """
+import datetime
 import logging
+import time
+
 import aiohttp
 
+from Modules.metrics import HELIX_TRACE
+
 
 class Channel:
     """
@@ -27,6 +32,7 @@ class Channel:
         - name (str): The name of the channel.
         - id (int): The id of the channel.
         - is_live (bool): True if the channel is live, False if the channel is offline.
+        - started_at (float): The start time of the current stream, or 0 if the channel is offline.
         - emotes (list): A list of emotes.
         - followers (list): A list of followers.
         - subscribers (list): A list of subscribers.
@@ -40,6 +46,7 @@ class Channel:
         self.name = self.config['twitch']['channel']
         self.id = 0
         self.is_live = False
+        self.started_at = 0
         self.emotes = []
         self.emotes_raw = []
         self.followers = []
@@ -56,6 +63,9 @@ class Channel:
         self.banned_raw = []
         self.stream = stream
         
+        self.version = 0
+        self.changed_time = 0
+        
     async def setup(self) -> None:
         """
         Sets up the channel by getting the emotes, followers, subscribers, VIPs, moderators, and stream information.
@@ -126,6 +136,15 @@ class Channel:
         self.stream.classification = info.get('content_classification_labels')
         
         self.logger.info(f'Twitch Stream | Title: {self.stream.title} | Game: {self.stream.game.name} | Language: {self.stream.language}')
+        self.touch()
+    
+    def touch(self) -> None:
+        """
+        Marks the channel as changed. Every change of the channel or its stream information increases the version by
+        one, so the web server can tell whether its stats changed since a client last asked.
+        """
+        self.version += 1
+        self.changed_time = time.time()
     
     # ==================================================================================================================
     # Getters
@@ -141,7 +160,7 @@ class Channel:
         Returns:
             int: The user id of the channel.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/users?login={username}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -158,7 +177,7 @@ class Channel:
         Returns:
             bool: True if the channel is live, False if the channel is offline.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/streams?user_id={str(self.id)}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -167,7 +186,11 @@ class Channel:
             async with session.get(url, headers=headers) as resp:
                 response_data = await resp.json()
                 if response_data.get('data'):
+                    started_at = response_data.get('data')[0].get('started_at')
+                    if started_at:
+                        self.started_at = datetime.datetime.fromisoformat(started_at.replace('Z', '+00:00')).timestamp()
                     return True
+                self.started_at = 0
                 return False
             
     async def get_emotes(self) -> list:
@@ -177,7 +200,7 @@ class Channel:
         Returns:
             list: A list of emotes.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/chat/emotes?broadcaster_id={str(self.id)}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -198,7 +221,7 @@ class Channel:
         Returns:
             list: A list of all followers or the total number of followers.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
                 'Authorization': f'Bearer {self.config["twitch"]["user"]["token"]}'
@@ -233,7 +256,7 @@ class Channel:
         Returns:
             list: A list of all subscribers or the total number of subscribers.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
                 'Authorization': f'Bearer {self.config["twitch"]["user"]["token"]}'
@@ -264,7 +287,7 @@ class Channel:
         Returns:
             list: A list of moderators.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/moderation/moderators?broadcaster_id={str(self.id)}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -281,7 +304,7 @@ class Channel:
         Returns:
             list: A list of VIPs.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/channels/vips?broadcaster_id={str(self.id)}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -298,7 +321,7 @@ class Channel:
         Returns:
             list: A list of bans.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/moderation/banned?broadcaster_id={str(self.id)}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -322,7 +345,7 @@ class Channel:
         if isinstance(mod_id, str):
             mod_id = await self.get_id(mod_id)
             
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/moderation/moderators?broadcaster_id={str(self.id)}&user_id={mod_id}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -344,7 +367,7 @@ class Channel:
         if isinstance(mod_id, str):
             mod_id = await self.get_id(mod_id)
             
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/moderation/moderators?broadcaster_id={str(self.id)}&user_id={mod_id}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -366,7 +389,7 @@ class Channel:
         if isinstance(vip_id, str):
             vip_id = await self.get_id(vip_id)
             
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/channels/vips?broadcaster_id={str(self.id)}&user_id={vip_id}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -388,7 +411,7 @@ class Channel:
         if isinstance(vip_id, str):
             vip_id = await self.get_id(vip_id)
             
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/channels/vips?broadcaster_id={str(self.id)}&user_id={vip_id}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -412,7 +435,7 @@ class Channel:
         if isinstance(timeout_id, str):
             timeout_id = await self.get_id(timeout_id)
             
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/moderation/bans?broadcaster_id={str(self.id)}&moderator_id={str(self.id)}&user_id={timeout_id}'
             data = {
                 "data": {
@@ -452,7 +475,7 @@ class Channel:
             ban_id (int | str): A user id to ban.
             reason (str): The reason for the ban.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             if isinstance(ban_id, str):
                 ban_id = await self.get_id(ban_id)
                 
@@ -484,7 +507,7 @@ class Channel:
         if isinstance(ban_id, str):
             ban_id = await self.get_id(ban_id)
             
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/moderation/bans?broadcaster_id={str(self.id)}&moderator_id={str(self.id)}&user_id={ban_id}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -504,7 +527,7 @@ class Channel:
             message (str): The message to send.
             color (str): The color of the message.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/chat/announcements?broadcaster_id={str(self.id)}&moderator_id={str(self.id)}'
             colors = ["blue", "green", "orange", "purple", "primary"]
             data = {
@@ -536,7 +559,7 @@ class Channel:
         if isinstance(to_user_id, str):
             to_user_id = await self.get_id(to_user_id)
             
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/whispers?from_user_id={str(self.id)}&to_id={str(to_user_id)}'
             data = {
                 'from_user_id': self.id,
@@ -10,15 +10,20 @@ About:
     This script provides the functionality serve commands to the Twitch bot.
 
 """
+import contextlib
 import random
 
 from twitchio.ext import commands
 
+from Modules.quota import QuotaExceeded
+
 
 class Commands:
     """
     A class to serve commands to the Twitch bot.
     """
+    MESSAGE_LIMIT = 500
+    
     def __init__(self, bot):
         self.bot = bot
         self.config = bot.config
@@ -82,7 +87,10 @@ class Commands:
         """
         self.logger.info(f'Twitch Command | translate | {ctx.author.name}')
         try:
-            response = await self.luna.lunaTranslate(text)
+            async with self.luna.quota.limit('translate', f'twitch:{ctx.author.name}'):
+                response = await self.luna.lunaTranslate(text)
+        except QuotaExceeded as e:
+            return await ctx.send(f'[LUNA] {e.message} | {ctx.author.name}')
         except Exception as e:
             self.logger.error(f'Failed to make the request: {str(e)}')
             response = {
@@ -105,7 +113,12 @@ class Commands:
         """
         self.logger.info(f'Twitch Command | ask | {ctx.author.name}')
         try:
-            response = await self.luna.lunaAsk(text)
+            async with self.luna.quota.limit('ask', f'twitch:{ctx.author.name}'):
+                if self.luna.stream:
+                    return await self.do_ask_stream(ctx, text)
+                response = await self.luna.lunaAsk(text)
+        except QuotaExceeded as e:
+            return await ctx.send(f'[LUNA] {e.message} | {ctx.author.name}')
         except Exception as e:
             self.logger.error(f'Failed to make the request: {str(e)}')
             response = {
@@ -118,6 +131,65 @@ class Commands:
             }
         await ctx.send(f'[LUNA] {response["data"]}')
     
+    async def do_ask_stream(self, ctx: commands.Context, text: str):
+        """
+        Asks Luna a question and sends the answer to the chat while it is streamed. The answer is sent in messages of
+        at most 500 characters, and complete sentences are sent as soon as enough text has arrived.
+        
+        Args:
+            ctx (commands.Context): The context of the command.
+            text (str): The question to ask.
+        """
+        prefix = '[LUNA] '
+        limit = self.MESSAGE_LIMIT - len(prefix)
+        buffer = ''
+        try:
+            # the stream is closed right away if a send fails, so it does not hold a Luna connection
+            async with contextlib.aclosing(self.luna.lunaAskStream(text)) as stream:
+                async for chunk in stream:
+                    buffer += chunk
+                    messages, buffer = self.split_message(buffer, limit, self.luna.stream_min_chars)
+                    for message in messages:
+                        await ctx.send(f'{prefix}{message}')
+        except Exception as e:
+            self.logger.error(f'Failed to make the request: {str(e)}')
+            buffer += ' ...' if buffer else 'Command failed'
+        
+        messages, buffer = self.split_message(buffer, limit)
+        for message in messages + [buffer]:
+            if message:
+                await ctx.send(f'{prefix}{message}')
+    
+    @staticmethod
+    def split_message(text: str, limit: int, min_chars: int = None) -> tuple:
+        """
+        Splits the messages which can be sent from a streamed text. Text longer than the limit is split at the last
+        whitespace before the limit. If `min_chars` is given, the complete sentences of a text with at least that many
+        characters are split off as well.
+        
+        Args:
+            text (str): The text.
+            limit (int): The maximum length of a message.
+            min_chars (int): The minimum length of a message of complete sentences, or None to only split at the limit.
+        
+        Returns:
+            tuple: The list of messages and the remaining text.
+        """
+        messages = []
+        while len(text) > limit:
+            cut = text.rfind(' ', 0, limit + 1)
+            cut = cut if cut > 0 else limit
+            messages.append(text[:cut].strip())
+            text = text[cut:].lstrip()
+        
+        if min_chars is not None and len(text) >= min_chars:
+            cut = max(text.rfind(end) for end in ('. ', '! ', '? ', '\n'))
+            if cut > 0:
+                messages.append(text[:cut + 1].strip())
+                text = text[cut + 1:].lstrip()
+        
+        return messages, text
+    
     async def do_set_title(self, ctx: commands.Context, title: str):
         """
         A command that can be used to set the title of the stream.
@@ -54,6 +54,8 @@ class Event:
         self.logger.info(f'Twitch logged in as {self.channel.name}')
         self.logger.info(f'Twitch account id is {self.channel.id}')
         self.bot.loaded = True
+        if self.bot.board is not None:
+            self.bot.board.publish(self.bot)
     
     async def on_bits(self, event: pubsub.PubSubBitsMessage):
         """
@@ -141,3 +143,4 @@ class Event:
         
         self.channel.subscribers.append(recipient_name if is_gift else user_name)
         self.channel.subscriber_count += 1
+        self.channel.touch()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19, 2026
+@author: v_lky
+
+--------
+
+About:
+    This script provides an adaptive polling policy for the live status of a Twitch channel. The channel is polled fast
+    around its expected stream start times and right after its status changed, and the polling backs off exponentially
+    while the channel stays offline.
+
+"""
+import datetime
+import time
+
+from ValkyrieUtils.Logger import ValkyrieLogger
+
+
+class LivePoller:
+    """
+    A class which decides when the live status of a Twitch channel is polled next.
+
+    Properties:
+        - polls (int): The number of polls made.
+        - polls_saved (int): The number of polls saved compared to polling at the fixed interval.
+        - latency_last (float): The detection latency of the last status change in seconds.
+        - latency_avg (float): The average detection latency in seconds.
+        - latency_max (float): The maximum detection latency in seconds.
+
+    Args:
+        config (dict): The configuration dictionary.
+        logger (ValkyrieLogger): The logger.
+    """
+    DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+    def __init__(self, config: dict, logger: ValkyrieLogger):
+        self.config = config
+        self.logger = logger
+
+        polling = self.config['twitch'].get('polling', {})
+        self.adaptive = polling.get('adaptive', True)
+        self.floor = polling.get('floor', 15)
+        self.ceiling = polling.get('ceiling', 900)
+        self.factor = polling.get('factor', 1.5)
+        self.settle = polling.get('settle', 600)
+        self.window = polling.get('window', 1800)
+        self.schedule = polling.get('schedule', [])
+
+        self.interval = self.floor
+        self.next_time = 0
+        self.last_time = 0
+        self.change_time = 0
+        self.first_time = 0
+
+        self.polls = 0
+        self.polls_saved = 0
+        self.changes = 0
+        self.latency_last = 0
+        self.latency_avg = 0
+        self.latency_max = 0
+
+    def due(self, now: float = None) -> bool:
+        """
+        Checks if the live status should be polled now.
+
+        Args:
+            now (float): The current timestamp. Defaults to `time.time()`.
+
+        Returns:
+            bool: True if the live status should be polled, False if not.
+        """
+        now = time.time() if now is None else now
+        return now >= self.next_time
+
+    def record(self, is_live: bool, changed: bool, started_at: float = None, now: float = None) -> float:
+        """
+        Records the result of a poll and schedules the next one.
+
+        Args:
+            is_live (bool): True if the channel is live, False if the channel is offline.
+            changed (bool): True if the live status changed with this poll, False if not.
+            started_at (float): The start time of the stream reported by Twitch, if the channel went live.
+            now (float): The current timestamp. Defaults to `time.time()`.
+
+        Returns:
+            float: The interval until the next poll in seconds.
+        """
+        now = time.time() if now is None else now
+        if not self.first_time:
+            self.first_time = now
+        self.polls += 1
+
+        if changed and self.last_time:
+            # the change happened between the last and this poll, the stream start time is exact if Twitch reports it
+            since = started_at if is_live and started_at else self.last_time
+            latency = max(0.0, now - since)
+            self.changes += 1
+            self.latency_last = latency
+            self.latency_avg += (latency - self.latency_avg) / self.changes
+            self.latency_max = max(self.latency_max, latency)
+            self.logger.info(f'Live Poller | Status change detected | Latency: {int(latency)}s')
+
+        if changed:
+            self.change_time = now
+
+        self.interval = self.next_interval(is_live, changed, now)
+        self.last_time = now
+        self.next_time = now + self.interval
+        self.polls_saved = max(0, int((now - self.first_time) / self.config['interval']) + 1 - self.polls)
+        return self.interval
+
+    def next_interval(self, is_live: bool, changed: bool, now: float) -> float:
+        """
+        Calculates the interval until the next poll.
+
+        Args:
+            is_live (bool): True if the channel is live, False if the channel is offline.
+            changed (bool): True if the live status changed with the last poll, False if not.
+            now (float): The current timestamp.
+
+        Returns:
+            float: The interval until the next poll in seconds.
+        """
+        base = self.config['interval']
+        if not self.adaptive:
+            return base
+
+        # right after a status change or around an expected stream start
+        if changed or now - self.change_time < self.settle or self.in_window(now):
+            return self.floor
+
+        # while live, an offline status is detected at the fixed interval
+        if is_live:
+            return min(max(base, self.floor), self.ceiling)
+
+        # while offline, back off exponentially, but wake up for the next expected stream start
+        interval = min(max(self.interval, base) * self.factor, self.ceiling)
+        until_window = self.until_window(now)
+        if until_window is not None:
+            interval = min(interval, max(until_window, self.floor))
+        return max(interval, self.floor)
+
+    def _starts(self, now: float) -> list:
+        """
+        Returns the expected stream start times of the configured schedule in the week around the given time.
+
+        Args:
+            now (float): The current timestamp.
+
+        Returns:
+            list: A list of timestamps.
+        """
+        starts = []
+        today = datetime.datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        for entry in self.schedule:
+            day = self.DAYS.index(entry['day'].lower()[:3])
+            hour, minute = [int(x) for x in entry['time'].split(':')]
+            for week in [-7, 0, 7]:
+                date = today + datetime.timedelta(days=day - today.weekday() + week, hours=hour, minutes=minute)
+                starts.append(date.timestamp())
+        return starts
+
+    def in_window(self, now: float) -> bool:
+        """
+        Checks if the given time is within the window around an expected stream start.
+
+        Args:
+            now (float): The current timestamp.
+
+        Returns:
+            bool: True if the time is within a window, False if not.
+        """
+        return any(abs(now - start) <= self.window for start in self._starts(now))
+
+    def until_window(self, now: float) -> float | None:
+        """
+        Returns the seconds until the next window around an expected stream start begins.
+
+        Args:
+            now (float): The current timestamp.
+
+        Returns:
+            float | None: The seconds until the next window, or None if there is no schedule.
+        """
+        future = [start - self.window - now for start in self._starts(now) if start - self.window > now]
+        return min(future) if future else None
+
+    def stats(self) -> dict:
+        """
+        Returns the polling metrics.
+
+        Returns:
+            dict: A dictionary of metrics.
+        """
+        return {
+            'interval': int(self.interval),
+            'next': max(0, int(self.next_time - time.time())),
+            'polls': self.polls,
+            'polls_saved': self.polls_saved,
+            'latency_last': int(self.latency_last),
+            'latency_avg': int(self.latency_avg),
+            'latency_max': int(self.latency_max),
+        }
@@ -15,6 +15,8 @@ import aiohttp
 from ValkyrieUtils.Logger import ValkyrieLogger
 from ValkyrieUtils.Tools import ValkyrieTools
 
+from Modules.metrics import HELIX_TRACE
+
 
 class Stream:
     """
@@ -51,7 +53,7 @@ class Stream:
         Returns:
             dict: A dictionary of information.
         """
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/channels?broadcaster_id={str(user_id)}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -103,7 +105,7 @@ class Stream:
         else:
             self.tags = tags
         
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             url = f'{self.config["twitch"]["api_uri"]}/channels?broadcaster_id={str(user_id)}'
             headers = {
                 'Client-ID': self.config['twitch']['user']['client_id'],
@@ -155,7 +157,7 @@ class Game:
             'Client-ID': self.config['twitch']['user']['client_id'],
             'Authorization': f'Bearer {self.config["twitch"]["user"]["token"]}'
         }
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[HELIX_TRACE]) as session:
             async with session.get(url, headers=headers) as resp:
                 data = await resp.json()
                 return data['data'][0]['id']
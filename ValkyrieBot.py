@@ -40,6 +40,7 @@ from bot_discord import DiscordBot
 from bot_valkyrie import ValkyrieBot
 
 from Modules.tasks import TaskQueue
+from Modules.luna import Luna
 from bot_web import WebServer
 
 
@@ -110,6 +111,12 @@ class Valkyrie:
             pass
         finally:
             # cleanup
+            for client in Luna.clients.values():
+                loop.run_until_complete(client.close())
+            if self.tw_bot is not None:
+                loop.run_until_complete(self.tw_bot.auth.close())
+            for cache in Luna.caches.values():
+                cache.close()
             loop.run_until_complete(loop.shutdown_asyncgens())
             loop.close()
 
@@ -34,8 +34,12 @@ Example:
     
 """
 
+import contextlib
 import datetime
 import os
+import time
+
+from functools import partial
 
 import discord
 
@@ -43,7 +47,9 @@ from discord import app_commands, ui
 
 from ValkyrieUtils.Logger import ValkyrieLogger
 
+from Modules.guildstats import GuildStats
 from Modules.luna import Luna
+from Modules.quota import QuotaExceeded
 from Modules.tasks import TaskQueue
 
 LUNA: Luna = None
@@ -62,6 +68,7 @@ class DiscordBot:
     def __init__(self, config: dict, logger: ValkyrieLogger, task_queue: TaskQueue):
         self.loaded = False
         self.running = False
+        self.board = None
         self.logger = logger
         self.config = config
         self.task_queue = task_queue
@@ -72,6 +79,7 @@ class DiscordBot:
         self.client = discord.Client(intents=self.intents, activity=self.activity)
         self.tree = app_commands.CommandTree(self.client)
         self.guild = discord.Object(id=self.guild_id)
+        self.guild_stats = GuildStats(self.config)
         
         self.ch_admin = None
         self.ch_cmd = None
@@ -131,7 +139,26 @@ class DiscordBot:
                 role = discord.utils.get(guild.roles, name=role)
                 await user.add_roles(role)
                 return
-
+    
+    async def start(self):
+        """
+        Connects the Discord client and runs it until it disconnects. A client which was closed after a crash is reset
+        first, so the client can be started again by the supervisor.
+        """
+        if self.client.is_closed():
+            self.client.clear()
+        self.loaded = False
+        if self.board is not None:
+            self.board.publish(self)
+        try:
+            await self.client.start(self.token)
+        except Exception:
+            self.loaded = False
+            if self.board is not None:
+                self.board.publish(self)
+            await self.client.close()
+            raise
+    
     def setup(self):
         """
         Sets up the Discord bot. This method will be called before the bot starts, adds all slash commands
@@ -157,9 +184,96 @@ class DiscordBot:
             self.ch_admin = self.client.get_channel(int(self.config['discord']['channels'].get("admin")))
             self.ch_cmd = self.client.get_channel(int(self.config['discord']['channels'].get("commands")))
             self.ch_stream = self.client.get_channel(int(self.config['discord']['channels'].get("stream")))
-            self.logger.info(f'Discord Members | {len(self.client.users)}')
+            
+            # the cached guild has all channels and members, the fetched guild does not
+            self.guild_stats.seed(self.client.get_guild(int(self.guild_id)) or self.guild)
+            self.logger.info(f'Discord Members | {self.guild_stats.counters["members"]}')
             
             self.loaded = True
+            if self.board is not None:
+                self.board.publish(self)
+        
+        # ==============================================================================================================
+        # Guild Events
+        # ==============================================================================================================
+        
+        def is_guild(guild) -> bool:
+            """
+            Checks if a guild is the guild of the bot, as the client receives the events of all its guilds.
+            """
+            return guild is not None and str(guild.id) == str(self.guild_id)
+        
+        @self.client.event
+        async def on_member_join(member):
+            """
+            This event is called when a member joins a guild.
+            """
+            if is_guild(member.guild):
+                self.guild_stats.add('members')
+        
+        @self.client.event
+        async def on_member_remove(member):
+            """
+            This event is called when a member leaves a guild, or is kicked or banned.
+            """
+            if is_guild(member.guild):
+                self.guild_stats.add('members', -1)
+        
+        @self.client.event
+        async def on_guild_channel_create(channel):
+            """
+            This event is called when a channel is created.
+            """
+            if is_guild(channel.guild):
+                self.guild_stats.add('channels')
+        
+        @self.client.event
+        async def on_guild_channel_delete(channel):
+            """
+            This event is called when a channel is deleted.
+            """
+            if is_guild(channel.guild):
+                self.guild_stats.add('channels', -1)
+        
+        @self.client.event
+        async def on_guild_role_create(role):
+            """
+            This event is called when a role is created.
+            """
+            if is_guild(role.guild):
+                self.guild_stats.add('roles')
+        
+        @self.client.event
+        async def on_guild_role_delete(role):
+            """
+            This event is called when a role is deleted.
+            """
+            if is_guild(role.guild):
+                self.guild_stats.add('roles', -1)
+        
+        @self.client.event
+        async def on_guild_emojis_update(guild, before, after):
+            """
+            This event is called when emojis are added to or removed from a guild.
+            """
+            if is_guild(guild):
+                self.guild_stats.set('emojis', len(after))
+        
+        @self.client.event
+        async def on_guild_stickers_update(guild, before, after):
+            """
+            This event is called when stickers are added to or removed from a guild.
+            """
+            if is_guild(guild):
+                self.guild_stats.set('stickers', len(after))
+        
+        @self.client.event
+        async def on_guild_update(before, after):
+            """
+            This event is called when a guild is updated, e.g. when its boost count changes.
+            """
+            if is_guild(after):
+                self.guild_stats.set('boosters', after.premium_subscription_count or 0)
         
         # ==============================================================================================================
         # Commands
@@ -332,9 +446,20 @@ class LunaTranslate(discord.ui.Modal, title='L.U.N.A. Translator'):
             interaction (discord): The interaction object.
         """
         try:
-            data = await LUNA.lunaTranslate(self.text_to_translate.value, "EN")
+            # the interaction is deferred once admitted, as waiting for a free slot may take longer than Discord allows
+            defer = partial(interaction.response.defer, thinking = True)
+            async with LUNA.quota.limit('translate', f'discord:{interaction.user.id}', defer):
+                data = await LUNA.lunaTranslate(self.text_to_translate.value, "EN")
+        except QuotaExceeded as e:
+            await interaction.response.send_message(content = e.message, ephemeral = True)
+            return
         except Exception as e:
-            await interaction.response.send_message(content = f"An error occurred while translating your message: {str(e)}")
+            content = f"An error occurred while translating your message: {str(e)}"
+            # the interaction is only deferred if the request was admitted before it failed
+            if interaction.response.is_done():
+                await interaction.followup.send(content = content)
+            else:
+                await interaction.response.send_message(content = content, ephemeral = True)
             return
         embed_widget = discord.Embed(
             title=f"L.U.N.A. Translator",
@@ -344,7 +469,7 @@ class LunaTranslate(discord.ui.Modal, title='L.U.N.A. Translator'):
         )
         embed_widget.set_footer(text=f"2023 © Valky Dev", icon_url=f"https://exv.al/static/img/dev.webp")
         embed_widget.set_author(name=f"{interaction.user.name}", icon_url=f"{interaction.user.display_avatar.url}")
-        await interaction.response.send_message(embed=embed_widget)
+        await interaction.followup.send(embed=embed_widget)
 
 
 class LunaAsk(discord.ui.Modal, title='L.U.N.A. Assistant'):
@@ -361,21 +486,65 @@ class LunaAsk(discord.ui.Modal, title='L.U.N.A. Assistant'):
         Args:
             interaction (discord): The interaction object.
         """
-        await interaction.response.send_message(f"Processing your question, please wait...")
+        try:
+            processing = partial(interaction.response.send_message, f"Processing your question, please wait...")
+            async with LUNA.quota.limit('ask', f'discord:{interaction.user.id}', processing):
+                await self.answer(interaction)
+        except QuotaExceeded as e:
+            await interaction.response.send_message(content = e.message, ephemeral = True)
+    
+    async def answer(self, interaction: discord):
+        """
+        Asks L.U.N.A. the question and sends the answer, either at once or streamed into the embed.
+        
+        Args:
+            interaction (discord): The interaction object.
+        """
+        if not LUNA.stream:
+            try:
+                data = await LUNA.lunaAsk(self.question.value)
+            except Exception as e:
+                await interaction.followup.send(content = f"An error occurred while processing your question: {str(e)}")
+                return
+            
+            await interaction.followup.send(embed = self.embed(interaction, data['data']))
+            return
         
+        # the answer is streamed into the embed, edits are throttled to stay within the Discord rate limits
+        answer = ''
+        edit_time = 0
         try:
-            data = await LUNA.lunaAsk(self.question.value)
+            # the stream is closed right away if an edit fails, so it does not hold a Luna connection
+            async with contextlib.aclosing(LUNA.lunaAskStream(self.question.value)) as stream:
+                async for chunk in stream:
+                    answer += chunk
+                    if time.monotonic() - edit_time >= LUNA.stream_interval:
+                        edit_time = time.monotonic()
+                        await interaction.edit_original_response(content = None, embed = self.embed(interaction, f"{answer} ▌"))
         except Exception as e:
             await interaction.followup.send(content = f"An error occurred while processing your question: {str(e)}")
             return
         
+        await interaction.edit_original_response(content = None, embed = self.embed(interaction, answer))
+    
+    def embed(self, interaction: discord, answer: str) -> discord.Embed:
+        """
+        Builds the embed of a question and its (partial) answer.
+        
+        Args:
+            interaction (discord): The interaction object.
+            answer (str): The answer.
+        
+        Returns:
+            discord.Embed: The embed.
+        """
+        description = f"## Question\n> {self.question.value}\n\n## Answer\n{answer}"
         embed_widget = discord.Embed(
             title=f"L.U.N.A. Assistant",
-            description=f"## Question\n> {self.question.value}\n\n## Answer\n{data['data']}",
+            description=description[:4096],
             color=0xE91E63,
             timestamp=datetime.datetime.utcnow()
         )
         embed_widget.set_footer(text=f"2023 © Valky Dev", icon_url=f"https://exv.al/static/img/dev.webp")
         embed_widget.set_author(name=f"{interaction.user.name}", icon_url=f"{interaction.user.display_avatar.url}")
-        
-        await interaction.followup.send(embed = embed_widget)
+        return embed_widget
@@ -57,6 +57,7 @@ class TwitchBot(commands.Bot):
     def __init__(self, config: dict, logger: ValkyrieLogger, task_queue: TaskQueue):
         self.loaded = False
         self.running = False
+        self.board = None
         self.logger = logger
         self.config = config
         self.task_queue = task_queue
@@ -76,6 +77,53 @@ class TwitchBot(commands.Bot):
         
         self.start_time = 0
 
+    def update_token(self, kind: str, token: str) -> None:
+        """
+        Propagates a refreshed OAuth token to the running connections. The Helix requests of the channel and stream
+        read the token from the configuration on every request, so only the IRC and PubSub connections need to be
+        updated. The open connections are kept alive, the new token is used on their next (re)connect.
+        
+        Args:
+            kind (str): The kind of the token. Can be either "user" or "bot".
+            token (str): The new OAuth token.
+        """
+        if kind == "bot":
+            self.bot_token = token
+        elif kind == "user":
+            self.user_token = token
+        self._set_twitchio_token(kind, token)
+        
+        self.logger.info(f'Twitch token propagated | {kind}')
+    
+    def _set_twitchio_token(self, kind: str, token: str) -> None:
+        """
+        Writes a token into the private state of twitchio, which has no public API to change the token of a running
+        client. This is the only place which touches twitchio internals.
+        
+        Supported twitchio version: 2.x, where the IRC connection keeps the token in `Client._connection._token`, the
+        Helix client in `Client._http.token`, and the PubSub pool its websockets in `PubSubPool._pool`, whose topics
+        carry their own `token`. Check these attributes when upgrading twitchio. A missing attribute is skipped with a
+        warning, so the bot keeps its old token on the running connections instead of failing.
+        
+        Args:
+            kind (str): The kind of the token. Can be either "user" or "bot".
+            token (str): The new OAuth token.
+        """
+        if kind == "bot":
+            targets = [(getattr(self, '_connection', None), '_token'), (getattr(self, '_http', None), 'token')]
+        else:
+            pool = getattr(self.pubsub, '_pool', None)
+            if pool is None:
+                targets = [(None, '_pool')]
+            else:
+                targets = [(topic, 'token') for websocket in pool for topic in getattr(websocket, 'topics', [])]
+        
+        for target, name in targets:
+            if target is None or not hasattr(target, name):
+                self.logger.warning(f'Twitch token not propagated, unsupported twitchio version | {kind} | {name}')
+                continue
+            setattr(target, name, token)
+
     # ==================================================================================================================
     # Events
     # ==================================================================================================================
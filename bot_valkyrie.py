@@ -13,17 +13,20 @@ About:
 
 """
 import asyncio
-import datetime
-import os
 import time
 
 from ValkyrieUtils.Logger import ValkyrieLogger
 
 from bot_discord import DiscordBot
 from bot_twitch import TwitchBot
+from Twitch.polling import LivePoller
 
+from Modules.grants import GrantStore
+from Modules.metrics import REGISTRY
 from Modules.tasks import TaskQueue, Task
 
+TASK_SECONDS = REGISTRY.histogram('valkyrie_task_duration_seconds', 'The execution time of the tasks by action and result.', ('action', 'result'))
+
 
 class ValkyrieBot:
     """
@@ -42,61 +45,75 @@ class ValkyrieBot:
         self.empty = False
         self.init = False
         self.running = False
+        self.board = None
         self.twitch_bot = twitch_bot
         self.discord_bot = discord_bot
         self.config = config
         self.logger = logger
         self.task_queue = task_queue
+        self.grants = GrantStore(self.config, self.logger)
+        self.poller = LivePoller(self.config, self.logger)
         
-        self.refresh_time = datetime.datetime.now()
-        self.refresh_interval = 10800
+        self.refresh_margin = self.config['twitch'].get('refresh_margin', 600)
+        self.validate_time = time.time()
+        self.validate_interval = self.config['twitch'].get('validate_interval', 3600)
         
-        self.backup_task = 0
-        self.backup_finished = 0
-        self.backup_deleted = 0
-        self.backup_errors = 0
+        self.backup_debounce = 2
+        self.backup_max_delay = 30
         
+        self.prewarm_task = None
         self.start_time = 0
     
     async def check_refresh(self):
         """
-        A method which checks if the Twitch API token needs to be refreshed. The Twitch API token will be refreshed
-        every N seconds. The N seconds interval is defined in the configuration file.
+        A method which checks if the Twitch API tokens need to be refreshed. Each token is refreshed on its own, once
+        it is about to expire. The safety margin before the expiry is defined in the configuration file. The tokens are
+        also validated periodically, an invalid token is refreshed immediately.
         """
         # ready check
         if not self.ready:
             return
         
-        # continue
-        if (datetime.datetime.now() - self.refresh_time).total_seconds() > self.refresh_interval:
-            self.logger.info(f'Refreshing Twitch API token')
-            self.twitch_bot.user_token = self.twitch_bot.auth.authorize(
-                self.config['twitch']['user']['client_id'],
-                self.config['twitch']['user']['client_secret'],
-                self.config['twitch']['redirect_uri'],
-                self.twitch_bot.scopes,
-                "user"
-            )
-            await self.discord_bot.send_log(f"Refreshed User Twitch API token")
-            self.twitch_bot.bot_token = self.twitch_bot.auth.authorize(
-                self.config['twitch']['bot']['client_id'],
-                self.config['twitch']['bot']['client_secret'],
-                self.config['twitch']['redirect_uri'],
-                self.twitch_bot.scopes,
-                "bot"
-            )
-            await self.discord_bot.send_log(f"Refreshed Bot Twitch API token")
-            self.refresh_time = datetime.datetime.now()
+        # continue - validate
+        auth = self.twitch_bot.auth
+        invalid = []
+        if time.time() - self.validate_time > self.validate_interval:
+            self.validate_time = time.time()
+            for kind in ["user", "bot"]:
+                try:
+                    if await auth.validate(kind) is None:
+                        invalid.append(kind)
+                except Exception as e:
+                    self.logger.error(f'Failed to validate Twitch API token | {kind} | {str(e)}')
+        
+        # continue - refresh
+        for kind in ["user", "bot"]:
+            if kind in invalid or time.time() > auth.expires_at[kind] - self.refresh_margin:
+                # a failed refresh is retried once its backoff is over
+                if not auth.due(kind):
+                    continue
+                self.logger.info(f'Refreshing Twitch API token | {kind}')
+                try:
+                    token = await auth.refresh(kind)
+                except Exception as e:
+                    self.logger.error(f'Failed to refresh Twitch API token | {kind} | {str(e)}')
+                    continue
+                self.twitch_bot.update_token(kind, token)
+                await self.discord_bot.send_log(f"Refreshed {kind.capitalize()} Twitch API token")
     
     async def check_live(self):
         """
         A method which checks if a channel is live or not. If a channel goes live or offline, a
-        notification will be sent to the Discord server.
+        notification will be sent to the Discord server. The live status is polled when the adaptive live poller
+        says so, the result is recorded to schedule the next poll.
         """
         # ready check
         if not self.ready:
             return
         
+        if not self.poller.due():
+            return
+        
         # continue
         channel = self.twitch_bot.channel.name
         is_live = await self.twitch_bot.channel.get_status()
@@ -104,8 +121,11 @@ class ValkyrieBot:
         if not self.init:
             self.init = True
             self.twitch_bot.channel.is_live = is_live
+            self.twitch_bot.channel.touch()
             self.logger.info(f'Twitch Live Loop | {channel} live check | {is_live}')
         
+        self.poller.record(is_live, old_status != is_live, self.twitch_bot.channel.started_at)
+        
         if old_status != is_live:
             if is_live:
                 await self.discord_bot.send_notification(f'{channel}')
@@ -114,33 +134,58 @@ class ValkyrieBot:
                 await self.discord_bot.send_log(f'{channel} went offline')
                 self.logger.info(f'Channel went offline | {channel}')
             self.twitch_bot.channel.is_live = is_live
+            self.twitch_bot.channel.touch()
     
     async def check_unmod(self):
         """
-        A method which checks if a moderator is still a moderator based on the Twitch/data/rewards/moderators.txt file.
-        The duration of the moderator role is defined in the configuration file in seconds. If a moderator is no longer
-        a moderator, the role will be removed.
+        A method which checks if a temporary Twitch moderator or VIP role has expired. The expiry of a role is stored
+        in the grant store when the role is added. If a role has expired, it will be removed. A grant is only dropped
+        once its role was removed, a failed removal is retried with a backoff.
         """
         # ready check
         if not self.ready:
             return
         
         # continue
-        for rwd in self.config['twitch']['rewards']:
-            if rwd['task'].lower() == self.task_queue.TASK_TW_ADD_MODERATOR:
-                duration = rwd['time']
-                if os.path.exists('Twitch/data/rewards/moderators.txt'):
-                    with open('Twitch/data/rewards/moderators.txt', 'r') as f:
-                        lines = f.readlines()
-                        for line in lines:
-                            line = line.strip()
-                            time_count, user_name = line.split('|')
-                            time_dtime = datetime.datetime.strptime(time_count, '%Y-%m-%d %H:%M:%S')
-                            if (datetime.datetime.now() - time_dtime).total_seconds() > duration:
-                                await self.twitch_bot.channel.unmod(user_name)
-                                self.logger.info(f'Removing moderator role | {user_name}')
-                                lines.remove(line)
-                break
+        while (grant := self.grants.next_expired()) is not None:
+            if grant.platform != 'twitch':
+                self.grants.complete(grant)
+                continue
+            try:
+                if grant.role == GrantStore.ROLE_MODERATOR:
+                    result = await self.twitch_bot.channel.unmod(grant.user)
+                elif grant.role == GrantStore.ROLE_VIP:
+                    result = await self.twitch_bot.channel.unvip(grant.user)
+                else:
+                    result = True
+            except Exception as e:
+                result = e
+            
+            if self.role_removed(result):
+                self.grants.complete(grant)
+                self.logger.info(f'Removing {grant.role} role | {grant.user}')
+            else:
+                retry = self.grants.retry(grant)
+                self.logger.warning(f'Failed to remove {grant.role} role | {grant.user} | {result} | Retry in {int(retry - time.time())}s')
+    
+    @staticmethod
+    def role_removed(result) -> bool:
+        """
+        Checks the result of a Twitch role removal. A user who has no longer the role counts as removed.
+        
+        Args:
+            result: The result of `unmod` or `unvip`, True on success, the error body of the Helix API, or an exception.
+        
+        Returns:
+            bool: True if the user has no longer the role, False if the removal has to be retried.
+        """
+        if result is True:
+            return True
+        if isinstance(result, dict):
+            # 400 "is not a moderator" and 422 "is not a VIP"
+            message = str(result.get('message', '')).lower()
+            return result.get('status') == 422 or (result.get('status') == 400 and 'is not a' in message)
+        return False
     
     async def check_queue(self, instant: bool = False):
         """
@@ -165,10 +210,7 @@ class ValkyrieBot:
             if len(self.task_queue.instant_tasks) > 0:
                 task = self.task_queue.get_task(True)
                 self.logger.info(f'Executing instant task | {task.action} | {task.data}')
-                if await self.execute_task(task):
-                    self.task_queue.end_task(task)
-                else:
-                    self.task_queue.error_task(task)
+                await self.run_task(task)
         
         # continue - normal
         else:
@@ -181,37 +223,70 @@ class ValkyrieBot:
                 q = self.task_queue.get_task_count()
                 for i in range(q):
                     
+                    # the web server may have removed tasks while the previous task was awaited
+                    if self.task_queue.get_task_count() == 0:
+                        break
                     task = self.task_queue.get_task()
                     self.logger.info(f'Executing task from queue | {i + 1}/{q} | {task.action} | {task.data}')
-                    if await self.execute_task(task):
-                        self.task_queue.end_task(task)
-                    else:
-                        self.task_queue.error_task(task)
+                    await self.run_task(task)
     
     async def backup_tasks(self):
         """
-        A method which backs up the task queue to a file.
+        A method which backs up the task queue and the grant store to their files. A store is saved once it had no
+        changes for a few seconds, or once its oldest unsaved change is older than the maximum delay. All changes in
+        between are coalesced into one save.
         """
         # ready check
         if not self.ready:
             return
         
         # continue
-        q_size = self.task_queue.get_task_count()
-        f_size = len(self.task_queue.finished_tasks)
-        d_size = len(self.task_queue.deleted_tasks)
-        e_size = len(self.task_queue.errors)
+        await self.backup(self.task_queue, self.task_queue.save_tasks_async, 'Tasks')
+        await self.backup(self.grants, self.grants.save_grants_async, 'Grants')
+    
+    async def backup(self, store, save, name: str):
+        """
+        Saves a store if it is due, see `backup_tasks`.
         
-        if (self.backup_task != q_size or self.backup_finished != f_size
-                or self.backup_deleted != d_size or self.backup_errors != e_size):
-            self.logger.info(f'BackUp Tasks | Old: {self.backup_task}/{self.backup_finished}/{self.backup_deleted}/{self.backup_errors} | New: {q_size}/{f_size}/{d_size}/{e_size}')
-            
-            self.backup_task = q_size
-            self.backup_finished = f_size
-            self.backup_deleted = d_size
-            self.backup_errors = e_size
-            
-            self.task_queue.save_tasks()
+        Args:
+            store: The store, a TaskQueue or a GrantStore.
+            save (callable): The coroutine function which saves the store.
+            name (str): The name of the store in the log.
+        """
+        if not store.is_dirty() or store.saving:
+            return
+        
+        now = time.time()
+        quiet = now - store.changed_time >= self.backup_debounce
+        overdue = store.dirty_time is not None and now - store.dirty_time >= self.backup_max_delay
+        if quiet or overdue:
+            old_version = store.saved_version
+            try:
+                await save()
+            except Exception as e:
+                # the store stays dirty, the next tick tries again
+                self.logger.error(f'BackUp {name} failed | Version: {old_version} -> {store.version} | {str(e)}')
+                return
+            self.logger.info(f'BackUp {name} | Version: {old_version} -> {store.saved_version} | Took: {int(store.last_save_duration * 1000)}ms')
+    
+    async def run_task(self, task: Task):
+        """
+        A method which executes a task, records its execution time and marks it as finished or failed.
+        
+        Args:
+            task (Task): The task to execute.
+        """
+        start = time.monotonic()
+        result = 'exception'
+        try:
+            result = 'ok' if await self.execute_task(task) else 'error'
+        finally:
+            TASK_SECONDS.observe(time.monotonic() - start, task.action, result)
+        
+        if result == 'ok':
+            self.task_queue.end_task(task)
+        else:
+            self.task_queue.error_task(task)
     
     async def execute_task(self, task: Task):
         """
@@ -235,48 +310,28 @@ class ValkyrieBot:
             user = task.data['user_input'] if 'user_input' in task.data else task.data['user_name']
             await self.twitch_bot.channel.mod(user)
             await self.discord_bot.send_log(f"Added Twitch Moderator | {user}")
-            time_now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            if task.time is not None:
-                time_end = (datetime.datetime.now() + datetime.timedelta(seconds = task.time)).strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                time_end = None
-            with open('Twitch/data/rewards/moderators.txt', 'a+') as f:
-                f.write(f'{time_now}|{user}|{time_end}\n')
+            self.grants.add_grant('twitch', GrantStore.ROLE_MODERATOR, user, task.time)
             err = False
         
         elif task.action == self.task_queue.TASK_TW_REM_MODERATOR:
             user = task.data['user_input'] if 'user_input' in task.data else task.data['user_name']
             await self.twitch_bot.channel.unmod(user)
             await self.discord_bot.send_log(f"Removed Twitch Moderator | {user}")
-            with open('Twitch/data/rewards/moderators.txt', 'w') as f:
-                file_data = f.readlines()
-                for line in file_data:
-                    if line.split('|')[1] != user:
-                        f.write(line)
+            self.grants.remove_grant('twitch', GrantStore.ROLE_MODERATOR, user)
             err = False
         
         elif task.action == self.task_queue.TASK_TW_ADD_VIP:
             user = task.data['user_input'] if 'user_input' in task.data else task.data['user_name']
             await self.twitch_bot.channel.vip(user)
             await self.discord_bot.send_log(f"Added Twitch VIP | {user}")
-            time_now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            if task.time is not None:
-                time_end = (datetime.datetime.now() + datetime.timedelta(seconds = task.time)).strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                time_end = None
-            with open('Twitch/data/rewards/vips.txt', 'a+') as f:
-                f.write(f'{time_now}|{user}|{time_end}\n')
+            self.grants.add_grant('twitch', GrantStore.ROLE_VIP, user, task.time)
             err = False
             
         elif task.action == self.task_queue.TASK_TW_REM_VIP:
             user = task.data['user_input'] if 'user_input' in task.data else task.data['user_name']
             await self.twitch_bot.channel.unvip(user)
             await self.discord_bot.send_log(f"Removed Twitch VIP | {user}")
-            with open('Twitch/data/rewards/vips.txt', 'w') as f:
-                file_data = f.readlines()
-                for line in file_data:
-                    if line.split('|')[1] != user:
-                        f.write(line)
+            self.grants.remove_grant('twitch', GrantStore.ROLE_VIP, user)
             err = False
         
         elif task.action == self.task_queue.TASK_TW_TIMEOUT:
@@ -318,9 +373,25 @@ class ValkyrieBot:
         if not self.ready:
             if self.discord_bot.loaded and self.twitch_bot.loaded:
                 self.ready = True
+                if self.board is not None:
+                    self.board.publish(self)
                 self.logger.info(f'=' * 103)
                 self.logger.info(f'ValkyrieBot fully loaded')
                 self.logger.info(f'=' * 103)
+                self.prewarm_task = asyncio.create_task(self.twitch_bot.luna.lunaPrewarm())
+                self.prewarm_task.add_done_callback(self.prewarmed)
+    
+    def prewarmed(self, task: asyncio.Task):
+        """
+        Logs the failure of the translation cache pre-warming, which runs in the background.
+        
+        Args:
+            task (asyncio.Task): The pre-warming task.
+        """
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.logger.error(f'Failed to pre-warm the translation cache: {str(task.exception())}')
     
     async def run(self):
         """
@@ -336,22 +407,21 @@ class ValkyrieBot:
             await self.check_unmod()
             await self.check_queue()
             await self.check_refresh()
-            await self.check_live()
-            
-            await self.backup_tasks()
             
             sleep_duration = interval_seconds - (time.time() - start_time)
             await asyncio.sleep(sleep_duration)
     
     async def run_fast(self):
         """
-        A loop which runs the main bot methods every 1 second.
+        A loop which runs the instant tasks, the live check and the task backup every 1 second.
         """
         while True:
             start_time = time.time()
             interval_seconds = 1
             if self.ready:
                 await self.check_queue(True)
+                await self.check_live()
+                await self.backup_tasks()
             
             sleep_duration = interval_seconds - (time.time() - start_time)
             await asyncio.sleep(sleep_duration)
@@ -361,4 +431,6 @@ class ValkyrieBot:
         A method which stops the bot.
         """
         self.running = False
+        if self.board is not None:
+            self.board.publish(self)
         self.logger.info(f'ValkyrieBot stopped')
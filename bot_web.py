@@ -5,24 +5,62 @@ Created on Oct 23, 2023
 @author: v_lky
 """
 
+import asyncio
+import contextlib
+import hmac
+import http.client
+import inspect
+import json
+import math
+import mimetypes
+import os
 import time
+import urllib.parse
 from binascii import hexlify
-from threading import Thread
+from functools import partial, wraps
 
-import requests
 from waitress import serve
-from flask import Flask, request, render_template, session, redirect, flash
+from flask import Flask, Response, request, render_template, session, redirect, flash, jsonify, send_file
 from Web.stringtable import ST
 
 from ValkyrieUtils.Tools import ValkyrieTools
 from Modules.tasks import Task
+from Modules.asgi import AsgiApp
+from Modules.assets import AssetPipeline
+from Modules.bus import CommandBus, CommandTimeout
 from Modules.luna import Luna
+from Modules.guildstats import GuildStats
+from Modules.health import LunaHealth
+from Modules.logindex import LogIndex
+from Modules.logquery import LogQuery
+from Modules.logstream import LogStream, LogStreamFull
+from Modules.metrics import REGISTRY
+from Modules.status import StatusBoard
+from Modules.supervisor import Supervisor
+from Modules.taskquery import TaskQuery
+from Modules.versions import ApiVersions
 
 
 class WebServer:
     """
     A class for web management of all bots.
     """
+    # the bulk operations of the tasks page, by the state they move the tasks to
+    TASK_BULK = {
+        'requeue': ('queued', 'requeued'),
+        'retry': ('instant', 'retried'),
+        'end': ('finished', 'ended'),
+        'delete': ('deleted', 'deleted'),
+    }
+    # the keys of the states in the response of /api/v1/tasks
+    API_TASKS = {
+        'queued': 'tasks',
+        'instant': 'instant',
+        'finished': 'finished',
+        'deleted': 'deleted',
+        'errors': 'errors',
+    }
+    
     def __init__(self, twitch_b, discord_b, valky_b, logger, config, valky):
         self.cfg = config[0]
         self.config = config[1]
@@ -32,21 +70,42 @@ class WebServer:
         self.build_v = self.build.split(':')[1]
         
         self.luna = Luna(self.logger, self.config)
-        self.luna_time = 0
-        self.luna_ping = 0
-        self.luna_interval = self.config['luna']['interval']
+        self.luna_health = LunaHealth(self.logger, self.config)
+        self.log_index = LogIndex(self.logger.PATH, self.valky[-1], self.valky[0], self.config['web'].get('log_buffer', 5000))
+        self.log_query = LogQuery(self.logger.PATH, scan=self.config['web'].get('log_scan', 50000))
+        self.log_stream = LogStream(self.log_index, self.config['web'].get('log_subscribers', 4))
+        self.api_versions = ApiVersions(self.build)
+        self.assets = AssetPipeline(self.logger)
         
         self.tw_bot = twitch_b
         self.dc_bot = discord_b
         self.vk_bot = valky_b
+        self.task_query = TaskQuery(self.vk_bot.task_queue, self.config['web'].get('task_scan', 10000)) if self.vk_bot is not None else None
+        
+        # the bots publish their status to the board, the views only read its snapshot
+        self.status = StatusBoard()
+        self.status.register('valky', self.vk_bot)
+        self.status.register('discord', self.dc_bot)
+        self.status.register('twitch', self.tw_bot)
         
         self.app = Flask(__name__, static_folder='Web/data', template_folder='Web/views')
         self.app.config['SECRET_KEY'] = self.config['web']['token']
         self.app.config['SESSION_COOKIE_SECURE'] = True
+        # the templates link the built bundles, or the CDN as long as nothing was built
+        self.app.context_processor(lambda: {'assets': self.assets.manifest if self.config['web'].get('assets', True) else None})
         
         self.loop = None
+        self.supervisor = Supervisor(self.logger)
+        # every view which touches the bots runs on their event loop, see ensure_sync
+        self.bus = CommandBus(self.logger, self.config['web'].get('command_timeout', 30))
+        
+        # async views run on the event loop of the bots, see ensure_sync
+        self.app.ensure_sync = self.ensure_sync
+        self.asgi = AsgiApp(self.app, self.config['web'].get('threads', 8))
+        self.asgi.route('/api/logs/stream', self.asgi_logs_stream)
         
         self.setup()
+        self.setup_metrics()
         
     def setup(self):
         """
@@ -78,6 +137,10 @@ class WebServer:
         self.app.add_url_rule('/<lang>/tasks/new', 'valky_tasks_post', self.valky_tasks_post, methods=['POST'])
         self.app.add_url_rule('/<lang>/tasks/new/', 'valky_tasks_post', self.valky_tasks_post, methods=['POST'])
         self.app.add_url_rule('/<lang>/tasks/<task_id>/<action>', 'valky_tasks_action', self.valky_tasks_action)
+        self.app.add_url_rule('/<lang>/tasks/bulk', 'valky_tasks_bulk', self.valky_tasks_bulk, methods=['POST'])
+        # grants
+        self.app.add_url_rule('/<lang>/grants', 'system_grants', self.system_grants)
+        self.app.add_url_rule('/<lang>/grants/', 'system_grants', self.system_grants)
         # settings
         self.app.add_url_rule('/<lang>/settings/web', 'valky_settings', self.valky_settings)
         self.app.add_url_rule('/<lang>/settings/web/', 'valky_settings', self.valky_settings)
@@ -100,11 +163,64 @@ class WebServer:
         self.app.add_url_rule('/<lang>/settings/scopes', 'twitch_settings_scope_post', self.settings_post, methods=['POST'])
         self.app.add_url_rule('/<lang>/settings/scopes/', 'twitch_settings_scope_post', self.settings_post, methods=['POST'])
 
+        # api
+        self.app.add_url_rule('/api/logs', 'api_logs', self.api_logs)
+        self.app.add_url_rule('/api/v1/logs', 'api_logs', self.api_logs)
+        self.app.add_url_rule('/api/v1/status', 'api_status', self.api_status)
+        self.app.add_url_rule('/api/v1/tasks', 'api_tasks', self.api_tasks)
+        self.app.add_url_rule('/api/v1/tasks/<state>', 'api_tasks_page', self.api_tasks_page)
+        self.app.add_url_rule('/api/v1/twitch/channel', 'api_channel', self.api_channel)
+        self.app.add_url_rule('/api/v1/discord/guild', 'api_guild', self.api_guild)
+        self.app.add_url_rule('/api/logs/stream', 'api_logs_stream', self.api_logs_stream)
+        
+        # assets
+        self.app.add_url_rule('/assets/<name>', 'assets', self.serve_asset)
+        
+        # metrics
+        self.app.add_url_rule('/metrics', 'metrics', self.metrics)
+        
+        # errors
+        self.app.register_error_handler(CommandTimeout, self.command_timeout)
+        
         # functions
         self.app.add_url_rule('/login', 'login', self.login, methods=['POST'])
         self.app.add_url_rule('/logout', 'logout', self.logout)
         self.app.add_url_rule('/start/<bot>', 'start_bot', self.start_bot)
     
+    def setup_metrics(self):
+        """
+        Registers the metrics which are read from the state of the bots whenever they are scraped. Reading them only
+        takes the length of a few lists and the value of a few attributes.
+        """
+        def tasks() -> dict:
+            queue = self.vk_bot.task_queue
+            return {(state,): len(getattr(queue, name)) for state, name in TaskQuery.STATES.items()}
+        
+        def gateway() -> float | None:
+            # the latency is infinite or not a number until the first heartbeat
+            latency = self.dc_bot.client.latency
+            return latency if math.isfinite(latency) else None
+        
+        def channel() -> dict:
+            channel = self.tw_bot.channel
+            return {(name,): len(getattr(channel, name)) for name in ('followers', 'subscribers', 'vips', 'moderators', 'banned', 'emotes')}
+        
+        def guild() -> dict:
+            stats = self.dc_bot.guild_stats
+            return {(name,): value for name, value in dict(stats.counters).items()} if stats.loaded else {}
+        
+        REGISTRY.gauge('valkyrie_bot_up', 'Whether a bot is online.', ('bot',), lambda: {
+            (name,): int(bot['status'] == 'ONLINE') for name, bot in self.status.snapshot.items()
+        })
+        REGISTRY.gauge('valkyrie_tasks', 'The number of tasks by state.', ('state',), tasks if self.vk_bot is not None else dict)
+        REGISTRY.gauge('valkyrie_discord_gateway_latency_seconds', 'The latency of the Discord gateway heartbeat.', (), gateway if self.dc_bot is not None else lambda: None)
+        REGISTRY.gauge('valkyrie_discord_guild', 'The counters of the Discord guild.', ('counter',), guild if self.dc_bot is not None else dict)
+        REGISTRY.gauge('valkyrie_twitch_channel_members', 'The size of the member collections of the Twitch channel.', ('collection',), channel if self.tw_bot is not None else dict)
+        REGISTRY.gauge('valkyrie_web_commands_pending', 'The number of web commands waiting for the event loop.', (), lambda: self.bus.pending)
+        REGISTRY.counter('valkyrie_web_command_timeouts_total', 'The number of web commands which timed out on the event loop.', (), lambda: self.bus.timeouts)
+        REGISTRY.counter('valkyrie_event_loop_blocked_total', 'The number of times the event loop was blocked.', (), lambda: self.supervisor.slow_count)
+        REGISTRY.counter('valkyrie_log_written_bytes_total', 'The size of the log file, its rate is the log write rate.', (), lambda: os.path.getsize(self.log_query.path))
+    
     # ========================================================================================
     # Valkyrie Bot - Views
     # ========================================================================================
@@ -120,70 +236,33 @@ class WebServer:
         if 'loggedin' not in session:
             return render_template('index.html', stringtable=ST[lang])
         
-        logs = self.get_logs()
-        latest_5 = logs[-5:]
-        
-        if self.luna_time + self.luna_interval < time.time():
-            try:
-                x = requests.post(url = f"{self.luna.luna_rest_url}/ping", json = {})
-                self.luna_ping = int(x.elapsed.microseconds / 1000)
-                data = x.json()
-                self.luna_time = data['Timestamp']
-                server_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(data['Timestamp']))
-                self.logger.info(f'Luna Ping | Latency: {self.luna_ping}ms')
-                
-            except requests.RequestException as e:
-                self.logger.error(f'Failed to make the request: {str(e)}')
-                self.luna_ping = 0
-                server_time = 'N/A'
-        else:
-            server_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.luna_time))
-        
-        if self.vk_bot is not None:
-            if self.vk_bot.ready:
-                vk_status = 'ONLINE'
-            elif self.vk_bot.running:
-                vk_status = 'STARTED'
-            else:
-                vk_status = 'OFFLINE'
-        else:
-            vk_status = 'UNKNOWN'
-        
-        if self.dc_bot is not None:
-            if self.dc_bot.loaded:
-                dc_status = 'ONLINE'
-            elif self.dc_bot.running:
-                dc_status = 'STARTED'
-            else:
-                dc_status = 'OFFLINE'
-        else:
-            dc_status = 'UNKNOWN'
-        
-        if self.tw_bot is not None:
-            if self.tw_bot.loaded:
-                tw_status = 'ONLINE'
-            elif self.tw_bot.running:
-                tw_status = 'STARTED'
-            else:
-                tw_status = 'OFFLINE'
-        else:
-            tw_status = 'UNKNOWN'
-            
+        latest_5 = self.log_index.tail(5)
+        
+        # the Luna API is checked in the background, the page only reads the latest snapshot
+        l4 = self.luna_health.snapshot
+        status = self.status.snapshot
+        
         return render_template(
             template_name_or_list='index.html',
             stringtable=ST[lang],
-            vk_status=vk_status,
-            dc_status=dc_status,
-            tw_status=tw_status,
+            vk_status=status['valky']['status'],
+            dc_status=status['discord']['status'],
+            tw_status=status['twitch']['status'],
             logs=latest_5,
-            l4_status='OFFLINE' if self.luna_ping == 0 else 'ONLINE',
-            ping=self.luna_ping,
+            l4_status=l4['status'],
+            ping=l4['ping'],
+            l4=l4,
             build=self.build,
             build_v=self.build_v,
-            vk_start_time=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.vk_bot.start_time)),
-            dc_start_time=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.dc_bot.start_time)),
-            tw_start_time=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.tw_bot.start_time)),
-            l4_server_time=server_time,
+            vk_start_time=status['valky']['started'],
+            dc_start_time=status['discord']['started'],
+            tw_start_time=status['twitch']['started'],
+            l4_server_time=l4['server_time'],
+            cache=self.luna.cache.stats(),
+            client=self.luna.client.stats(),
+            quota=self.luna.quota.stats(),
+            health=self.supervisor.health(),
+            lag=self.supervisor.lag(),
         )
     
     def system_logs(self, lang= 'en'):
@@ -196,11 +275,18 @@ class WebServer:
         if 'loggedin' not in session:
             return redirect('https://valky.xyz/')
         
-        logs = self.get_logs()
+        try:
+            filters = self.log_filters(request.args)
+        except ValueError:
+            flash('Invalid log filter', category='error')
+            filters = {}
+        page = self.log_query.query(**filters)
         return render_template(
             template_name_or_list='logs.html',
             stringtable=ST[lang],
-            logs=logs,
+            logs=page['entries'],
+            cursor=page['cursor'],
+            filters=request.args.to_dict(),
             build=self.build,
             build_v=self.build_v
         )
@@ -215,16 +301,27 @@ class WebServer:
         if 'loggedin' not in session:
             return redirect('https://valky.xyz/')
         
-        tasks, finished, deleted, errors = self.get_tasks()
+        try:
+            filters = self.task_filters(request.args)
+            page = self.task_query.query(**filters)
+        except ValueError:
+            flash('Invalid task filter', category='error')
+            filters = self.task_filters({})
+            page = self.task_query.query(**filters)
         
         return render_template(
             template_name_or_list='valky/tasks.html',
             stringtable=ST[lang],
             vk_status=self.vk_bot.ready,
-            tasks=tasks,
-            finished=finished,
-            deleted=deleted,
-            errors=errors,
+            tasks=[self.task_row(task) for task in page['tasks']],
+            state=filters['state'],
+            count=page['count'],
+            next_cursor=page['next'],
+            prev_cursor=page['prev'],
+            states=list(TaskQuery.STATES),
+            sorts=TaskQuery.SORTS,
+            actions=self.vk_bot.task_queue.__globals__(),
+            filters=request.args.to_dict(),
             build=self.build,
             build_v=self.build_v
         )
@@ -248,6 +345,38 @@ class WebServer:
             build_v=self.build_v
         )
     
+    async def system_grants(self, lang= 'en'):
+        """
+        The role grants page.
+        """
+        if lang not in ['en', 'de', 'ru', 'vk']:
+            lang = 'en'
+        
+        if 'loggedin' not in session:
+            return redirect('https://valky.xyz/')
+        
+        page = request.args.get('page', '1')
+        page = int(page) if ValkyrieTools.isInteger(page) else 1
+        grants, pages = self.vk_bot.grants.get_grants(page)
+        
+        return render_template(
+            template_name_or_list='valky/grants.html',
+            stringtable=ST[lang],
+            vk_status=self.vk_bot.ready,
+            grants=[{
+                'platform': g.platform,
+                'role': g.role,
+                'user': g.user,
+                'start': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(g.start)),
+                'end': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(g.end)) if g.end is not None else 'Never',
+            } for g in grants],
+            grant_count=len(self.vk_bot.grants),
+            page=min(max(1, page), pages),
+            pages=pages,
+            build=self.build,
+            build_v=self.build_v
+        )
+    
     # Valky
     async def valky_bot(self, lang='en'):
         """
@@ -258,27 +387,26 @@ class WebServer:
         
         if 'loggedin' not in session:
             return redirect('https://valky.xyz/')
-
-        if self.vk_bot is not None:
-            if self.vk_bot.ready:
-                vk_status = 'ONLINE'
-            elif self.vk_bot.running:
-                vk_status = 'STARTED'
-            else:
-                vk_status = 'OFFLINE'
+        
+        # the next tasks to run and the latest finished ones, without copying the whole history
+        tasks_5 = self.task_query.query('queued', order='asc', limit=5)['tasks']
+        finished_5 = self.task_query.query('finished', order='desc', limit=5)['tasks']
+        
+        task_queue = self.vk_bot.task_queue
+        if task_queue.last_save_time:
+            backup_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(task_queue.last_save_time))
         else:
-            vk_status = 'UNKNOWN'
-            
-        tasks, finished, deleted, errors = self.get_tasks()
-        tasks_5 = tasks[-5:]
-        finished_5 = finished[-5:]
+            backup_time = 'N/A'
         
         return render_template(
             template_name_or_list='valky.html',
             stringtable=ST[lang],
-            vk_status=vk_status,
-            tasks=tasks_5,
-            finished=finished_5,
+            vk_status=self.status.snapshot['valky']['status'],
+            tasks=[self.task_row(task) for task in tasks_5],
+            finished=[self.task_row(task) for task in finished_5],
+            backup_time=backup_time,
+            backup_duration=int(task_queue.last_save_duration * 1000),
+            backup_version=task_queue.saved_version,
             build=self.build,
             build_v=self.build_v,
         )
@@ -294,20 +422,10 @@ class WebServer:
         if 'loggedin' not in session:
             return redirect('https://valky.xyz/')
         
-        if self.tw_bot is not None:
-            if self.tw_bot.loaded:
-                tw_status = 'ONLINE'
-            elif self.tw_bot.running:
-                tw_status = 'STARTED'
-            else:
-                tw_status = 'OFFLINE'
-        else:
-            tw_status = 'UNKNOWN'
-        
         return render_template(
             template_name_or_list = 'twitch.html',
             stringtable = ST[lang],
-            tw_status = tw_status,
+            tw_status = self.status.snapshot['twitch']['status'],
             build = self.build,
             build_v = self.build_v,
             is_live = self.tw_bot.channel.is_live,
@@ -319,6 +437,7 @@ class WebServer:
             mod_count = len(self.tw_bot.channel.moderators),
             emote_count = len(self.tw_bot.channel.emotes),
             emotes = self.tw_bot.channel.emotes_raw,
+            polling = self.vk_bot.poller.stats(),
         )
     
     # Discord
@@ -329,45 +448,25 @@ class WebServer:
         if lang not in ['en', 'de', 'ru', 'vk']:
             lang = 'en'
         
-        if self.dc_bot is not None:
-            if self.dc_bot.loaded:
-                dc_status = 'ONLINE'
-            elif self.dc_bot.running:
-                dc_status = 'STARTED'
-            else:
-                dc_status = 'OFFLINE'
-        else:
-            dc_status = 'UNKNOWN'
-        
-        if self.dc_bot.loaded:
+        dc_status = self.status.snapshot['discord']['status']
+        # the counters are kept up to date by the gateway events, see GuildStats
+        stats = self.dc_bot.guild_stats.stats()
+        if dc_status == 'ONLINE':
             guild_name = self.dc_bot.guild.name
             guild_description = self.dc_bot.guild.description
             guild_emojis = self.dc_bot.guild.emojis
-            guild_stickers = self.dc_bot.guild.stickers
-            guild_icon = self.dc_bot.guild.icon
             guild_banner = self.dc_bot.guild.banner
-            guild_owner = self.dc_bot.guild.owner_id
-            guild_roles = self.dc_bot.guild.roles
-            guild_channels = self.dc_bot.guild.channels
-            guild_features = self.dc_bot.guild.features
-            guild_members = self.dc_bot.client.users
             guild_invite = self.dc_bot.guild.vanity_url_code
-            guild_booster_count = self.dc_bot.guild.premium_subscription_count
             
         else:
             guild_name = 'N/A'
             guild_description = 'N/A'
             guild_emojis = 'N/A'
-            guild_stickers = 'N/A'
-            guild_icon = 'N/A'
             guild_banner = 'N/A'
-            guild_owner = 'N/A'
-            guild_roles = 'N/A'
-            guild_channels = 'N/A'
-            guild_features = 'N/A'
-            guild_members = 'N/A'
             guild_invite = 'N/A'
-            guild_booster_count = 'N/A'
+        
+        if not stats['loaded']:
+            stats = dict(dict.fromkeys(GuildStats.COUNTERS, 'N/A'), series=[])
         
         return render_template(
             template_name_or_list='discord.html',
@@ -380,12 +479,13 @@ class WebServer:
             guild_description=guild_description,
             guild_emojis=guild_emojis,
             guild_invite=guild_invite,
-            guild_member_count=len(guild_members) if guild_members != 'N/A' else 'N/A',
-            guild_booster_count=guild_booster_count,
-            guild_channels_count=len(guild_channels) if guild_channels != 'N/A' else 'N/A',
-            guild_roles_count=len(guild_roles) if guild_roles != 'N/A' else 'N/A',
-            guild_emote_count=len(guild_emojis) if guild_emojis != 'N/A' else 'N/A',
-            guild_sticker_count=len(guild_stickers) if guild_stickers != 'N/A' else 'N/A',
+            guild_member_count=stats['members'],
+            guild_booster_count=stats['boosters'],
+            guild_channels_count=stats['channels'],
+            guild_roles_count=stats['roles'],
+            guild_emote_count=stats['emojis'],
+            guild_sticker_count=stats['stickers'],
+            guild_series=stats['series'],
         )
     
     async def valky_settings(self, lang='en'):
@@ -558,30 +658,79 @@ class WebServer:
             flash('Unknown action', category='error')
             return redirect(f'/{lang}/tasks')
         
+        task = self.vk_bot.task_queue.get_task_by_id(task_id)
+        if task is None:
+            flash(f'Task {task_id} not found', category='error')
+            return redirect(f'/{lang}/tasks')
+        
         if action == 'delete':
-            task = self.vk_bot.task_queue.get_task_by_id(task_id)
             self.vk_bot.task_queue.remove_task(task)
             flash(f'Task "{task.action}" ({task.id}) deleted', category='info')
             return redirect(f'/{lang}/tasks')
         
         elif action == 'start':
-            task = self.vk_bot.task_queue.get_task_by_id(task_id)
             self.vk_bot.task_queue.add_task(task, True)
             flash('Task restarted', category='info')
             return redirect(f'/{lang}/tasks')
         
         elif action == 'end':
-            task = self.vk_bot.task_queue.get_task_by_id(task_id)
             self.vk_bot.task_queue.end_task(task)
             flash('Task ended', category='info')
             return redirect(f'/{lang}/tasks')
         
         elif action == 'queue':
-            task = self.vk_bot.task_queue.get_task_by_id(task_id)
             self.vk_bot.task_queue.add_task(task)
             flash('Task queued', category='info')
             return redirect(f'/{lang}/tasks')
     
+    async def valky_tasks_bulk(self, lang='en'):
+        """
+        The Valkyrie bot tasks bulk action. Moves the selected tasks of a state, or all tasks of the state which match
+        the filter, to another state at once. The view runs on the event loop, and the selection and the move do not
+        await, so the bots never see a half applied operation. The queue is saved once afterwards.
+        """
+        if lang not in ['en', 'de', 'ru', 'vk']:
+            lang = 'en'
+        
+        if 'loggedin' not in session:
+            return redirect('https://valky.xyz/')
+        
+        data = request.form
+        # the tasks page is shown again with the same filter, the cursor may point at a moved task
+        filters = {k: v for k, v in data.items() if k in ('state', 'action', 'user', 'since', 'until', 'sort', 'order') and v}
+        back = f'/{lang}/tasks?{urllib.parse.urlencode(filters)}'
+        
+        operation = data.get('operation')
+        if operation not in self.TASK_BULK:
+            self.logger.error(f'Unknown bulk action: {operation}')
+            flash('Unknown action', category='error')
+            return redirect(back)
+        
+        try:
+            query = self.task_filters(data)
+        except ValueError:
+            flash('Invalid task filter', category='error')
+            return redirect(back)
+        if query['state'] not in TaskQuery.STATES:
+            flash('Invalid task filter', category='error')
+            return redirect(back)
+        
+        if data.get('scope') == 'filter':
+            selected = self.task_query.select(query['state'], query['action'], query['user'], query['since'], query['until'])
+            task_ids = {task.id for task in selected}
+        else:
+            task_ids = {int(task_id) for task_id in data.getlist('task_id') if ValkyrieTools.isInteger(task_id)}
+        if not task_ids:
+            flash('No tasks selected', category='error')
+            return redirect(back)
+        
+        state, label = self.TASK_BULK[operation]
+        moved = self.vk_bot.task_queue.move_tasks(task_ids, state, query['state'])
+        if moved:
+            await self.vk_bot.task_queue.save_tasks_async()
+        flash(f'{len(moved)} tasks {label}', category='info')
+        return redirect(back)
+    
     async def twitch_bot_post(self, lang='en'):
         """
         The Twitch bot page.
@@ -603,6 +752,7 @@ class WebServer:
                 title = data['stream_title'],
                 game_name = data['stream_game']
             )
+            self.tw_bot.channel.touch()
             self.logger.info(f'Twitch | Stream information updated | {data["stream_title"]} | {data["stream_game"]}')
             flash('Stream information updated', category='info')
             return redirect(f'/{lang}/twitch')
@@ -716,7 +866,7 @@ class WebServer:
     
     def start_bot(self, bot):
         """
-        Starts a bot.
+        Starts a bot. The bot is started on the event loop through the command bus, and the view waits for the result.
         """
         if 'loggedin' not in session:
             return redirect('https://valky.xyz/')
@@ -733,97 +883,448 @@ class WebServer:
         else:
             return redirect('https://valky.xyz/')
         
-        thread = Thread(target=meth)
-        thread.start()
-        
-        flash(f'Started {name} Bot', category='info')
+        if self.bus.call(meth):
+            flash(f'Started {name} Bot', category='info')
+        else:
+            flash(f'{name} Bot is already running', category='info')
         return redirect('/en')
     
+    def command_timeout(self, error: CommandTimeout):
+        """
+        Answers a request whose command did not finish on the event loop in time.
+        
+        Args:
+            error (CommandTimeout): The error.
+        """
+        if request.path.startswith('/api/'):
+            return jsonify({'error': str(error)}), 504
+        return Response(f'{error}, the bots are busy. Please try again.\n', status=504, content_type='text/plain; charset=utf-8')
+    
     # ========================================================================================
     # Valkyrie Bot - Helpers
     # ========================================================================================
     
-    def start_vk_bot(self):
+    def start_vk_bot(self) -> bool:
         """
-        Starts the Valkyrie bot.
+        Starts the Valkyrie bot. Both loops of the bot are owned by the supervisor, which restarts them if they crash.
+        
+        Returns:
+            bool: True if the bot was started, False if it is already running.
         """
+        if self.vk_bot.running:
+            return False
         self.vk_bot.start_time = time.time()
         self.vk_bot.running = True
-        self.loop.create_task(self.vk_bot.run())
-        self.loop.create_task(self.vk_bot.run_fast())
+        self.status.publish(self.vk_bot)
+        self.supervisor.start('valky', self.vk_bot.run, partial(self.stopped, self.vk_bot))
+        self.supervisor.start('valky_fast', self.vk_bot.run_fast, partial(self.stopped, self.vk_bot))
+        return True
         
-    def start_dc_bot(self):
+    def start_dc_bot(self) -> bool:
         """
-        Starts the Discord bot.
+        Starts the Discord bot. The client is owned by the supervisor, which reconnects it if it crashes.
+        
+        Returns:
+            bool: True if the bot was started, False if it is already running.
         """
+        if self.dc_bot.running:
+            return False
         self.dc_bot.start_time = time.time()
         self.dc_bot.running = True
+        self.status.publish(self.dc_bot)
         self.dc_bot.setup()
-        self.loop.create_task(self.dc_bot.client.start(self.dc_bot.token))
+        self.supervisor.start('discord', self.dc_bot.start, partial(self.stopped, self.dc_bot))
+        return True
         
-    def start_tw_bot(self):
+    def start_tw_bot(self) -> bool:
         """
-        Starts the Twitch bot.
+        Starts the Twitch bot. The client is owned by the supervisor, which reconnects it if it crashes.
+        
+        Returns:
+            bool: True if the bot was started, False if it is already running.
         """
+        if self.tw_bot.running:
+            return False
         self.tw_bot.start_time = time.time()
         self.tw_bot.running = True
-        self.loop.create_task(self.tw_bot.run())
+        self.status.publish(self.tw_bot)
+        self.supervisor.start('twitch', self.tw_bot.start, partial(self.stopped, self.tw_bot))
+        return True
     
-    def get_logs(self):
+    def stopped(self, bot):
         """
-        Returns the logs.
+        Marks a bot as stopped, once its supervised task ended for good.
+        
+        Args:
+            bot: The bot instance.
         """
-        logs = []
-        path = self.logger.PATH
-        start_string = self.valky[-1] + "'"
-        with open(path, 'r') as f:
-            last_part = f.read().split(start_string)[-1]
-        for l in last_part.split('\n'):
-            if l == '':
-                continue
-            log_data = l[:-1].replace("b'", '').replace('b"', '').split(' | ', 5)
-            
-            if log_data[5] != self.valky[0]:
-                logs.append({
-                    'time': log_data[0],
-                    'level': log_data[1],
-                    'file': log_data[2],
-                    'line': log_data[3],
-                    'method': log_data[4],
-                    'message': log_data[5]
-                })
-        return logs
-    
-    def get_tasks(self):
-        tasks_raw = self.vk_bot.task_queue.tasks
-        tasks = []
-        for task in tasks_raw:
-            task.data['id'] = task.id
-            task.data['action'] = task.action
-            tasks.append(task.data)
-        
-        finished_raw = self.vk_bot.task_queue.finished_tasks
-        finished = []
-        for task in finished_raw:
-            task.data['id'] = task.id
-            task.data['action'] = task.action
-            finished.append(task.data)
-        
-        deleted_raw = self.vk_bot.task_queue.deleted_tasks
-        deleted = []
-        for task in deleted_raw:
-            task.data['id'] = task.id
-            task.data['action'] = task.action
-            deleted.append(task.data)
-        
-        errors_raw = self.vk_bot.task_queue.errors
-        errors = []
-        for task in errors_raw:
-            task.data['id'] = task.id
-            task.data['action'] = task.action
-            errors.append(task.data)
-        
-        return tasks, finished, deleted, errors
+        bot.running = False
+        if hasattr(bot, 'loaded'):
+            bot.loaded = False
+        if hasattr(bot, 'ready'):
+            bot.ready = False
+        self.status.publish(bot)
+    
+    @staticmethod
+    def log_filters(args) -> dict:
+        """
+        Reads the filters of a log query from the query string.
+        
+        Args:
+            args: The query string arguments.
+        
+        Returns:
+            dict: The keyword arguments of `LogQuery.query`.
+        
+        Raises:
+            ValueError: If a filter is invalid.
+        """
+        return {
+            'cursor': int(args['cursor']) if args.get('cursor') else None,
+            'limit': max(1, min(int(args.get('limit', 100)), 500)),
+            'level': args.get('level') or None,
+            'file': args.get('file') or None,
+            'method': args.get('method') or None,
+            'since': LogQuery.parse_time(args.get('since')),
+            'until': LogQuery.parse_time(args.get('until')),
+            'contains': args.get('q') or None,
+        }
+    
+    @staticmethod
+    def task_dict(task: Task) -> dict:
+        """
+        Returns a task as a dictionary. The data of the task is not changed.
+        
+        Args:
+            task (Task): The task.
+        
+        Returns:
+            dict: The task.
+        """
+        return {
+            'id': task.id,
+            'action': task.action,
+            'instant': task.instant,
+            'time': task.time,
+            'role': task.role,
+            'date': task.date,
+            'data': task.data,
+        }
+    
+    def task_row(self, task: Task) -> dict:
+        """
+        Returns a task as a row of a task table, with its creation date formatted. The task is not changed.
+        
+        Args:
+            task (Task): The task.
+        
+        Returns:
+            dict: The task.
+        """
+        date = TaskQuery.date(task)
+        return dict(self.task_dict(task), created=time.strftime("%Y-%m-%d %H:%M", time.localtime(date)) if date else 'N/A')
+    
+    @staticmethod
+    def task_filters(args) -> dict:
+        """
+        Reads the filters of a task query from the query string.
+        
+        Args:
+            args: The query string arguments.
+        
+        Returns:
+            dict: The keyword arguments of `TaskQuery.query`.
+        
+        Raises:
+            ValueError: If a filter is invalid.
+        """
+        state = args.get('state') or 'queued'
+        return {
+            'state': state,
+            'sort': args.get('sort') or 'date',
+            # the queue runs from the oldest task, the history is read from the newest
+            'order': args.get('order') or ('asc' if state in ('queued', 'instant') else 'desc'),
+            'action': args.get('action') or None,
+            'user': args.get('user') or None,
+            'since': LogQuery.parse_time(args.get('since')),
+            'until': LogQuery.parse_time(args.get('until')),
+            'cursor': args.get('cursor') or None,
+            'limit': max(1, min(int(args.get('limit', 25)), 100)),
+        }
+    
+    def api_response(self, name: str, version, build, changed: float = None, variant: str = ''):
+        """
+        Answers a request of the JSON API. If the client already has the current version of the resource, which it
+        tells by the `If-None-Match` or the `If-Modified-Since` header, it is answered with 304 and the data of the
+        resource is not built.
+        
+        Args:
+            name (str): The name of the resource.
+            version: The version of the resource, see `ApiVersions.check`.
+            build (callable): Builds the data of the resource.
+            changed (float): The time of the last change in epoch seconds, if the state knows it.
+            variant (str): The variant of the resource, e.g. the query string.
+        
+        Returns:
+            Response: The response.
+        """
+        etag, modified = self.api_versions.check(name, version, changed, variant)
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(etag)
+        else:
+            fresh = request.if_modified_since is not None and int(modified) <= request.if_modified_since.timestamp()
+        self.api_versions.record(fresh)
+        
+        response = Response(status=304) if fresh else jsonify(build())
+        response.set_etag(etag)
+        response.last_modified = int(modified)
+        # the client may keep the response, but has to revalidate it on every request
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    
+    def api_status(self):
+        """
+        Returns the status of the bots and the Luna API as JSON.
+        """
+        if 'loggedin' not in session:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        status = self.status.snapshot
+        return self.api_response('status', (self.status.version, self.luna_health.version), lambda: {
+            'build': self.build,
+            'bots': {name: {'status': bot['status'], 'start_time': bot['start_time']} for name, bot in status.items()},
+            'luna': self.luna_health.snapshot,
+        })
+    
+    async def api_tasks(self):
+        """
+        Returns the first page of the tasks of every state as JSON, with the `count` of every state and the cursor of
+        its `next` page, which is read from `/api/v1/tasks/<state>`. Like every async view, it runs on the event loop,
+        so the task lists do not change while they are read.
+        """
+        if 'loggedin' not in session:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        try:
+            limit = max(1, min(int(request.args.get('limit', 25)), 100))
+        except ValueError:
+            return jsonify({'error': 'Invalid limit'}), 400
+        
+        def build() -> dict:
+            data = {'count': {}, 'next': {}}
+            for state, key in self.API_TASKS.items():
+                filters = self.task_filters({'state': state, 'limit': limit})
+                page = self.task_query.query(**filters)
+                data[key] = [self.task_dict(task) for task in page['tasks']]
+                data['count'][state] = page['count']
+                data['next'][state] = page['next']
+            return data
+        
+        task_queue = self.vk_bot.task_queue
+        return self.api_response('tasks', task_queue.version, build, task_queue.changed_time or None, str(limit))
+    
+    async def api_tasks_page(self, state):
+        """
+        Returns a page of the tasks of a state as JSON.
+        
+        Args:
+            state (str): The state of the tasks, e.g. `finished`.
+        """
+        if 'loggedin' not in session:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        try:
+            filters = self.task_filters(dict(request.args.to_dict(), state=state))
+            page = self.task_query.query(**filters)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        task_queue = self.vk_bot.task_queue
+        # the query runs before the validators, so an invalid filter is answered with 400, and a page is cheap
+        return self.api_response(f'tasks/{state}', task_queue.version, lambda: {
+            'tasks': [self.task_dict(task) for task in page['tasks']],
+            'next': page['next'],
+            'prev': page['prev'],
+            'count': page['count'],
+        }, task_queue.changed_time or None, request.query_string.decode('utf-8'))
+    
+    def api_channel(self):
+        """
+        Returns the stats of the Twitch channel as JSON.
+        """
+        if 'loggedin' not in session:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        channel = self.tw_bot.channel
+        return self.api_response('channel', (self.tw_bot.loaded, channel.version), lambda: {
+            'loaded': self.tw_bot.loaded,
+            'name': channel.name,
+            'id': channel.id,
+            'is_live': channel.is_live,
+            'started_at': channel.started_at,
+            'title': channel.stream.title,
+            'game': channel.stream.game.name,
+            'follower_count': channel.follower_count,
+            'subscriber_count': channel.subscriber_count,
+            'vip_count': len(channel.vips),
+            'mod_count': len(channel.moderators),
+            'emote_count': len(channel.emotes),
+            'ban_count': len(channel.banned),
+        }, channel.changed_time or None)
+    
+    def api_guild(self):
+        """
+        Returns the stats of the Discord guild as JSON.
+        """
+        if 'loggedin' not in session:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        guild_stats = self.dc_bot.guild_stats
+        # the series gains a point every interval, even without events
+        interval = int(time.time() // guild_stats.interval)
+        changed = max(guild_stats.changed_time, interval * guild_stats.interval) if guild_stats.changed_time else None
+        return self.api_response('guild', (guild_stats.version, interval), guild_stats.stats, changed)
+    
+    def metrics(self):
+        """
+        Returns the metrics in the Prometheus text format. A scraper authenticates with the `metrics_token` of the web
+        configuration as a bearer token, a browser with the login of the dashboard.
+        """
+        token = self.config['web'].get('metrics_token')
+        bearer = request.headers.get('Authorization', '')
+        if 'loggedin' not in session and not (token and hmac.compare_digest(bearer.encode(), f'Bearer {token}'.encode())):
+            return Response('Unauthorized\n', status=401, content_type='text/plain; charset=utf-8')
+        
+        return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    
+    def api_logs(self):
+        """
+        Returns a page of log entries as JSON, newest first. The query string can filter by `level` (minimum level),
+        `file`, `method`, `since`, `until` and `q` (substring), and continue from the `cursor` of the previous page.
+        """
+        if 'loggedin' not in session:
+            return jsonify({'error': 'Unauthorized'}), 401
+        try:
+            filters = self.log_filters(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # a page only changes if the log file grows or is rotated, or if the index catches up with it
+        try:
+            stat = os.stat(self.log_query.path)
+            version, changed = (stat.st_ino, stat.st_size, self.log_query.covered), stat.st_mtime
+        except FileNotFoundError:
+            version, changed = None, None
+        return self.api_response('logs', version, lambda: self.log_query.query(**filters), changed, request.query_string.decode('latin-1'))
+    
+    def subscribe_logs(self) -> tuple:
+        """
+        Connects the current request to the log stream. The query string can filter by `level` (minimum level). A
+        client resumes after the entry of the `Last-Event-ID` header or the `cursor` argument.
+        
+        Returns:
+            tuple: The subscriber, or None and the error as a dictionary and a status code.
+        """
+        if 'loggedin' not in session:
+            return None, ({'error': 'Unauthorized'}, 401)
+        try:
+            cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+            cursor = int(cursor) if cursor else None
+        except ValueError:
+            return None, ({'error': 'Invalid cursor'}, 400)
+        
+        try:
+            return self.log_stream.subscribe(cursor, LogQuery.level(request.args.get('level'))), None
+        except LogStreamFull as e:
+            return None, ({'error': str(e)}, 503)
+    
+    def api_logs_stream(self):
+        """
+        Streams newly appended log entries as Server-Sent Events. In the WSGI serving mode every client holds a thread.
+        """
+        subscriber, error = self.subscribe_logs()
+        if error is not None:
+            return jsonify(error[0]), error[1]
+        
+        return Response(
+            self.log_stream.events(subscriber),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    async def asgi_logs_stream(self, scope: dict, receive, send):
+        """
+        Streams newly appended log entries as Server-Sent Events on the event loop. This is the native route of the
+        ASGI serving mode, where a client holds no thread.
+        
+        Args:
+            scope (dict): The ASGI scope.
+            receive (callable): The ASGI receive channel.
+            send (callable): The ASGI send channel.
+        """
+        # the Flask request context is only needed to read the session cookie and the query string
+        with self.app.request_context(AsgiApp.environ(scope)):
+            subscriber, error = self.subscribe_logs()
+        
+        if error is not None:
+            body = json.dumps(error[0]).encode('utf-8')
+            await send({'type': 'http.response.start', 'status': error[1], 'headers': [(b'content-type', b'application/json')]})
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        
+        headers = [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        
+        disconnected = asyncio.Event()
+        
+        async def read():
+            # the request body is still queued, as native routes are dispatched before it is read, so only a
+            # disconnect ends the stream
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+        
+        reader = asyncio.ensure_future(read())
+        try:
+            async with contextlib.aclosing(self.log_stream.stream(subscriber)) as events:
+                async for event in events:
+                    if disconnected.is_set():
+                        break
+                    await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+        finally:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+            self.log_stream.unsubscribe(subscriber)
+    
+    def serve_asset(self, name):
+        """
+        Serves a built asset. The name of a built asset changes with its content, so it is cached for a year and never
+        revalidated. The precompressed variant the client accepts is served, so nothing is compressed per request.
+        
+        Args:
+            name (str): The name of the built asset.
+        """
+        found = self.assets.resolve(name, request.headers.get('Accept-Encoding', ''))
+        if found is None:
+            return 'Not Found', 404
+        
+        path, encoding = found
+        response = send_file(path, mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream', conditional=False, etag=False)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = f'public, max-age={AssetPipeline.MAX_AGE}, immutable'
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    def build_assets(self):
+        """
+        Builds the assets of the dashboard. Until the build is done, or if it fails, the templates use the CDN.
+        """
+        try:
+            self.assets.build()
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            self.logger.error(f'Assets | Failed to build the assets, the CDN is used | {str(e)}')
     
     def save_cfg(self):
         """
@@ -854,10 +1355,63 @@ class WebServer:
     # Valkyrie Bot - Serve
     # ========================================================================================
     
-    def run(self, loop):
+    def ensure_sync(self, func):
         """
-        Runs the web server using waitress.
+        Replaces the sync-to-async bridge of Flask, which runs every async view in a new event loop. Async views are
+        sent to the event loop of the bots through the command bus instead, and the request thread waits for their
+        result, at most `command_timeout` seconds. The request context is carried over to the view, so views can await
+        bot coroutines and change the task queue without racing the bots.
+        
+        Args:
+            func (callable): The view function.
+        
+        Returns:
+            callable: A synchronous callable of the view.
+        """
+        if not inspect.iscoroutinefunction(func) or self.bus.loop is None:
+            return Flask.ensure_sync(self.app, func)
+        
+        @wraps(func)
+        def view(*args, **kwargs):
+            return self.bus.call(func, *args, **kwargs)
+        return view
+    
+    async def run(self, loop):
+        """
+        Runs the web server. In the default `waitress` serving mode, waitress blocks, so it is served from an executor
+        thread and the event loop stays free for the bots. In the `asgi` serving mode, hypercorn serves the ASGI app on
+        the event loop itself. The supervisor is attached to the loop first, and starts the Luna health monitor.
         """
         self.loop = loop
+        self.supervisor.attach(loop)
+        self.bus.attach(loop)
+        self.supervisor.start('luna_health', self.luna_health.run)
+        # the log file is indexed once in the background, later queries only index the appended lines
+        loop.run_in_executor(None, self.log_query.refresh)
+        if self.config['web'].get('assets', True) and self.assets.manifest is None:
+            loop.run_in_executor(None, self.build_assets)
         self.logger.info(f'Web | Starting web server on port {self.config["web"]["port"]}...')
-        serve(self.app, host=self.config['web']['host'], port=self.config['web']['port'])
+        
+        if self.config['web'].get('server', 'waitress') == 'asgi':
+            await self.serve_asgi()
+        else:
+            await loop.run_in_executor(None, partial(
+                serve, self.app, host=self.config['web']['host'], port=self.config['web']['port'], threads=self.config['web'].get('threads', 8)
+            ))
+    
+    async def serve_asgi(self):
+        """
+        Serves the ASGI app with hypercorn on the event loop of the bots. Hypercorn is only needed for this serving mode,
+        so it is imported here.
+        """
+        from hypercorn.asyncio import serve as serve_asgi
+        from hypercorn.config import Config as AsgiConfig
+        
+        config = AsgiConfig()
+        config.bind = [f"{self.config['web']['host']}:{self.config['web']['port']}"]
+        config.accesslog = None
+        try:
+            # the server runs until the loop stops, CTRL+C is left to the main loop
+            await serve_asgi(self.asgi, config, shutdown_trigger=asyncio.Event().wait)
+        finally:
+            self.asgi.close()